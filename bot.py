@@ -2,105 +2,346 @@
 Главный модуль Telegram-бота для арендной компании "RentBrigadir".
 """
 
-import asyncio
-from aiogram import Bot, Dispatcher, F
-from aiogram.filters import Command
-from aiogram.fsm.storage.memory import MemoryStorage
+import time
+
+# Начало отсчета профиля запуска (STARTUP_PROFILE=1). Отметка стоит до
+# остальных импортов намеренно: в профиль должно попасть время импорта
+# aiogram, конфигурации и обработчиков, поэтому импорты ниже помечены
+# noqa: E402
+STARTED = time.perf_counter()
+
+import asyncio  # noqa: E402
+from aiogram import Bot, Dispatcher, F  # noqa: E402
+from aiogram.client.session.aiohttp import AiohttpSession  # noqa: E402
+from aiogram.client.telegram import TelegramAPIServer  # noqa: E402
+from aiogram.filters import Command  # noqa: E402
 
 # Импорт конфигурации
-from data.config import BOT_TOKEN
+from data.config import (BOT_TOKEN, TELEGRAM_API_URL, THROTTLE_ENABLED, BOT_MODE, WEBHOOK_BASE_URL, WEBHOOK_PATH, WEBHOOK_SECRET,  # noqa: E402
+                         WEBAPP_HOST, WEBAPP_PORT, WEBHOOK_WORKERS, FAST_START, STARTUP_PROFILE)
 
 # Импорт базы данных
-from database import db
+from database import db, async_db  # noqa: E402
+
+# Импорт сервисов и middleware
+from services.user_buffer import user_buffer  # noqa: E402
+from services.fsm_storage import fsm_storage  # noqa: E402
+from services.notifications import notification_dispatcher  # noqa: E402
+from services.events import event_log  # noqa: E402
+from services.catalog_snapshot import load_catalog, save_catalog_snapshot  # noqa: E402
+from services.startup import startup_profiler, deferred_startup, FirstResponseMiddleware  # noqa: E402
+from middlewares.user_activity import UserActivityMiddleware  # noqa: E402
+from middlewares.metrics import HandlerMetricsMiddleware  # noqa: E402
+from middlewares.throttling import ThrottlingMiddleware  # noqa: E402
+from middlewares.callback_router import CallbackRouter  # noqa: E402
+from middlewares.startup import FirstUpdateMiddleware  # noqa: E402
+from keyboards.callbacks import (CategoryPage, ToolCard, RentTool, PickTool, Inbox,  # noqa: E402
+                                 ApplicationDetail, ApplicationProcessed, ApplicationCall, ReservationRelease,
+                                 LEGACY_CALLBACKS)
+from services.metrics import metrics, record_db_time, ApiTimingMiddleware, start_metrics_server  # noqa: E402
 
 # Импорт обработчиков
-from handlers.user_handlers import (
+from handlers.user_handlers import (  # noqa: E402
     cmd_start, cmd_help, cmd_contacts, cmd_delivery, cmd_catalog,
     show_categories, show_contacts, show_delivery_info, show_help,
     show_tools_by_category, show_tool_detail, back_to_categories, 
-    back_to_main, back_to_tools, cancel_to_tools
+    back_to_main, cancel_to_tools, is_known_category, is_known_tool
 )
 
-from handlers.application_handlers import (
+from handlers.application_handlers import (  # noqa: E402
     ApplicationStates, start_application, rent_tool, process_tool_name,
     process_rental_period, process_customer_name, process_phone,
-    confirm_application, edit_application, cancel_application
+    confirm_application, edit_application, cancel_application, choose_tool, is_known_pick
 )
 
-from handlers.admin_handlers import (
+from handlers.search_handlers import (  # noqa: E402
+    SearchStates, start_search, process_search_query
+)
+
+from handlers.inline_handlers import inline_tool_search  # noqa: E402
+
+from handlers.admin_handlers import (  # noqa: E402
     admin_panel, show_new_applications, show_all_applications,
-    show_application_detail, mark_application_processed, call_customer,
-    show_admin_stats, refresh_applications, back_to_admin
+    show_application_detail, mark_application_processed, release_reservation, call_customer,
+    show_admin_stats, refresh_applications, back_to_admin, show_inbox_page,
+    cmd_rebuild_stats, show_funnel_report, cmd_metrics
 )
 
+startup_profiler.started = STARTED
+startup_profiler.mark("импорт модулей")
+
 # Инициализация бота и диспетчера
-bot = Bot(token=BOT_TOKEN)
-storage = MemoryStorage()
-dp = Dispatcher(storage=storage)
+# При заданном TELEGRAM_API_URL запросы идут на другой сервер Bot API
+# (например, локальный devtools.fake_api_server для нагрузочных проверок)
+if TELEGRAM_API_URL:
+    bot = Bot(token=BOT_TOKEN, session=AiohttpSession(api=TelegramAPIServer.from_base(TELEGRAM_API_URL)))
+else:
+    bot = Bot(token=BOT_TOKEN)
+dp = Dispatcher(storage=fsm_storage)
+
+# Сервер эндпоинта метрик, запускается в on_startup
+metrics_runner = None
 
 def register_handlers():
     """Регистрирует все обработчики команд и callback-запросов."""
     
+    # Жизненный цикл: подключение БД и фоновых сервисов
+    dp.startup.register(on_startup)
+    dp.shutdown.register(on_shutdown)
+    
+    # Отложенные задачи запуска стартуют после первого апдейта
+    dp.update.outer_middleware(FirstUpdateMiddleware())
+    if STARTUP_PROFILE:
+        bot.session.middleware(FirstResponseMiddleware())
+    
+    # Учет активности пользователей (last_seen)
+    dp.message.outer_middleware(UserActivityMiddleware())
+    dp.callback_query.outer_middleware(UserActivityMiddleware())
+    
+    # Лимит частоты запросов и подавление повторных нажатий; регистрируется
+    # до метрик, чтобы отброшенные апдейты не попадали в замеры обработчиков
+    if THROTTLE_ENABLED:
+        throttling = ThrottlingMiddleware()
+        dp.message.middleware(throttling)
+        dp.callback_query.middleware(throttling)
+    
+    # Метрики: длительность каждого обработчика и время в БД / Bot API
+    for observer in (dp.message, dp.callback_query, dp.inline_query):
+        observer.middleware(HandlerMetricsMiddleware())
+    async_db.add_query_listener(record_db_time)
+    bot.session.middleware(ApiTimingMiddleware())
+    
     # Команды пользователя
     dp.message.register(cmd_start, Command("start"))
     dp.message.register(cmd_help, Command("help"))
     dp.message.register(cmd_contacts, Command("contacts"))
     dp.message.register(cmd_delivery, Command("delivery"))
     dp.message.register(cmd_catalog, Command("catalog"))
+    dp.message.register(start_search, Command("search"))
     dp.message.register(cancel_application, Command("cancel"))
     
     # Админ команды
     dp.message.register(admin_panel, Command("admin"))
+    dp.message.register(cmd_rebuild_stats, Command("rebuild_stats"))
+    dp.message.register(cmd_metrics, Command("metrics"))
     
     # Обработчики текстовых сообщений (главное меню)
     dp.message.register(show_categories, F.text == "🔧 Инструменты")
+    dp.message.register(start_search, F.text == "🔍 Поиск")
     dp.message.register(start_application, F.text == "📝 Оставить заявку")
     dp.message.register(show_delivery_info, F.text == "🚚 Доставка")
     dp.message.register(show_contacts, F.text == "📞 Контакты")
     dp.message.register(show_help, F.text == "ℹ️ Помощь")
     
-    # Обработчики callback-запросов (инструменты)
-    dp.callback_query.register(show_tools_by_category, F.data.startswith("category_"))
-    dp.callback_query.register(show_tool_detail, F.data.startswith("tool_"))
-    dp.callback_query.register(rent_tool, F.data.startswith("rent_"))
-    dp.callback_query.register(back_to_categories, F.data == "back_to_categories")
-    dp.callback_query.register(back_to_main, F.data == "back_to_main")
-    dp.callback_query.register(back_to_tools, F.data == "back_to_tools")  
-    dp.callback_query.register(cancel_to_tools, F.data == "cancel_to_tools")
-    
     # Обработчики состояний FSM (заявки)
     dp.message.register(process_tool_name, ApplicationStates.waiting_for_tool_name)
+    # Новый текст вместо выбора подсказки считается новым названием инструмента
+    dp.message.register(process_tool_name, ApplicationStates.waiting_for_tool_choice)
     dp.message.register(process_rental_period, ApplicationStates.waiting_for_rental_period)
     dp.message.register(process_customer_name, ApplicationStates.waiting_for_customer_name)
     dp.message.register(process_phone, ApplicationStates.waiting_for_phone)
     
-    # Обработчики подтверждения заявки
-    dp.callback_query.register(confirm_application, F.data == "confirm_application")
-    dp.callback_query.register(edit_application, F.data == "edit_application")
+    # Обработчик поискового запроса
+    dp.message.register(process_search_query, SearchStates.waiting_for_query)
+    
+    # Inline-режим (@bot запрос)
+    dp.inline_query.register(inline_tool_search)
+    
+    # Callback-запросы: один обработчик диспетчера и таблица маршрутов по префиксу
+    # callback_data; данные кнопок распаковываются и проверяются до обработчика
+    callback_router = CallbackRouter()
+    
+    # Инструменты
+    callback_router.add(CategoryPage, show_tools_by_category, check=is_known_category)
+    callback_router.add(ToolCard, show_tool_detail, check=is_known_tool)
+    callback_router.add(RentTool, rent_tool, check=is_known_tool)
+    callback_router.add("back_to_categories", back_to_categories)
+    callback_router.add("back_to_main", back_to_main)
+    callback_router.add("cancel_to_tools", cancel_to_tools)
+    
+    # Заявки
+    callback_router.add(PickTool, choose_tool, states=(ApplicationStates.waiting_for_tool_choice,),
+                        check=is_known_pick)
+    callback_router.add("confirm_application", confirm_application)
+    callback_router.add("edit_application", edit_application)
+    
+    # Админ-панель
+    callback_router.add("new_applications", show_new_applications)
+    callback_router.add("all_applications", show_all_applications)
+    callback_router.add(Inbox, show_inbox_page)
+    callback_router.add(ApplicationDetail, show_application_detail)
+    callback_router.add(ApplicationProcessed, mark_application_processed)
+    callback_router.add(ApplicationCall, call_customer)
+    callback_router.add(ReservationRelease, release_reservation)
+    callback_router.add("admin_stats", show_admin_stats)
+    callback_router.add("admin_funnel", show_funnel_report)
+    callback_router.add("refresh_applications", refresh_applications)
+    callback_router.add("back_to_admin", back_to_admin)
+    
+    # Кнопки старого формата в отправленных ранее сообщениях
+    for prefix, convert in LEGACY_CALLBACKS.items():
+        callback_router.alias(prefix, convert)
+    
+    dp.callback_query.outer_middleware(callback_router)
+    dp.callback_query.register(callback_router.dispatch)
     
-    # Админ обработчики callback-запросов
-    dp.callback_query.register(show_new_applications, F.data == "new_applications")
-    dp.callback_query.register(show_all_applications, F.data == "all_applications")
-    dp.callback_query.register(show_application_detail, F.data.startswith("app_detail_"))
-    dp.callback_query.register(mark_application_processed, F.data.startswith("app_processed_"))
-    dp.callback_query.register(call_customer, F.data.startswith("app_call_"))
-    dp.callback_query.register(show_admin_stats, F.data == "admin_stats")
-    dp.callback_query.register(refresh_applications, F.data == "refresh_applications")
-    dp.callback_query.register(back_to_admin, F.data == "back_to_admin")
+    # Корзины гистограмм выделяются заранее для всех обработчиков
+    metrics.register_dispatcher(dp)
+    startup_profiler.mark("регистрация обработчиков")
 
-async def main():
-    """Основная функция для запуска бота."""
+async def on_startup(bot: Bot):
+    """
+    Подключает БД и запускает фоновые сервисы (polling и webhook).
+    
+    При FAST_START каталог читается из снимка, а все, что не нужно
+    для ответа на первый апдейт, откладывается до его обработки.
+    """
     # Инициализация подключения к базе данных
-    db.connect()
+    await async_db.connect(fast_start=FAST_START)
     print("✅ База данных подключена успешно")
+    startup_profiler.mark("подключение БД")
+    
+    if FAST_START:
+        if not await load_catalog():
+            deferred_startup.add("снимок каталога", save_catalog_snapshot)
+        startup_profiler.mark("загрузка каталога")
+    
+    # Запуск фоновой записи буферов пользователей, состояний FSM и событий
+    user_buffer.start()
+    fsm_storage.start()
+    event_log.start()
+    
+    # Запуск рассылки уведомлений из очереди (в т.ч. оставшихся с прошлого запуска)
+    # и HTTP-эндпоинта метрик Prometheus (если задан METRICS_PORT)
+    deferred_startup.add("уведомления", start_notifications)
+    deferred_startup.add("эндпоинт метрик", start_metrics)
+    if FAST_START:
+        deferred_startup.schedule()
+    else:
+        deferred_startup.trigger()
+    startup_profiler.mark("on_startup")
+
+async def start_notifications():
+    """Отложенная задача: рассылка уведомлений из очереди."""
+    notification_dispatcher.start(bot)
+
+async def start_metrics():
+    """Отложенная задача: HTTP-эндпоинт метрик."""
+    global metrics_runner
+    metrics_runner = await start_metrics_server()
+
+async def on_shutdown():
+    """
+    Останавливает фоновые сервисы и закрывает БД.
+    Хранилище FSM к этому моменту уже сброшено: диспетчер закрывает его первым.
+    """
+    await deferred_startup.stop()
+    await notification_dispatcher.stop()
+    if metrics_runner:
+        await metrics_runner.cleanup()
+    # Сбрасываем буферы до закрытия БД, чтобы не потерять пользователей и события
+    await user_buffer.stop()
+    await event_log.stop()
+    await async_db.close()
+    print("✅ База данных закрыта")
+
+async def on_webhook_startup(bot: Bot):
+    """Регистрирует webhook в Telegram (только в главном процессе)."""
+    await bot.set_webhook(
+        url=f"{WEBHOOK_BASE_URL}{WEBHOOK_PATH}",
+        secret_token=WEBHOOK_SECRET,
+        allowed_updates=dp.resolve_used_update_types()
+    )
+    print(f"✅ Webhook установлен: {WEBHOOK_BASE_URL}{WEBHOOK_PATH}")
+
+def create_webhook_app():
+    """
+    Создает aiohttp-приложение, принимающее обновления от Telegram.
+    
+    Обновления обрабатываются в рамках HTTP-запроса (handle_in_background=False),
+    поэтому метод, который обработчик вернул вместо вызова (return message.answer(...)),
+    отправляется прямо в ответе на webhook без отдельного запроса к Bot API.
+    Запросы без верного X-Telegram-Bot-Api-Secret-Token отклоняются.
+    """
+    from aiohttp import web
+    from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
     
+    app = web.Application()
+    SimpleRequestHandler(
+        dispatcher=dp,
+        bot=bot,
+        secret_token=WEBHOOK_SECRET,
+        handle_in_background=False,
+        # Для метрик: ответ обработчика уходит в теле HTTP-ответа
+        reply_in_webhook=True
+    ).register(app, path=WEBHOOK_PATH)
+    setup_application(app, dp, bot=bot)
+    return app
+
+def run_webhook_worker(primary=True):
+    """Запускает один процесс webhook-сервера."""
+    from aiohttp import web
+    
+    if primary:
+        dp.startup.register(on_webhook_startup)
+    # reuse_port позволяет нескольким процессам слушать один порт,
+    # ядро распределяет входящие соединения между ними
+    web.run_app(
+        create_webhook_app(),
+        host=WEBAPP_HOST,
+        port=WEBAPP_PORT,
+        reuse_port=WEBHOOK_WORKERS > 1,
+        print=None
+    )
+
+def run_webhook():
+    """
+    Запускает webhook-сервер в WEBHOOK_WORKERS процессах за одним портом.
+    
+    Миграции и импорт tools.csv выполняются один раз в главном процессе
+    до запуска воркеров: воркеры стартуют с готовой схемой и каталогом
+    (импорт пропускается по хешу файла) и не меняют схему одновременно.
+    Состояния FSM при нескольких процессах хранятся в общем режиме
+    (FSM_SHARED), так как соседние апдейты пользователя приходят в разные процессы.
+    """
+    import multiprocessing
+    
+    register_handlers()
+    if WEBHOOK_WORKERS > 1:
+        # Соединения закрываются до fork: дочерние процессы открывают свои
+        db.connect()
+        db.close()
+    print(f"🚀 Бот запущен в режиме webhook на {WEBAPP_HOST}:{WEBAPP_PORT}{WEBHOOK_PATH} "
+          f"({WEBHOOK_WORKERS} проц.)")
+    
+    workers = [
+        multiprocessing.Process(target=run_webhook_worker, args=(False,), daemon=True)
+        for _ in range(WEBHOOK_WORKERS - 1)
+    ]
+    for worker in workers:
+        worker.start()
+    try:
+        run_webhook_worker(primary=True)
+    finally:
+        for worker in workers:
+            worker.terminate()
+
+async def main():
+    """Основная функция для запуска бота в режиме long polling."""
     # Регистрация всех обработчиков
     register_handlers()
     print("✅ Обработчики зарегистрированы")
     
+    # Webhook и getUpdates взаимоисключающие - снимаем webhook, если он был
+    await bot.delete_webhook()
+    startup_profiler.mark("снятие webhook")
+    
     # Запуск бота
     print("🚀 Бот запущен! Ожидание сообщений...")
     await dp.start_polling(bot)
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    if BOT_MODE == "webhook":
+        run_webhook()
+    else:
+        asyncio.run(main())
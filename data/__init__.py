@@ -11,5 +11,53 @@ __all__ = [
     'ADMIN_IDS', 
     'DATABASE_URL',
     'DATABASE_PATH',
-    'CSV_FILE_PATH'
+    'DATABASE_READ_POOL_SIZE',
+    'CSV_FILE_PATH',
+    'FAST_START',
+    'CATALOG_SNAPSHOT_PATH',
+    'STARTUP_DEFER_TIMEOUT',
+    'STARTUP_PROFILE',
+    'USER_BUFFER_SIZE',
+    'USER_BUFFER_FLUSH_INTERVAL',
+    'FSM_CACHE_SIZE',
+    'FSM_FLUSH_SIZE',
+    'FSM_FLUSH_INTERVAL',
+    'FSM_SESSION_TTL',
+    'FSM_EXPIRE_INTERVAL',
+    'FSM_SHARED',
+    'NOTIFY_RATE_LIMIT',
+    'NOTIFY_CHAT_RATE_LIMIT',
+    'NOTIFY_CONCURRENCY',
+    'NOTIFY_BATCH_SIZE',
+    'NOTIFY_POLL_INTERVAL',
+    'NOTIFY_MAX_ATTEMPTS',
+    'NOTIFY_RETRY_BASE',
+    'EVENT_BUFFER_SIZE',
+    'EVENT_FLUSH_SIZE',
+    'EVENT_FLUSH_INTERVAL',
+    'FUNNEL_REPORT_DAYS',
+    'THROTTLE_ENABLED',
+    'THROTTLE_LIMITS',
+    'THROTTLE_SWEEP_INTERVAL',
+    'THROTTLE_DUPLICATE_TTL',
+    'METRICS_HOST',
+    'METRICS_PORT',
+    'TOOLS_PAGE_SIZE',
+    'QUOTE_MAX_DAYS',
+    'RESERVATION_MAX_DAYS',
+    'ADMIN_PAGE_SIZE',
+    'SEARCH_RESULTS_LIMIT',
+    'FUZZY_MIN_SCORE',
+    'INLINE_RESULTS_LIMIT',
+    'INLINE_CACHE_SIZE',
+    'INLINE_CACHE_TTL',
+    'INLINE_CACHE_TIME',
+    'TELEGRAM_API_URL',
+    'BOT_MODE',
+    'WEBHOOK_BASE_URL',
+    'WEBHOOK_PATH',
+    'WEBHOOK_SECRET',
+    'WEBAPP_HOST',
+    'WEBAPP_PORT',
+    'WEBHOOK_WORKERS'
 ]
\ No newline at end of file
@@ -21,9 +21,126 @@ ADMIN_IDS = [377858450]
 
 # Настройки базы данных
 DATABASE_URL = "sqlite:///database.db"
-DATABASE_PATH = "database.db"
+DATABASE_PATH = os.getenv("DATABASE_PATH", "database.db")
+# Количество read-only соединений (и потоков чтения) в пуле
+DATABASE_READ_POOL_SIZE = int(os.getenv("DATABASE_READ_POOL_SIZE", "4"))
+
+# Буфер регистрации пользователей: запись в БД по размеру пачки или раз в N секунд
+USER_BUFFER_SIZE = 100
+USER_BUFFER_FLUSH_INTERVAL = 5
+
+# Хранилище FSM в SQLite: размер LRU-кэша активных сессий, пакетная запись
+# по размеру или раз в N секунд, время жизни (сек) брошенной сессии и период очистки
+FSM_CACHE_SIZE = 10000
+FSM_FLUSH_SIZE = 100
+FSM_FLUSH_INTERVAL = 2
+FSM_SESSION_TTL = int(os.getenv("FSM_SESSION_TTL", str(24 * 60 * 60)))
+FSM_EXPIRE_INTERVAL = 600
+
+# Очередь уведомлений: общий лимит отправки (сообщений/сек, Telegram допускает ~30),
+# лимит на один чат (сообщений/сек, Telegram допускает ~1),
+# число одновременных отправок, размер пачки, период опроса очереди (сек),
+# число попыток и базовая задержка повтора (сек, удваивается с каждой попыткой)
+NOTIFY_RATE_LIMIT = 25
+NOTIFY_CHAT_RATE_LIMIT = 1
+NOTIFY_CONCURRENCY = 10
+NOTIFY_BATCH_SIZE = 50
+NOTIFY_POLL_INTERVAL = 5
+NOTIFY_MAX_ATTEMPTS = 8
+NOTIFY_RETRY_BASE = 2
+
+# Журнал событий воронки: емкость кольцевого буфера, запись пачкой по размеру
+# или раз в N секунд, период отчета для администратора (дней)
+EVENT_BUFFER_SIZE = 10000
+EVENT_FLUSH_SIZE = 200
+EVENT_FLUSH_INTERVAL = 10
+FUNNEL_REPORT_DAYS = 7
+
+# Ограничение частоты запросов пользователя (корзина токенов на группу обработчиков).
+# Группа определяется модулем обработчика; значение - (токенов в секунду, емкость корзины)
+THROTTLE_ENABLED = os.getenv("THROTTLE_ENABLED", "1") == "1"
+THROTTLE_LIMITS = {
+    "user": (3, 10),
+    "search": (1, 5),
+    "application": (2, 8),
+    "admin": (5, 20),
+    "default": (2, 10),
+}
+# Как часто удаляются корзины неактивных пользователей (сек)
+THROTTLE_SWEEP_INTERVAL = 60
+# Сколько секунд после обработчика, вернувшего метод Bot API, повторные нажатия
+# той же кнопки еще отбрасываются (ответ отправляется уже после обработчика)
+THROTTLE_DUPLICATE_TTL = 1
+
+# Метрики обработчиков в формате Prometheus на http://METRICS_HOST:METRICS_PORT/metrics
+# (0 - HTTP-эндпоинт выключен, сводка доступна командой /metrics)
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+
+# Количество инструментов на одной странице списка категории
+TOOLS_PAGE_SIZE = 8
+
+# Максимальный срок аренды (дней), для которого бот рассчитывает стоимость;
+# на сроки длиннее цену называет менеджер
+QUOTE_MAX_DAYS = 365
+
+# Максимальный срок (дней), на который клиент может запросить бронь из бота;
+# более долгую аренду бронирует менеджер
+RESERVATION_MAX_DAYS = 30
+
+# Количество заявок на одной странице админ-панели
+ADMIN_PAGE_SIZE = 10
+
+# Максимальное количество результатов поиска инструментов
+SEARCH_RESULTS_LIMIT = 10
+
+# Минимальная похожесть (0..1) названия при подборе инструмента из каталога
+FUZZY_MIN_SCORE = 0.3
+
+# Inline-режим: число результатов, размер и TTL (сек) локального кэша,
+# время кэширования ответа на стороне Telegram (сек)
+INLINE_RESULTS_LIMIT = 20
+INLINE_CACHE_SIZE = 512
+INLINE_CACHE_TTL = 300
+INLINE_CACHE_TIME = 300
+
+# Адрес сервера Bot API; пусто - официальный api.telegram.org.
+# Для нагрузочных проверок указывается локальный devtools.fake_api_server
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "")
+
+# Режим получения обновлений: "polling" (по умолчанию) или "webhook"
+BOT_MODE = os.getenv("BOT_MODE", "polling")
+
+# Настройки webhook: публичный HTTPS-адрес, путь и секрет для проверки запросов Telegram
+WEBHOOK_BASE_URL = os.getenv("WEBHOOK_BASE_URL", "")
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/webhook")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET")
+WEBAPP_HOST = os.getenv("WEBAPP_HOST", "0.0.0.0")
+WEBAPP_PORT = int(os.getenv("WEBAPP_PORT", "8080"))
+# Количество процессов, обслуживающих webhook на одном порту
+WEBHOOK_WORKERS = int(os.getenv("WEBHOOK_WORKERS", "1"))
+# Общее хранилище FSM для нескольких процессов: каждое чтение идет в БД, каждая
+# запись сразу фиксируется (без кэша и отложенной записи). Включается само
+# при WEBHOOK_WORKERS > 1
+FSM_SHARED = os.getenv("FSM_SHARED", "1" if WEBHOOK_WORKERS > 1 else "0") == "1"
+
+if WEBHOOK_WORKERS > 1 and not FSM_SHARED:
+    raise ValueError("❌ Для WEBHOOK_WORKERS > 1 нужно общее хранилище FSM (FSM_SHARED=1)")
+
+if BOT_MODE == "webhook" and not (WEBHOOK_BASE_URL and WEBHOOK_SECRET):
+    raise ValueError("❌ Для режима webhook задайте WEBHOOK_BASE_URL и WEBHOOK_SECRET в .env")
 
 # Настройки путей
 CSV_FILE_PATH = "tools.csv"
 
+# Быстрый старт (включается явно, FAST_START=1): каталог читается из снимка
+# CATALOG_SNAPSHOT_PATH, если он совпадает с tools.csv и версией каталога в БД
+# и подписан ключом из BOT_TOKEN; рассылка уведомлений и эндпоинт метрик
+# запускаются после первого апдейта или через STARTUP_DEFER_TIMEOUT сек
+FAST_START = os.getenv("FAST_START", "0") == "1"
+CATALOG_SNAPSHOT_PATH = os.getenv("CATALOG_SNAPSHOT_PATH", "catalog_snapshot.bin")
+STARTUP_DEFER_TIMEOUT = 30
+# Печать этапов запуска и времени до первого ответа бота
+STARTUP_PROFILE = os.getenv("STARTUP_PROFILE", "0") == "1"
+
 print("✅ Конфигурация загружена успешно")
\ No newline at end of file
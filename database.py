@@ -2,89 +2,202 @@
 Модуль для работы с базой данных SQLite.
 """
 
+import asyncio
+import hashlib
+import io
+import queue
+import re
 import sqlite3
 import csv
-from data.config import DATABASE_PATH, CSV_FILE_PATH
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from migrations import apply_migrations, rebuild_stats
+from data.config import (DATABASE_PATH, CSV_FILE_PATH, DATABASE_READ_POOL_SIZE, TOOLS_PAGE_SIZE,
+                         ADMIN_PAGE_SIZE, SEARCH_RESULTS_LIMIT)
+
+# Колонки tools, заполняемые из CSV (name - естественный ключ инструмента)
+TOOL_IMPORT_COLUMNS = (
+    'name', 'description', 'category_id',
+    'price_1_day', 'price_2_days', 'price_3_days', 'price_4_days', 'price_5_days',
+    'price_6_days', 'price_7_days', 'price_14_days', 'price_30_days',
+    'deposit', 'image_url', 'units'
+)
+
+def fts_terms(query):
+    """
+    Превращает текст запроса в префиксные термы FTS5.
+
+    Окончания длинных слов отбрасываются, чтобы "перфоратора" и
+    "перфораторы" находили "перфоратор". Каждый терм берется в кавычки,
+    поэтому спецсимволы запроса не ломают синтаксис MATCH.
+    """
+    terms = []
+    for word in re.findall(r"\w+", query.lower())[:8]:
+        if len(word) >= 6:
+            word = word[:-2]
+        elif len(word) >= 4:
+            word = word[:-1]
+        terms.append(f'"{word}"*')
+    return terms
+
+def busy_units(reservations, start_date, end_date):
+    """
+    Наибольшее число одновременно занятых единиц каждого инструмента в периоде.
+
+    Брони, которые не пересекаются между собой, занимают одну и ту же
+    единицу по очереди, поэтому считается пик, а не сумма: события начала
+    и конца броней (обрезанных по периоду) обходятся по датам, начало
+    в тот же день раньше конца - даты включительны.
+
+    Args:
+        reservations: Строки (tool_id, start_date, end_date, units), пересекающие период
+        start_date (str): Начало периода 'YYYY-MM-DD'
+        end_date (str): Конец периода включительно
+
+    Returns:
+        dict: {ID инструмента: занято единиц}
+    """
+    events = {}
+    for tool_id, start, end, units in reservations:
+        tool_events = events.setdefault(tool_id, [])
+        tool_events.append((max(start, start_date), 0, units))
+        tool_events.append((min(end, end_date), 1, -units))
+
+    busy = {}
+    for tool_id, tool_events in events.items():
+        tool_events.sort()
+        current = peak = 0
+        for _, _, units in tool_events:
+            current += units
+            peak = max(peak, current)
+        busy[tool_id] = peak
+    return busy
+
+
+class ReservationConflict(Exception):
+    """На выбранные даты не осталось свободных единиц инструмента."""
+
+
+# Счетчик stats_totals с числом заявок для фильтра по статусу (None - все заявки)
+STATUS_TOTAL_COLUMNS = {None: "total", "new": "new_count", "processed": "processed_count"}
+
+# Колонки заявки в порядке, который ожидают обработчики и клавиатуры
+APPLICATION_COLUMNS = (
+    "a.id, a.user_id, a.service_name, a.rental_period, a.application_date, "
+    "a.customer_name, a.phone, a.status, u.username, u.full_name as user_full_name"
+)
 
 class Database:
-    """Класс для управления взаимодействием с базой данных SQLite."""
+    """
+    Класс для управления взаимодействием с базой данных SQLite.
+
+    Запись идет через одно соединение, сериализованное блокировкой.
+    Чтение идет через небольшой пул read-only соединений в режиме WAL,
+    поэтому просмотр каталога и админские выборки не ждут записей.
+    Каждый запрос получает собственный короткоживущий курсор.
+    """
     
-    def __init__(self, db_path=DATABASE_PATH):
+    def __init__(self, db_path=DATABASE_PATH, read_pool_size=DATABASE_READ_POOL_SIZE):
         self.db_path = db_path
-        self.conn = None
-        self.cursor = None
+        self.read_pool_size = read_pool_size
+        self._writer = None
+        self._write_lock = threading.Lock()
+        self._readers = queue.Queue()
+        self._catalog_listeners = []
     
-    def connect(self):
-        """Устанавливает подключение к базе данных и создает необходимые таблицы."""
-        self.conn = sqlite3.connect(self.db_path)
-        self.cursor = self.conn.cursor()
+    def connect(self, fast_start=False):
+        """
+        Устанавливает подключение к базе данных и создает необходимые таблицы.
+
+        Args:
+            fast_start (bool): Только применить миграции. Синхронизация каталога
+                с tools.csv вызывается отдельно (sync_catalog), когда снимок
+                каталога устарел
+        """
+        # Соединения используются из потоков исполнителей AsyncDatabase
+        self._writer = sqlite3.connect(self.db_path, check_same_thread=False)
+        # WAL позволяет читателям работать параллельно с писателем
+        self._writer.execute("PRAGMA journal_mode = WAL")
+        self._writer.execute("PRAGMA synchronous = NORMAL")
         # Включение поддержки внешних ключей
-        self.cursor.execute("PRAGMA foreign_keys = ON")
+        self._writer.execute("PRAGMA foreign_keys = ON")
         self.create_tables()
+        if not fast_start:
+            self.sync_catalog()
+
+        read_uri = Path(self.db_path).resolve().as_uri() + "?mode=ro"
+        for _ in range(self.read_pool_size):
+            reader = sqlite3.connect(read_uri, uri=True, check_same_thread=False)
+            reader.execute("PRAGMA foreign_keys = ON")
+            self._readers.put(reader)
+
+    def close(self):
+        """Закрывает все подключения к базе данных."""
+        while not self._readers.empty():
+            self._readers.get_nowait().close()
+        if self._writer:
+            self._writer.close()
+            self._writer = None
+
+    def add_catalog_listener(self, listener):
+        """
+        Подписывает функцию на изменения каталога.
+
+        Функция вызывается после каждого импорта со списками строк
+        таблиц categories и tools: listener(category_rows, tool_rows).
+        """
+        self._catalog_listeners.append(listener)
+
+    def _notify_catalog_changed(self):
+        """Передает подписчикам актуальное содержимое каталога."""
+        with self._write_lock:
+            category_rows = self._writer.execute("SELECT * FROM categories").fetchall()
+            tool_rows = self._writer.execute("SELECT * FROM tools").fetchall()
+        for listener in self._catalog_listeners:
+            listener(category_rows, tool_rows)
+
+    @contextmanager
+    def _read(self):
+        """Выдает свободное read-only соединение из пула."""
+        conn = self._readers.get()
+        try:
+            yield conn
+        finally:
+            self._readers.put(conn)
+
+    @contextmanager
+    def _write(self):
+        """Выдает соединение-писатель и фиксирует транзакцию при выходе."""
+        with self._write_lock:
+            try:
+                yield self._writer
+                self._writer.commit()
+            except Exception:
+                self._writer.rollback()
+                raise
 
     def create_tables(self):
-        """Создает все необходимые таблицы, если они еще не существуют."""
-        
-        # Таблица пользователей
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY,
-                username TEXT,
-                full_name TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Таблица категорий
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS categories (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL UNIQUE
-            )
-        ''')
-        
-        # Таблица инструментов
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS tools (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                description TEXT,
-                category_id INTEGER,
-                price_1_day INTEGER,
-                price_2_days INTEGER,
-                price_3_days INTEGER,
-                price_4_days INTEGER,
-                price_5_days INTEGER,
-                price_6_days INTEGER,
-                price_7_days INTEGER,
-                price_14_days INTEGER,
-                price_30_days INTEGER,
-                deposit INTEGER,
-                image_url TEXT,
-                available BOOLEAN DEFAULT TRUE
-            )
-        ''')
-        
-        # Таблица заявок
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS applications (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,
-                service_name TEXT,
-                rental_period TEXT,
-                application_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                customer_name TEXT,
-                phone TEXT,
-                status TEXT DEFAULT 'new'
-            )
-        ''')
-        
-        # Добавляем категории и инструменты
+        """Приводит схему БД к актуальной версии через миграции."""
+        with self._write_lock:
+            apply_migrations(self._writer)
+        print("✅ База данных инициализирована")
+
+    def sync_catalog(self):
+        """Добавляет категории и импортирует инструменты из CSV, затем перезагружает каталог."""
         self.add_categories()
         self.import_tools_from_csv()
-        
-        self.conn.commit()
-        print("✅ База данных инициализирована")
+
+    def get_catalog_state(self):
+        """
+        Состояние каталога в БД для проверки снимка быстрого старта.
+
+        Returns:
+            tuple: (хеш последнего импортированного CSV, версия каталога)
+        """
+        return self._get_meta('tools_csv_hash'), self._get_meta('catalog_version')
 
     def add_categories(self):
         """Добавление категорий"""
@@ -109,124 +222,821 @@ class Database:
         # Преобразуем в правильный формат
         categories_data = [(name,) for name in categories]
 
-        self.cursor.executemany('''
-            INSERT OR IGNORE INTO categories (name) VALUES (?)
-        ''', categories_data)
-        self.conn.commit()
+        with self._write() as conn:
+            conn.executemany('''
+                INSERT OR IGNORE INTO categories (name) VALUES (?)
+            ''', categories_data)
         print(f"✅ Добавлено {len(categories)} категорий")
 
-    def import_tools_from_csv(self, csv_file_path='tools.csv'):
-        """Импорт инструментов из CSV файла"""
+    def import_tools_from_csv(self, csv_file_path=CSV_FILE_PATH):
+        """
+        Инкрементальный импорт инструментов из CSV файла.
+
+        Строки сопоставляются с таблицей tools по названию инструмента,
+        поэтому ID существующих инструментов не меняются и кнопки
+        инструментов в старых сообщениях продолжают работать.
+        В БД применяется только разница (добавления, изменения, удаления)
+        одной транзакцией. Если хеш файла совпадает с хешем последнего
+        импорта, работа пропускается целиком.
+        """
         try:
-            with open(csv_file_path, 'r', encoding='utf-8') as file:
-                csv_reader = csv.DictReader(file)
-                tools = []
-                
-                for row in csv_reader:
-                    tools.append((
-                        row['name'],
-                        row['description'],
-                        int(row['category_id']),
-                        int(row['price_1_day']),
-                        int(row['price_2_days']),
-                        int(row['price_3_days']),
-                        int(row['price_4_days']),
-                        int(row['price_5_days']),
-                        int(row['price_6_days']),
-                        int(row['price_7_days']),
-                        int(row['price_14_days']),
-                        int(row['price_30_days']),
-                        int(row['deposit']),
-                        row.get('image_url', '')
-                    ))
-                
-                # Очищаем и заполняем таблицу
-                self.cursor.execute("DELETE FROM tools")
-                self.cursor.executemany('''
-                    INSERT INTO tools 
-                    (name, description, category_id, price_1_day, price_2_days, price_3_days, price_4_days, 
-                     price_5_days, price_6_days, price_7_days, price_14_days, price_30_days, deposit, image_url)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', tools)
-                
-                self.conn.commit()
-                print(f"✅ Загружено {len(tools)} инструментов из tools.csv")
+            with open(csv_file_path, 'rb') as file:
+                content = file.read()
+            file_hash = hashlib.sha256(content).hexdigest()
+
+            if file_hash == self._get_meta('tools_csv_hash'):
+                print(f"✅ Файл {csv_file_path} не изменился, импорт пропущен")
+            else:
+                tools = self._read_tools_csv(content.decode('utf-8'))
+                with self._write() as conn:
+                    inserted, updated, deleted = self._apply_tools_diff(conn, tools)
+                    self._set_meta(conn, 'tools_csv_hash', file_hash)
+                print(
+                    f"✅ Импорт {csv_file_path}: добавлено {inserted}, "
+                    f"обновлено {updated}, удалено {deleted}"
+                )
                 
         except FileNotFoundError:
             print("❌ Файл tools.csv не найден. Создайте файл с инструментами.")
         except Exception as e:
             print(f"❌ Ошибка загрузки инструментов: {e}")
+        
+        # Каталог в памяти пересобирается даже при ошибке импорта,
+        # чтобы он соответствовал текущему содержимому БД
+        self._notify_catalog_changed()
 
-    
+    def _read_tools_csv(self, text):
+        """Разбирает CSV в словарь {название: кортеж полей TOOL_IMPORT_COLUMNS}."""
+        tools = {}
+        for row in csv.DictReader(io.StringIO(text)):
+            name = row['name']
+            if name in tools:
+                print(f"⚠️ Повторяющийся инструмент в CSV пропущен: {name}")
+                continue
+            tools[name] = (
+                name,
+                row['description'],
+                int(row['category_id']),
+                int(row['price_1_day']),
+                int(row['price_2_days']),
+                int(row['price_3_days']),
+                int(row['price_4_days']),
+                int(row['price_5_days']),
+                int(row['price_6_days']),
+                int(row['price_7_days']),
+                int(row['price_14_days']),
+                int(row['price_30_days']),
+                int(row['deposit']),
+                row.get('image_url', ''),
+                # Колонка units необязательна: по умолчанию одна единица
+                int(row.get('units') or 1)
+            )
+        return tools
+
+    def _apply_tools_diff(self, conn, tools):
+        """
+        Применяет к таблице tools разницу с данными из CSV.
+
+        Returns:
+            tuple: Количество добавленных, обновленных и удаленных строк
+        """
+        columns = ", ".join(TOOL_IMPORT_COLUMNS)
+        existing = {}
+        for row in conn.execute(f"SELECT id, {columns} FROM tools"):
+            existing[row[1]] = (row[0], tuple(row[1:]))
+
+        inserts = [values for name, values in tools.items() if name not in existing]
+        updates = [
+            values[1:] + (existing[name][0],)
+            for name, values in tools.items()
+            if name in existing and existing[name][1] != values
+        ]
+        deletes = [(tool_id,) for name, (tool_id, _) in existing.items() if name not in tools]
+
+        placeholders = ", ".join("?" for _ in TOOL_IMPORT_COLUMNS)
+        assignments = ", ".join(f"{column} = ?" for column in TOOL_IMPORT_COLUMNS[1:])
+        conn.executemany(f"INSERT INTO tools ({columns}) VALUES ({placeholders})", inserts)
+        conn.executemany(f"UPDATE tools SET {assignments} WHERE id = ?", updates)
+        conn.executemany("DELETE FROM tools WHERE id = ?", deletes)
+        return len(inserts), len(updates), len(deletes)
+
+    def _get_meta(self, key):
+        """Читает служебное значение из таблицы catalog_meta."""
+        with self._write_lock:
+            row = self._writer.execute(
+                "SELECT value FROM catalog_meta WHERE key = ?", (key,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, conn, key, value):
+        """Сохраняет служебное значение в таблицу catalog_meta."""
+        conn.execute('''
+            INSERT INTO catalog_meta (key, value) VALUES (?, ?)
+            ON CONFLICT(key) DO UPDATE SET value = excluded.value
+        ''', (key, value))
 
     def add_user(self, user_id, username, full_name):
         """Добавление пользователя"""
-        self.cursor.execute('''
-            INSERT OR IGNORE INTO users (id, username, full_name) 
-            VALUES (?, ?, ?)
-        ''', (user_id, username, full_name))
-        self.conn.commit()
-
-    def add_application(self, user_id, service_name, customer_name, phone, rental_period="не указан"):
-        """Добавление заявки в базу"""
-        self.cursor.execute('''
-            INSERT INTO applications (user_id, service_name, customer_name, phone, rental_period)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (user_id, service_name, customer_name, phone, rental_period))
-        self.conn.commit()
-        return self.cursor.lastrowid
+        with self._write() as conn:
+            conn.execute('''
+                INSERT OR IGNORE INTO users (id, username, full_name) 
+                VALUES (?, ?, ?)
+            ''', (user_id, username, full_name))
+
+    def upsert_users(self, users):
+        """
+        Пакетное добавление/обновление пользователей одной транзакцией.
+
+        Args:
+            users (list): Кортежи (id, username, full_name, last_seen)
+        """
+        with self._write() as conn:
+            conn.executemany('''
+                INSERT INTO users (id, username, full_name, last_seen)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(id) DO UPDATE SET
+                    username = excluded.username,
+                    full_name = excluded.full_name,
+                    last_seen = excluded.last_seen
+            ''', users)
+
+    def add_application(self, user_id, service_name, customer_name, phone, rental_period="не указан",
+                        tool_id=None, notify_chat_ids=(), reservation=None):
+        """
+        Добавление заявки в базу.
+        Уведомления для notify_chat_ids ставятся в notification_outbox
+        в той же транзакции, поэтому не теряются при сбое отправки или перезапуске.
+
+        Даты reservation = (start_date, end_date, units) инструмента tool_id
+        записываются как запрошенная бронь: единицу она не занимает, пока
+        администратор не обработает заявку (mark_application_processed).
+        Если на эти даты все единицы уже заняты подтвержденными бронями,
+        заявка не создается.
+
+        Raises:
+            ReservationConflict: Свободных единиц на эти даты не осталось
+        """
+        with self._write() as conn:
+            if reservation:
+                start_date, end_date, units = reservation
+                if self._free_units(conn, tool_id, start_date, end_date) < units:
+                    raise ReservationConflict(tool_id)
+
+            cursor = conn.execute('''
+                INSERT INTO applications (user_id, service_name, customer_name, phone, rental_period, tool_id)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (user_id, service_name, customer_name, phone, rental_period, tool_id))
+            application_id = cursor.lastrowid
+            if reservation:
+                conn.execute('''
+                    INSERT INTO reservations (application_id, tool_id, start_date, end_date, units, status)
+                    VALUES (?, ?, ?, ?, ?, 'requested')
+                ''', (application_id, tool_id, start_date, end_date, units))
+            conn.executemany('''
+                INSERT INTO notification_outbox (kind, application_id, chat_id, next_attempt_at)
+                VALUES ('new_application', ?, ?, ?)
+            ''', [(application_id, chat_id, time.time()) for chat_id in notify_chat_ids])
+        return application_id
+
+    def _free_units(self, conn, tool_id, start_date, end_date):
+        """Свободные на весь период единицы инструмента (внутри транзакции писателя)."""
+        row = conn.execute("SELECT units FROM tools WHERE id = ?", (tool_id,)).fetchone()
+        if not row:
+            return 0
+        busy = busy_units(self._query_reservations(conn, [tool_id], start_date, end_date), start_date, end_date)
+        return row[0] - busy.get(tool_id, 0)
+
+    def _query_reservations(self, conn, tool_ids, start_date, end_date):
+        """Подтвержденные брони инструментов, пересекающие период (по индексу idx_reservations_tool_dates)."""
+        placeholders = ", ".join("?" for _ in tool_ids)
+        return conn.execute(f'''
+            SELECT tool_id, start_date, end_date, units FROM reservations
+            WHERE status = 'active' AND tool_id IN ({placeholders}) AND end_date >= ? AND start_date <= ?
+        ''', (*tool_ids, start_date, end_date)).fetchall()
+
+    def get_busy_units(self, tool_ids, start_date, end_date):
+        """
+        Сколько единиц инструментов занято бронями в периоде.
+
+        Args:
+            tool_ids (list): ID инструментов
+            start_date (str): Начало периода 'YYYY-MM-DD'
+            end_date (str): Конец периода включительно
+
+        Returns:
+            dict: {ID инструмента: занято единиц}; свободные инструменты не попадают
+        """
+        if not tool_ids:
+            return {}
+        with self._read() as conn:
+            reservations = self._query_reservations(conn, tool_ids, start_date, end_date)
+        return busy_units(reservations, start_date, end_date)
 
     def get_all_categories(self):
         """Получить все категории"""
-        self.cursor.execute("SELECT * FROM categories ORDER BY name")
-        return self.cursor.fetchall()
+        with self._read() as conn:
+            return conn.execute("SELECT * FROM categories ORDER BY name").fetchall()
 
     def get_tools_by_category(self, category_id):
         """Получить инструменты по категории"""
-        self.cursor.execute('''
-            SELECT * FROM tools 
-            WHERE category_id = ? AND available = TRUE 
-            ORDER BY price_1_day
-        ''', (category_id,))
-        return self.cursor.fetchall()
+        with self._read() as conn:
+            return conn.execute('''
+                SELECT * FROM tools 
+                WHERE category_id = ? AND available = TRUE 
+                ORDER BY price_1_day
+            ''', (category_id,)).fetchall()
+
+    def get_tools_page(self, category_id, after=None, limit=TOOLS_PAGE_SIZE):
+        """
+        Получить страницу инструментов категории (keyset-пагинация).
+
+        Args:
+            category_id (int): ID категории
+            after (tuple): Ключ (price_1_day, id) последнего инструмента предыдущей страницы
+            limit (int): Размер страницы
+        """
+        after_price, after_id = after if after else (-1, -1)
+        with self._read() as conn:
+            return conn.execute('''
+                SELECT * FROM tools 
+                WHERE category_id = ? AND available = TRUE 
+                  AND (price_1_day, id) > (?, ?)
+                ORDER BY price_1_day, id
+                LIMIT ?
+            ''', (category_id, after_price, after_id, limit)).fetchall()
+
+    def search_tools(self, query, limit=SEARCH_RESULTS_LIMIT):
+        """
+        Полнотекстовый поиск доступных инструментов по названию и описанию.
+
+        Все слова запроса ищутся по началу слова; если вместе они ничего
+        не находят, выполняется поиск по любому из слов. Совпадения
+        в названии весят больше совпадений в описании.
+
+        Args:
+            query (str): Текст запроса пользователя
+            limit (int): Максимальное количество результатов
+
+        Returns:
+            list: ID инструментов в порядке релевантности
+        """
+        terms = fts_terms(query)
+        if not terms:
+            return []
+
+        with self._read() as conn:
+            for operator in (" AND ", " OR "):
+                rows = conn.execute('''
+                    SELECT t.id FROM tools_fts
+                    JOIN tools t ON t.id = tools_fts.rowid
+                    WHERE tools_fts MATCH ? AND t.available = TRUE
+                    ORDER BY bm25(tools_fts, 10.0, 1.0)
+                    LIMIT ?
+                ''', (operator.join(terms), limit)).fetchall()
+                if rows or len(terms) == 1:
+                    break
+        return [row[0] for row in rows]
 
     def get_category_by_id(self, category_id):
         """Получить категорию по ID"""
-        self.cursor.execute("SELECT * FROM categories WHERE id = ?", (category_id,))
-        return self.cursor.fetchone()
+        with self._read() as conn:
+            return conn.execute("SELECT * FROM categories WHERE id = ?", (category_id,)).fetchone()
 
     def get_tool_by_id(self, tool_id):
         """Получить инструмент по ID"""
-        self.cursor.execute("SELECT * FROM tools WHERE id = ?", (tool_id,))
-        return self.cursor.fetchone()
+        with self._read() as conn:
+            return conn.execute("SELECT * FROM tools WHERE id = ?", (tool_id,)).fetchone()
     
     def get_new_applications(self):
         """Получить новые заявки"""
-        self.cursor.execute('''
-            SELECT a.*, u.username, u.full_name as user_full_name 
-            FROM applications a 
-            LEFT JOIN users u ON a.user_id = u.id 
-            WHERE a.status = 'new' 
-            ORDER BY a.application_date DESC
-        ''')
-        return self.cursor.fetchall()
+        with self._read() as conn:
+            return conn.execute(f'''
+                SELECT {APPLICATION_COLUMNS} 
+                FROM applications a 
+                LEFT JOIN users u ON a.user_id = u.id 
+                WHERE a.status = 'new' 
+                ORDER BY a.application_date DESC
+            ''').fetchall()
 
     def mark_application_processed(self, application_id):
-        """Пометить заявку как обработанную"""
-        self.cursor.execute('''
-            UPDATE applications SET status = 'processed' WHERE id = ?
-        ''', (application_id,))
-        self.conn.commit()
+        """
+        Пометить заявку как обработанную и подтвердить запрошенную бронь.
+
+        Бронь становится активной, если на ее даты еще есть свободная
+        единица; проверка и подтверждение идут в той же транзакции писателя.
+
+        Returns:
+            tuple: (start_date, end_date, подтверждена ли бронь) или None, если брони не запрашивали
+        """
+        with self._write() as conn:
+            conn.execute('''
+                UPDATE applications SET status = 'processed' WHERE id = ?
+            ''', (application_id,))
+            request = conn.execute('''
+                SELECT id, tool_id, start_date, end_date, units FROM reservations
+                WHERE application_id = ? AND status = 'requested'
+            ''', (application_id,)).fetchone()
+            if not request:
+                return None
+            reservation_id, tool_id, start_date, end_date, units = request
+            booked = self._free_units(conn, tool_id, start_date, end_date) >= units
+            if booked:
+                conn.execute("UPDATE reservations SET status = 'active' WHERE id = ?", (reservation_id,))
+        return start_date, end_date, booked
+
+    def get_application_detail(self, application_id):
+        """
+        Получить заявку вместе с ее последней бронью (для карточки заявки).
+
+        Returns:
+            tuple: (заявка, (start_date, end_date, units, status) или None);
+                   заявка None, если не найдена
+        """
+        with self._read() as conn:
+            application = conn.execute(f'''
+                SELECT {APPLICATION_COLUMNS} 
+                FROM applications a 
+                LEFT JOIN users u ON a.user_id = u.id 
+                WHERE a.id = ?
+            ''', (application_id,)).fetchone()
+            if not application:
+                return None, None
+            reservation = conn.execute('''
+                SELECT start_date, end_date, units, status FROM reservations
+                WHERE application_id = ?
+                ORDER BY id DESC LIMIT 1
+            ''', (application_id,)).fetchone()
+        return application, reservation
+
+    def release_reservation(self, application_id):
+        """
+        Снять бронь по заявке (отказ клиента, возврат инструмента раньше срока).
+
+        Returns:
+            bool: Была ли снята запрошенная или подтвержденная бронь
+        """
+        with self._write() as conn:
+            return conn.execute('''
+                UPDATE reservations SET status = 'released'
+                WHERE application_id = ? AND status != 'released'
+            ''', (application_id,)).rowcount > 0
 
     def get_application_by_id(self, application_id):
         """Получить заявку по ID"""
-        self.cursor.execute('''
-            SELECT a.*, u.username, u.full_name as user_full_name 
-            FROM applications a 
-            LEFT JOIN users u ON a.user_id = u.id 
-            WHERE a.id = ?
-        ''', (application_id,))
-        return self.cursor.fetchone()
+        with self._read() as conn:
+            return conn.execute(f'''
+                SELECT {APPLICATION_COLUMNS} 
+                FROM applications a 
+                LEFT JOIN users u ON a.user_id = u.id 
+                WHERE a.id = ?
+            ''', (application_id,)).fetchone()
+
+    def get_recent_applications(self, limit=15):
+        """Получить последние заявки"""
+        with self._read() as conn:
+            return conn.execute(f'''
+                SELECT {APPLICATION_COLUMNS} 
+                FROM applications a 
+                LEFT JOIN users u ON a.user_id = u.id 
+                ORDER BY a.application_date DESC LIMIT ?
+            ''', (limit,)).fetchall()
+
+    def get_applications_page(self, status=None, cursor=None, direction="next", limit=ADMIN_PAGE_SIZE):
+        """
+        Получить страницу заявок (keyset-пагинация по application_date, id).
+
+        Заявки упорядочены от новых к старым. Курсор - ID заявки на краю
+        текущей страницы: direction="next" выдает более старые заявки после
+        него, direction="prev" - более новые перед ним.
+
+        Args:
+            status (str): Фильтр по статусу ('new', 'processed') или None для всех
+            cursor (int): ID заявки-курсора или None для первой страницы
+            direction (str): "next" или "prev"
+            limit (int): Размер страницы
+
+        Returns:
+            tuple: (заявки, общее число заявок, есть ли более новые, есть ли более старые)
+
+        Общее число берется из счетчиков stats_totals, которые ведут триггеры,
+        поэтому перелистывание не пересчитывает заявки COUNT(*).
+        """
+        conditions = []
+        params = []
+        if status:
+            conditions.append("a.status = ?")
+            params.append(status)
+        if cursor:
+            operator = "<" if direction == "next" else ">"
+            conditions.append(f'''(a.application_date, a.id) {operator}
+                (SELECT application_date, id FROM applications WHERE id = ?)''')
+            params.append(cursor)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        order = "DESC" if direction == "next" else "ASC"
+
+        with self._read() as conn:
+            # Берем на одну строку больше, чтобы узнать, есть ли следующая страница
+            rows = conn.execute(f'''
+                SELECT {APPLICATION_COLUMNS} 
+                FROM applications a 
+                LEFT JOIN users u ON a.user_id = u.id 
+                {where}
+                ORDER BY a.application_date {order}, a.id {order}
+                LIMIT ?
+            ''', (*params, limit + 1)).fetchall()
+            total = conn.execute(
+                f"SELECT {STATUS_TOTAL_COLUMNS[status]} FROM stats_totals WHERE id = 1"
+            ).fetchone()[0]
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        if direction == "next":
+            return rows, total, cursor is not None, has_more
+        rows.reverse()
+        return rows, total, has_more, True
+
+    def get_applications_stats(self):
+        """
+        Получить статистику по заявкам из счетчиков stats_totals.
+
+        Returns:
+            tuple: (всего, новые, обработанные, уникальные клиенты)
+        """
+        with self._read() as conn:
+            return conn.execute('''
+                SELECT total, new_count, processed_count, unique_customers
+                FROM stats_totals WHERE id = 1
+            ''').fetchone()
+
+    def get_daily_stats(self, days=7):
+        """Получить заявки по дням за последние days дней: [(день, заявки, обработано)]"""
+        with self._read() as conn:
+            return conn.execute('''
+                SELECT day, applications, processed FROM stats_daily
+                WHERE day > date('now', ?)
+                ORDER BY day DESC
+            ''', (f"-{days} days",)).fetchall()
+
+    def get_top_tools_stats(self, limit=5):
+        """Получить самые востребованные инструменты: [(tool_id, заявки)]"""
+        with self._read() as conn:
+            return conn.execute('''
+                SELECT tool_id, applications FROM stats_tools
+                ORDER BY applications DESC LIMIT ?
+            ''', (limit,)).fetchall()
+
+    def get_top_categories_stats(self, limit=5):
+        """Получить самые востребованные категории: [(category_id, заявки)]"""
+        with self._read() as conn:
+            return conn.execute('''
+                SELECT category_id, applications FROM stats_categories
+                ORDER BY applications DESC LIMIT ?
+            ''', (limit,)).fetchall()
+
+    def append_events(self, events, rollups):
+        """
+        Дописать пачку событий и обновить почасовые агрегаты одной транзакцией.
+
+        Args:
+            events (list): Кортежи (created_at, event, user_id, tool_id)
+            rollups (list): Кортежи (hour, event, tool_id, count)
+        """
+        with self._write() as conn:
+            conn.executemany(
+                "INSERT INTO events (created_at, event, user_id, tool_id) VALUES (?, ?, ?, ?)",
+                events
+            )
+            conn.executemany('''
+                INSERT INTO events_hourly (hour, event, tool_id, count)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT (hour, event, tool_id) DO UPDATE SET count = count + excluded.count
+            ''', rollups)
+
+    def get_funnel_stats(self, since_hour):
+        """Получить количество событий каждого типа с часа since_hour: {event: count}"""
+        with self._read() as conn:
+            return dict(conn.execute('''
+                SELECT event, SUM(count) FROM events_hourly
+                WHERE hour >= ?
+                GROUP BY event
+            ''', (since_hour,)).fetchall())
+
+    def get_top_viewed_tools(self, since_hour, limit=5):
+        """Получить самые просматриваемые инструменты с часа since_hour: [(tool_id, просмотры)]"""
+        with self._read() as conn:
+            return conn.execute('''
+                SELECT tool_id, SUM(count) AS views FROM events_hourly
+                WHERE hour >= ? AND event = 'tool_view'
+                GROUP BY tool_id
+                ORDER BY views DESC
+                LIMIT ?
+            ''', (since_hour, limit)).fetchall()
+
+    def rebuild_stats(self):
+        """
+        Пересчитать счетчики статистики с нуля.
+
+        Returns:
+            tuple: Сводка stats_totals до и после пересчета (для проверки расхождений)
+        """
+        with self._write() as conn:
+            before = conn.execute('''
+                SELECT total, new_count, processed_count, unique_customers
+                FROM stats_totals WHERE id = 1
+            ''').fetchone()
+            rebuild_stats(conn)
+            after = conn.execute('''
+                SELECT total, new_count, processed_count, unique_customers
+                FROM stats_totals WHERE id = 1
+            ''').fetchone()
+        return before, after
+
+    def claim_due_notifications(self, now, limit, lease):
+        """
+        Забрать к отправке уведомления, время которых наступило.
+        Забранные строки откладываются на lease секунд, чтобы другой процесс
+        (несколько webhook-воркеров) не отправил их повторно.
+
+        Returns:
+            list: Кортежи (id, kind, application_id, chat_id, attempts)
+        """
+        with self._write() as conn:
+            return conn.execute('''
+                UPDATE notification_outbox SET next_attempt_at = ?
+                WHERE id IN (
+                    SELECT id FROM notification_outbox
+                    WHERE status = 'pending' AND next_attempt_at <= ?
+                    ORDER BY next_attempt_at
+                    LIMIT ?
+                )
+                RETURNING id, kind, application_id, chat_id, attempts
+            ''', (now + lease, now, limit)).fetchall()
+
+    def get_next_notification_time(self):
+        """Получить время ближайшей запланированной отправки или None"""
+        with self._read() as conn:
+            return conn.execute(
+                "SELECT MIN(next_attempt_at) FROM notification_outbox WHERE status = 'pending'"
+            ).fetchone()[0]
+
+    def complete_notifications(self, sent_ids, retries):
+        """
+        Сохранить результаты отправки пачки уведомлений одной транзакцией.
+
+        Args:
+            sent_ids (list): ID доставленных уведомлений
+            retries (list): Кортежи (status, attempts, next_attempt_at, last_error, id)
+                для неудачных попыток: 'pending' - повторить, 'failed' - отказаться
+        """
+        with self._write() as conn:
+            conn.executemany(
+                "UPDATE notification_outbox SET status = 'sent', attempts = attempts + 1 WHERE id = ?",
+                [(notification_id,) for notification_id in sent_ids]
+            )
+            conn.executemany('''
+                UPDATE notification_outbox
+                SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ?
+                WHERE id = ?
+            ''', retries)
+
+    def get_fsm_session(self, key):
+        """
+        Получить сохраненную сессию FSM.
+
+        Returns:
+            tuple: (state, data JSON, updated_at) или None
+        """
+        with self._read() as conn:
+            return conn.execute(
+                "SELECT state, data, updated_at FROM fsm_sessions WHERE key = ?", (key,)
+            ).fetchone()
+
+    def save_fsm_sessions(self, sessions):
+        """
+        Пакетное сохранение сессий FSM одной транзакцией.
+        Сессии без состояния и данных удаляются.
+
+        Args:
+            sessions (list): Кортежи (key, state, data JSON, updated_at)
+        """
+        empty = [(key,) for key, state, data, updated_at in sessions if state is None and data == "{}"]
+        filled = [session for session in sessions if session[1] is not None or session[2] != "{}"]
+        with self._write() as conn:
+            conn.executemany("DELETE FROM fsm_sessions WHERE key = ?", empty)
+            conn.executemany('''
+                INSERT INTO fsm_sessions (key, state, data, updated_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET
+                    state = excluded.state,
+                    data = excluded.data,
+                    updated_at = excluded.updated_at
+            ''', filled)
+
+    def set_fsm_state(self, key, state, updated_at, expired_before):
+        """
+        Записать только состояние сессии FSM (общее хранилище нескольких процессов).
+        Данные сессии не перезаписываются, поэтому запись состояния одним
+        процессом не затирает данные, записанные другим. Данные сессии,
+        не менявшейся с expired_before, сбрасываются.
+        """
+        with self._write() as conn:
+            conn.execute('''
+                INSERT INTO fsm_sessions (key, state, updated_at) VALUES (?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET
+                    state = excluded.state,
+                    data = CASE WHEN updated_at < ? THEN '{}' ELSE data END,
+                    updated_at = excluded.updated_at
+            ''', (key, state, updated_at, expired_before))
+
+    def set_fsm_data(self, key, data, updated_at, expired_before):
+        """Записать только данные сессии FSM (JSON), не трогая состояние (кроме брошенной сессии)."""
+        with self._write() as conn:
+            conn.execute('''
+                INSERT INTO fsm_sessions (key, data, updated_at) VALUES (?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET
+                    state = CASE WHEN updated_at < ? THEN NULL ELSE state END,
+                    data = excluded.data,
+                    updated_at = excluded.updated_at
+            ''', (key, data, updated_at, expired_before))
+
+    def delete_expired_fsm_sessions(self, before):
+        """
+        Удалить сессии FSM, не менявшиеся с момента before.
+
+        Args:
+            before (float): Граница времени (Unix timestamp)
+
+        Returns:
+            int: Количество удаленных сессий
+        """
+        with self._write() as conn:
+            return conn.execute("DELETE FROM fsm_sessions WHERE updated_at < ?", (before,)).rowcount
+
+
+class AsyncDatabase:
+    """
+    Асинхронная обертка над Database.
+
+    Все обращения к SQLite выполняются в потоках-исполнителях,
+    поэтому медленный commit() не блокирует event loop aiogram.
+    Записи идут через один поток (соединение-писатель одно),
+    чтение — через пул потоков по числу read-only соединений.
+    """
+
+    def __init__(self, database):
+        self.db = database
+        self._write_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-write")
+        self._read_executor = ThreadPoolExecutor(
+            max_workers=database.read_pool_size, thread_name_prefix="db-read"
+        )
+        self._query_listeners = []
+
+    def add_query_listener(self, listener):
+        """
+        Подписывает функцию на завершение каждого обращения к БД.
+
+        Args:
+            listener: Функция listener(seconds), вызывается в event loop
+                с длительностью обращения, включая ожидание потока
+        """
+        self._query_listeners.append(listener)
+
+    async def _run(self, executor, func, *args, **kwargs):
+        """Выполняет синхронный метод Database в потоке исполнителя."""
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        try:
+            return await loop.run_in_executor(executor, lambda: func(*args, **kwargs))
+        finally:
+            elapsed = time.perf_counter() - started
+            for listener in self._query_listeners:
+                listener(elapsed)
+
+    async def _read(self, func, *args, **kwargs):
+        return await self._run(self._read_executor, func, *args, **kwargs)
+
+    async def _write(self, func, *args, **kwargs):
+        return await self._run(self._write_executor, func, *args, **kwargs)
+
+    async def connect(self, fast_start=False):
+        await self._write(self.db.connect, fast_start)
+
+    async def sync_catalog(self):
+        await self._write(self.db.sync_catalog)
+
+    async def get_catalog_state(self):
+        return await self._write(self.db.get_catalog_state)
+
+    async def close(self):
+        await self._write(self.db.close)
+        self._read_executor.shutdown(wait=True)
+        self._write_executor.shutdown(wait=True)
+
+    async def add_user(self, user_id, username, full_name):
+        await self._write(self.db.add_user, user_id, username, full_name)
+
+    async def upsert_users(self, users):
+        await self._write(self.db.upsert_users, users)
+
+    async def add_application(self, user_id, service_name, customer_name, phone, rental_period="не указан",
+                              tool_id=None, notify_chat_ids=(), reservation=None):
+        return await self._write(
+            self.db.add_application, user_id, service_name, customer_name, phone, rental_period, tool_id,
+            notify_chat_ids, reservation
+        )
+
+    async def get_busy_units(self, tool_ids, start_date, end_date):
+        return await self._read(self.db.get_busy_units, tool_ids, start_date, end_date)
+
+    async def get_all_categories(self):
+        return await self._read(self.db.get_all_categories)
+
+    async def get_tools_by_category(self, category_id):
+        return await self._read(self.db.get_tools_by_category, category_id)
+
+    async def get_tools_page(self, category_id, after=None, limit=TOOLS_PAGE_SIZE):
+        return await self._read(self.db.get_tools_page, category_id, after, limit)
+
+    async def search_tools(self, query, limit=SEARCH_RESULTS_LIMIT):
+        return await self._read(self.db.search_tools, query, limit)
+
+    async def get_category_by_id(self, category_id):
+        return await self._read(self.db.get_category_by_id, category_id)
+
+    async def get_tool_by_id(self, tool_id):
+        return await self._read(self.db.get_tool_by_id, tool_id)
+
+    async def get_new_applications(self):
+        return await self._read(self.db.get_new_applications)
+
+    async def mark_application_processed(self, application_id):
+        return await self._write(self.db.mark_application_processed, application_id)
+
+    async def get_application_detail(self, application_id):
+        return await self._read(self.db.get_application_detail, application_id)
+
+    async def release_reservation(self, application_id):
+        return await self._write(self.db.release_reservation, application_id)
+
+    async def get_application_by_id(self, application_id):
+        return await self._read(self.db.get_application_by_id, application_id)
+
+    async def get_recent_applications(self, limit=15):
+        return await self._read(self.db.get_recent_applications, limit)
+
+    async def get_applications_page(self, status=None, cursor=None, direction="next", limit=ADMIN_PAGE_SIZE):
+        return await self._read(self.db.get_applications_page, status, cursor, direction, limit)
+
+    async def get_applications_stats(self):
+        return await self._read(self.db.get_applications_stats)
+
+    async def get_daily_stats(self, days=7):
+        return await self._read(self.db.get_daily_stats, days)
+
+    async def get_top_tools_stats(self, limit=5):
+        return await self._read(self.db.get_top_tools_stats, limit)
+
+    async def get_top_categories_stats(self, limit=5):
+        return await self._read(self.db.get_top_categories_stats, limit)
+
+    async def append_events(self, events, rollups):
+        await self._write(self.db.append_events, events, rollups)
+
+    async def get_funnel_stats(self, since_hour):
+        return await self._read(self.db.get_funnel_stats, since_hour)
+
+    async def get_top_viewed_tools(self, since_hour, limit=5):
+        return await self._read(self.db.get_top_viewed_tools, since_hour, limit)
+
+    async def rebuild_stats(self):
+        return await self._write(self.db.rebuild_stats)
+
+    async def claim_due_notifications(self, now, limit, lease):
+        return await self._write(self.db.claim_due_notifications, now, limit, lease)
+
+    async def get_next_notification_time(self):
+        return await self._read(self.db.get_next_notification_time)
+
+    async def complete_notifications(self, sent_ids, retries):
+        await self._write(self.db.complete_notifications, sent_ids, retries)
+
+    async def get_fsm_session(self, key):
+        return await self._read(self.db.get_fsm_session, key)
+
+    async def save_fsm_sessions(self, sessions):
+        await self._write(self.db.save_fsm_sessions, sessions)
+
+    async def set_fsm_state(self, key, state, updated_at, expired_before):
+        await self._write(self.db.set_fsm_state, key, state, updated_at, expired_before)
+
+    async def set_fsm_data(self, key, data, updated_at, expired_before):
+        await self._write(self.db.set_fsm_data, key, data, updated_at, expired_before)
+
+    async def delete_expired_fsm_sessions(self, before):
+        return await self._write(self.db.delete_expired_fsm_sessions, before)
 
 # Создаем глобальный экземпляр БД
-db = Database()
\ No newline at end of file
+db = Database()
+
+# Асинхронный интерфейс к БД для обработчиков
+async_db = AsyncDatabase(db)
\ No newline at end of file
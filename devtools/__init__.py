@@ -0,0 +1,12 @@
+"""
+Инструменты разработчика для офлайн-проверки бота.
+
+Не используются при работе бота: подменяют сеть Telegram,
+чтобы прогонять обновления через настоящий Dispatcher локально.
+"""
+
+from . import fake_session
+
+__all__ = [
+    'fake_session'
+]
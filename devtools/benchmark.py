@@ -0,0 +1,258 @@
+"""
+Офлайн-бенчмарк обработки апдейтов.
+
+Собирает настоящий Dispatcher через bot.register_handlers(), подменяет
+Bot API фальшивой сессией и воспроизводит синтетический трафик:
+пользователи работают параллельно, каждый отправляет свои апдейты
+последовательно, как в Telegram. Апдейт обрабатывается так же, как
+при polling: метод, возвращенный обработчиком, выполняется сразу после него.
+
+Для каждого сценария выводятся пропускная способность, перцентили
+задержки, число обращений к БД и запросов к Bot API на апдейт.
+Результаты можно сохранить как базовые и сравнивать с ними следующие
+прогоны, чтобы видеть регрессии.
+
+Запуск из корня проекта:
+    python -m devtools.benchmark                  # все сценарии, сравнение с базовыми
+    python -m devtools.benchmark --save           # сохранить результаты как базовые
+    python -m devtools.benchmark catalog_burst    # один сценарий
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import time
+from pathlib import Path
+
+# Пользователи бенчмарка шлют апдейты без пауз: лимит частоты отбросил бы
+# большую часть из них, а замерять нужно сами обработчики
+os.environ.setdefault("THROTTLE_ENABLED", "0")
+
+from devtools.fake_session import FakeSession, UpdateFactory, find_callback
+
+from aiogram.methods import TelegramMethod
+
+import bot as bot_module
+from data.config import ADMIN_IDS
+from database import async_db
+from keyboards.callbacks import CategoryPage, ToolCard, PickTool, ApplicationDetail, Inbox
+from services.catalog import catalog
+
+BASELINE_PATH = Path(__file__).with_name("benchmark_baseline.json")
+
+# Допустимое ухудшение относительно базовых результатов
+REGRESSION_THRESHOLD = 0.2
+
+
+class BenchmarkRunner:
+    """Отправляет апдейты в диспетчер и замеряет задержку каждого."""
+
+    def __init__(self, dp, bot, session):
+        self.dp = dp
+        self.bot = bot
+        self.session = session
+        self.updates = UpdateFactory()
+        self.latencies = []
+        self.errors = 0
+        self.db_queries = 0
+        async_db.add_query_listener(self._count_query)
+
+    def _count_query(self, seconds):
+        self.db_queries += 1
+
+    def reset(self):
+        self.latencies = []
+        self.errors = 0
+        self.db_queries = 0
+        self.session.calls.clear()
+
+    async def send(self, update):
+        """Обрабатывает апдейт как polling и возвращает последнюю клавиатуру чата."""
+        started = time.perf_counter()
+        try:
+            result = await self.dp.feed_update(self.bot, update)
+            if isinstance(result, TelegramMethod):
+                await self.bot(result)
+        except Exception:
+            self.errors += 1
+        self.latencies.append((time.perf_counter() - started) * 1000)
+
+        event = update.event
+        user = getattr(event, "from_user", None)
+        return self.session.markups.get(user.id if user else None)
+
+    async def message(self, user, text):
+        return await self.send(self.updates.message(user, text))
+
+    async def callback(self, user, data):
+        return await self.send(self.updates.callback(user, data))
+
+
+# СЦЕНАРИИ
+# Каждый сценарий: setup(runner) готовит данные, user(runner, index) - действия одного пользователя
+
+async def catalog_user(runner, index):
+    """Листает каталог: категории, страницы категории, карточки инструментов."""
+    user = UpdateFactory.user(100000 + index, f"Catalog{index}")
+    rng = random.Random(index)
+    categories = [category for category in catalog.get_all_categories()
+                  if catalog.get_tools_by_category(category.id)]
+
+    await runner.message(user, "🔧 Инструменты")
+    for _ in range(3):
+        category = rng.choice(categories)
+        markup = await runner.callback(user, CategoryPage.of(category.id).pack())
+        next_page = find_callback(markup, f"{CategoryPage.__prefix__}:", text="▶️")
+        if next_page:
+            markup = await runner.callback(user, next_page)
+        tool_button = find_callback(markup, f"{ToolCard.__prefix__}:")
+        if tool_button:
+            markup = await runner.callback(user, tool_button)
+            back = find_callback(markup, f"{CategoryPage.__prefix__}:")
+            if back:
+                await runner.callback(user, back)
+        await runner.callback(user, "back_to_categories")
+
+
+async def application_user(runner, index):
+    """Оформляет заявку от начала до подтверждения с выбором подсказки из каталога."""
+    user = UpdateFactory.user(200000 + index, f"Client{index}")
+    rng = random.Random(index)
+    tools = [tool for category in catalog.get_all_categories()
+             for tool in catalog.get_tools_by_category(category.id)]
+
+    await runner.message(user, "📝 Оставить заявку")
+    markup = await runner.message(user, rng.choice(tools).name.lower())
+    pick = find_callback(markup, f"{PickTool.__prefix__}:")
+    if pick:
+        await runner.callback(user, pick)
+    await runner.message(user, f"{rng.randint(1, 30)} дней")
+    await runner.message(user, f"Клиент Номер {index}")
+    await runner.message(user, f"+7 900 {index:07d}")
+    await runner.callback(user, "confirm_application")
+
+
+async def seed_applications(runner, count=2000):
+    """Заполняет БД заявками для листания админом."""
+    for index in range(count):
+        await async_db.add_application(300000 + index % 500, "Инструмент", f"Клиент {index}",
+                                       "+7 900 000-00-00", "3 дня")
+
+
+async def admin_user(runner, index):
+    """Листает входящие заявки администратора вглубь и открывает заявки."""
+    admin = UpdateFactory.user(ADMIN_IDS[0], "Admin")
+    markup = await runner.callback(admin, "new_applications")
+    for _ in range(10):
+        detail = find_callback(markup, f"{ApplicationDetail.__prefix__}:")
+        if detail:
+            await runner.callback(admin, detail)
+        older = find_callback(markup, f"{Inbox.__prefix__}:", text="▶️")
+        if not older:
+            break
+        markup = await runner.callback(admin, older)
+
+
+SCENARIOS = {
+    # имя: (описание, подготовка, действия пользователя, число пользователей)
+    "catalog_burst": ("Всплеск просмотров каталога", None, catalog_user, 300),
+    "application_flows": ("Параллельное оформление заявок", None, application_user, 200),
+    "admin_paging": ("Листание заявок админами", seed_applications, admin_user, 20),
+}
+
+
+def percentile(values, q):
+    """Перцентиль по отсортированным значениям (метод ближайшего ранга)."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def run_scenario(runner, name):
+    """Выполняет сценарий и возвращает словарь результатов."""
+    description, setup, user_actions, users = SCENARIOS[name]
+    if setup:
+        await setup(runner)
+    runner.reset()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(user_actions(runner, index) for index in range(users)))
+    elapsed = time.perf_counter() - started
+
+    count = len(runner.latencies)
+    return {
+        "updates": count,
+        "errors": runner.errors,
+        "throughput": count / elapsed,
+        "p50": statistics.median(runner.latencies),
+        "p95": percentile(runner.latencies, 0.95),
+        "p99": percentile(runner.latencies, 0.99),
+        "db_per_update": runner.db_queries / count,
+        "api_per_update": len(runner.session.calls) / count,
+    }
+
+
+def compare(name, result, baseline):
+    """Строка сравнения с базовым результатом; ⚠️ при регрессии."""
+    if not baseline or name not in baseline:
+        return "  (нет базового результата)"
+    base = baseline[name]
+    checks = [
+        ("апд/сек", result["throughput"], base["throughput"], True),
+        ("p95", result["p95"], base["p95"], False),
+        ("запросов к БД", result["db_per_update"], base["db_per_update"], False),
+    ]
+    parts = []
+    for label, value, old, higher_is_better in checks:
+        change = (value - old) / old if old else 0.0
+        worse = -change if higher_is_better else change
+        mark = " ⚠️" if worse > REGRESSION_THRESHOLD else ""
+        parts.append(f"{label} {change:+.0%}{mark}")
+    return "  к базовому: " + ", ".join(parts)
+
+
+async def main(names, save):
+    session = FakeSession()
+    bot_module.bot.session = session
+    bot_module.register_handlers()
+    dp, bot = bot_module.dp, bot_module.bot
+    await dp.emit_startup(bot=bot, dispatcher=dp)
+
+    baseline = json.loads(BASELINE_PATH.read_text()) if BASELINE_PATH.exists() else None
+    runner = BenchmarkRunner(dp, bot, session)
+    results = {}
+    try:
+        for name in names:
+            result = await run_scenario(runner, name)
+            results[name] = result
+            print(
+                f"\n▶ {name} - {SCENARIOS[name][0]}\n"
+                f"  апдейтов: {result['updates']} (ошибок: {result['errors']}), "
+                f"{result['throughput']:.0f} апд/сек\n"
+                f"  задержка, мс: p50 {result['p50']:.2f}, p95 {result['p95']:.2f}, p99 {result['p99']:.2f}\n"
+                f"  на апдейт: обращений к БД {result['db_per_update']:.2f}, "
+                f"запросов к API {result['api_per_update']:.2f}"
+            )
+            print(compare(name, result, baseline))
+    finally:
+        await dp.emit_shutdown(bot=bot, dispatcher=dp)
+
+    if save:
+        saved = dict(baseline or {})
+        saved.update(results)
+        BASELINE_PATH.write_text(json.dumps(saved, indent=2, ensure_ascii=False))
+        print(f"\n✅ Базовые результаты сохранены в {BASELINE_PATH}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Офлайн-бенчмарк обработчиков бота")
+    parser.add_argument("scenarios", nargs="*", metavar="scenario",
+                        help=f"Сценарии для запуска: {', '.join(SCENARIOS)} (по умолчанию все)")
+    parser.add_argument("--save", action="store_true", help="Сохранить результаты как базовые")
+    args = parser.parse_args()
+    unknown = [name for name in args.scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"неизвестные сценарии: {', '.join(unknown)}")
+    asyncio.run(main(args.scenarios or list(SCENARIOS), args.save))
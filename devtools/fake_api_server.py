@@ -0,0 +1,458 @@
+"""
+Локальный фальшивый сервер Telegram Bot API для сквозных нагрузочных проверок.
+
+Бот подключается к нему через TELEGRAM_API_URL и работает как обычно:
+в режиме polling забирает обновления через getUpdates, в режиме webhook
+получает их POST-запросами после setWebhook. Сервер отвечает на sendMessage,
+editMessageText, answerCallbackQuery и прочие методы, добавляет заданную
+задержку сети и с заданной долей отвечает 429 RetryAfter.
+
+Население симулированных пользователей проходит сценарии по кнопкам,
+которые бот им присылает: просмотр каталога и оформление заявки.
+Для каждого шага замеряется сквозная задержка, как ее видит пользователь:
+от отправки обновления до первого видимого ответа бота в его чате.
+Сообщения в остальные чаты (уведомления администраторам) считаются отдельно.
+
+Запуск из корня проекта:
+    # сервер и бот в отдельном процессе, 2000 пользователей
+    python -m devtools.fake_api_server --bot polling --users 2000
+    python -m devtools.fake_api_server --bot webhook --users 2000 --latency 0.05 --retry-after-ratio 0.01
+
+    # только сервер: бот запускается вручную с TELEGRAM_API_URL=http://127.0.0.1:8081
+    python -m devtools.fake_api_server --users 500
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import signal
+import sys
+import tempfile
+import time
+from collections import Counter
+
+from devtools.fake_session import BOT_USER, UpdateFactory
+
+from aiohttp import ClientSession, MultipartReader, web
+from aiogram import types
+
+from keyboards.callbacks import CategoryPage, ToolCard, RentTool
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+# Методы, ответ на которые пользователь видит в чате
+VISIBLE_METHODS = {"sendmessage", "editmessagetext", "editmessagereplymarkup", "sendphoto", "senddocument"}
+# Методы, на которые может прийти 429 RetryAfter
+LIMITED_METHODS = VISIBLE_METHODS | {"answercallbackquery", "answerinlinequery"}
+
+
+class ChatState:
+    """Что видит симулированный пользователь в чате с ботом."""
+
+    __slots__ = ("markup", "message_id", "waiter", "messages")
+
+    def __init__(self):
+        self.markup = None
+        self.message_id = 1
+        self.waiter = None
+        self.messages = 0
+
+
+class FakeTelegramServer:
+    """aiohttp-приложение, имитирующее Bot API для одного бота."""
+
+    def __init__(self, latency=0.0, jitter=0.0, retry_after_ratio=0.0, retry_after=1,
+                 webhook_connections=40):
+        self.latency = latency
+        self.jitter = jitter
+        self.retry_after_ratio = retry_after_ratio
+        self.retry_after = retry_after
+        self.methods = Counter()
+        self.retry_after_sent = 0
+        self.other_chats = Counter()
+        self.chats = {}
+        self.bot_ready = asyncio.Event()
+
+        self._updates = []
+        self._updates_event = asyncio.Event()
+        self._callback_chats = {}
+        self._message_ids = iter(range(10 ** 6, 10 ** 9))
+        self._webhook_url = None
+        self._webhook_secret = None
+        self._webhook_semaphore = asyncio.Semaphore(webhook_connections)
+        self._client = None
+
+        self.app = web.Application()
+        self.app.router.add_route("*", "/bot{token}/{method}", self.handle)
+        self.app.on_cleanup.append(self._close_client)
+
+    async def _close_client(self, app):
+        if self._client:
+            await self._client.close()
+
+    # ПРИЕМ ЗАПРОСОВ БОТА
+
+    async def handle(self, request):
+        method = request.match_info["method"].lower()
+        if request.content_type == "application/json":
+            params = await request.json()
+        else:
+            params = dict(await request.post())
+        self.methods[method] += 1
+
+        if method == "getupdates":
+            self.bot_ready.set()
+            return web.json_response({"ok": True, "result": await self._get_updates(params)})
+
+        await asyncio.sleep(self.latency + random.uniform(0, self.jitter))
+        if method in LIMITED_METHODS and random.random() < self.retry_after_ratio:
+            self.retry_after_sent += 1
+            return web.json_response({
+                "ok": False,
+                "error_code": 429,
+                "description": f"Too Many Requests: retry after {self.retry_after}",
+                "parameters": {"retry_after": self.retry_after},
+            }, status=429)
+        return web.json_response({"ok": True, "result": self.call(method, params)})
+
+    def call(self, method, params):
+        """Выполняет метод Bot API и возвращает поле result ответа."""
+        if method == "getme":
+            return BOT_USER.model_dump(mode="json", exclude_none=True)
+        if method == "setwebhook":
+            self._webhook_url = params.get("url") or None
+            self._webhook_secret = params.get("secret_token")
+            self.bot_ready.set()
+            return True
+        if method == "deletewebhook":
+            self._webhook_url = None
+            return True
+        if method == "answercallbackquery":
+            # Всплывающее уведомление - тоже видимый ответ
+            chat_id = self._callback_chats.pop(params.get("callback_query_id"), None)
+            if params.get("text") and chat_id in self.chats:
+                self._resolve(self.chats[chat_id])
+            return True
+        if method in VISIBLE_METHODS:
+            return self._message(method, params)
+        return True
+
+    def _message(self, method, params):
+        chat_id = int(params.get("chat_id") or 0)
+        if method.startswith("edit"):
+            message_id = int(params.get("message_id") or 0)
+        else:
+            message_id = next(self._message_ids)
+
+        chat = self.chats.get(chat_id)
+        if chat is None:
+            self.other_chats[chat_id] += 1
+        else:
+            chat.messages += 1
+            chat.message_id = message_id
+            markup = params.get("reply_markup")
+            if isinstance(markup, str):
+                markup = json.loads(markup)
+            if markup and "inline_keyboard" in markup:
+                chat.markup = types.InlineKeyboardMarkup.model_validate(markup)
+            self._resolve(chat)
+
+        return {
+            "message_id": message_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "from": BOT_USER.model_dump(mode="json", exclude_none=True),
+            "text": params.get("text") or "",
+        }
+
+    @staticmethod
+    def _resolve(chat):
+        if chat.waiter is not None and not chat.waiter.done():
+            chat.waiter.set_result(time.perf_counter())
+
+    # ДОСТАВКА ОБНОВЛЕНИЙ
+
+    async def _get_updates(self, params):
+        offset = int(params.get("offset") or 0)
+        limit = int(params.get("limit") or 100)
+        timeout = float(params.get("timeout") or 0)
+
+        self._updates = [update for update in self._updates if update["update_id"] >= offset]
+        if not self._updates and timeout:
+            self._updates_event.clear()
+            try:
+                await asyncio.wait_for(self._updates_event.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return self._updates[:limit]
+
+    def push_update(self, update):
+        """Отдает обновление боту: в очередь getUpdates или POST-запросом на webhook."""
+        if update.callback_query:
+            self._callback_chats[update.callback_query.id] = update.callback_query.from_user.id
+        payload = update.model_dump(mode="json", by_alias=True, exclude_none=True)
+        if self._webhook_url:
+            asyncio.create_task(self._deliver(payload))
+        else:
+            self._updates.append(payload)
+            self._updates_event.set()
+
+    async def _deliver(self, payload):
+        """POST обновления на webhook; метод из тела ответа выполняется как запрос бота."""
+        if self._client is None:
+            self._client = ClientSession()
+        headers = {SECRET_HEADER: self._webhook_secret} if self._webhook_secret else {}
+        async with self._webhook_semaphore:
+            await asyncio.sleep(self.latency + random.uniform(0, self.jitter))
+            try:
+                async with self._client.post(self._webhook_url, json=payload, headers=headers) as response:
+                    if not response.content_type.startswith("multipart/"):
+                        return
+                    params = {}
+                    reader = MultipartReader.from_response(response)
+                    while (part := await reader.next()) is not None:
+                        params[part.name] = await part.text()
+            except Exception as e:
+                print(f"⚠️ Ошибка доставки обновления на webhook: {e}")
+                return
+        method = params.pop("method", "").lower()
+        if method:
+            self.methods[method] += 1
+            self.call(method, params)
+
+
+# СИМУЛИРОВАННЫЕ ПОЛЬЗОВАТЕЛИ
+
+class StepTimeout(Exception):
+    """Бот не ответил пользователю за отведенное время."""
+
+
+class SimulatedUser:
+    """Пользователь Telegram: отправляет обновления и ждет видимого ответа."""
+
+    def __init__(self, server, factory, user_id, stats, step_timeout, think):
+        self.server = server
+        self.factory = factory
+        self.user = factory.user(user_id, f"User{user_id}")
+        self.chat = server.chats.setdefault(user_id, ChatState())
+        self.stats = stats
+        self.step_timeout = step_timeout
+        self.think = think
+        self.rng = random.Random(user_id)
+
+    async def _send(self, label, update):
+        self.chat.waiter = asyncio.get_running_loop().create_future()
+        started = time.perf_counter()
+        self.server.push_update(update)
+        try:
+            answered = await asyncio.wait_for(self.chat.waiter, self.step_timeout)
+        except asyncio.TimeoutError:
+            self.stats.timeouts[label] += 1
+            raise StepTimeout(label)
+        self.stats.latencies.setdefault(label, []).append((answered - started) * 1000)
+        # Пауза "на чтение": заодно до следующего шага доходят остальные ответы бота
+        await asyncio.sleep(self.think * self.rng.uniform(0.5, 1.5))
+
+    async def text(self, text, label=None):
+        await self._send(label or text, self.factory.message(self.user, text))
+
+    async def press(self, data, label):
+        await self._send(label, self.factory.callback(self.user, data, message_id=self.chat.message_id))
+
+    def buttons(self, prefix):
+        """callback_data кнопок последней клавиатуры с префиксом prefix."""
+        if self.chat.markup is None:
+            return []
+        return [button.callback_data for row in self.chat.markup.inline_keyboard for button in row
+                if button.callback_data and button.callback_data.startswith(prefix)]
+
+
+async def browse_catalog(user):
+    """Просмотр каталога: категории, страницы, карточки инструментов."""
+    await user.text("🔧 Инструменты", "open_catalog")
+    for _ in range(3):
+        categories = user.buttons(f"{CategoryPage.__prefix__}:")
+        if not categories:
+            return
+        await user.press(user.rng.choice(categories), "category")
+        tools = user.buttons(f"{ToolCard.__prefix__}:")
+        if tools:
+            await user.press(user.rng.choice(tools), "tool")
+        await user.press("back_to_categories", "back_to_categories")
+
+
+async def make_application(user):
+    """Выбор инструмента в каталоге и оформление заявки на него."""
+    await user.text("🔧 Инструменты", "open_catalog")
+    await user.press(user.rng.choice(user.buttons(f"{CategoryPage.__prefix__}:")), "category")
+    await user.press(user.rng.choice(user.buttons(f"{ToolCard.__prefix__}:")), "tool")
+    rent = user.buttons(f"{RentTool.__prefix__}:")
+    if not rent:
+        return
+    await user.press(rent[0], "rent")
+    await user.text(f"{user.rng.randint(1, 30)} дней", "period")
+    await user.text(f"Клиент Номер {user.user.id}", "name")
+    await user.text(f"+7 900 {user.user.id % 10 ** 7:07d}", "phone")
+    await user.press("confirm_application", "confirm")
+
+
+SCRIPTS = {
+    "catalog": browse_catalog,
+    "application": make_application,
+}
+
+
+class PopulationStats:
+    """Результаты прогона населения."""
+
+    def __init__(self):
+        self.latencies = {}
+        self.timeouts = Counter()
+        self.completed = Counter()
+        self.failed = Counter()
+
+
+def percentile(values, q):
+    """Перцентиль по отсортированным значениям (метод ближайшего ранга)."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def run_population(server, users, mix, ramp, think, step_timeout, first_user_id=500000):
+    """
+    Запускает users пользователей равномерно в течение ramp секунд;
+    сценарий каждого выбирается случайно по весам mix.
+    """
+    stats = PopulationStats()
+    factory = UpdateFactory()
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    rng = random.Random(0)
+
+    async def run_user(index):
+        await asyncio.sleep(ramp * index / users)
+        script = rng.choices(names, weights)[0]
+        user = SimulatedUser(server, factory, first_user_id + index, stats, step_timeout, think)
+        try:
+            await SCRIPTS[script](user)
+            stats.completed[script] += 1
+        except (StepTimeout, IndexError):
+            # Нет ответа или ожидаемой кнопки: сценарий прерывается
+            stats.failed[script] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(run_user(index) for index in range(users)))
+    return stats, time.perf_counter() - started
+
+
+def print_report(server, stats, elapsed):
+    all_latencies = [ms for values in stats.latencies.values() for ms in values]
+    steps = len(all_latencies)
+    print(f"\n▶ Прогон за {elapsed:.1f} сек")
+    print(f"  сценарии: завершено {dict(stats.completed)}, прервано {dict(stats.failed)}")
+    print(f"  шагов с ответом: {steps} ({steps / elapsed:.0f}/сек), без ответа: {sum(stats.timeouts.values())}")
+    if all_latencies:
+        print(f"  сквозная задержка, мс: p50 {percentile(all_latencies, 0.5):.1f}, "
+              f"p95 {percentile(all_latencies, 0.95):.1f}, p99 {percentile(all_latencies, 0.99):.1f}, "
+              f"макс {max(all_latencies):.1f}")
+    print("  по шагам (p50/p95 мс, без ответа):")
+    for label, values in sorted(stats.latencies.items()):
+        print(f"    {label:<20} {len(values):>6}  {percentile(values, 0.5):8.1f} / "
+              f"{percentile(values, 0.95):8.1f}  {stats.timeouts[label]}")
+    print(f"  запросы к Bot API: {dict(server.methods.most_common())}")
+    print(f"  выдано 429 RetryAfter: {server.retry_after_sent}")
+    print(f"  сообщений в другие чаты (уведомления админам): {sum(server.other_chats.values())} "
+          f"в {len(server.other_chats)} чат(ов)")
+
+
+async def start_bot(mode, api_url, webhook_port):
+    """Запускает bot.py отдельным процессом, направленным на фальшивый сервер."""
+    env = dict(os.environ)
+    env.update({
+        "TELEGRAM_API_URL": api_url,
+        "BOT_MODE": mode,
+        "WEBHOOK_BASE_URL": f"http://127.0.0.1:{webhook_port}",
+        "WEBHOOK_SECRET": "fake-api-secret",
+        "WEBAPP_HOST": "127.0.0.1",
+        "WEBAPP_PORT": str(webhook_port),
+    })
+    log_path = os.path.join(tempfile.gettempdir(), f"rent_bot_fake_api_{os.getpid()}.log")
+    log = open(log_path, "w")
+    process = await asyncio.create_subprocess_exec(sys.executable, "bot.py", env=env, stdout=log, stderr=log)
+    print(f"✅ Бот запущен (pid {process.pid}, режим {mode}), лог: {log_path}")
+    return process, log
+
+
+async def stop_bot(process, log):
+    """Останавливает бота как Ctrl+C, чтобы отработал on_shutdown."""
+    if process.returncode is None:
+        process.send_signal(signal.SIGINT)
+        try:
+            await asyncio.wait_for(process.wait(), 30)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+    log.close()
+
+
+async def main(args):
+    server = FakeTelegramServer(args.latency, args.jitter, args.retry_after_ratio, args.retry_after)
+    runner = web.AppRunner(server.app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, args.host, args.port).start()
+    api_url = f"http://{args.host}:{args.port}"
+    print(f"✅ Фальшивый Bot API: {api_url}")
+
+    bot_process = None
+    try:
+        if args.bot != "none":
+            bot_process = await start_bot(args.bot, api_url, args.webhook_port)
+        if not args.users:
+            print("Сервер работает до Ctrl+C")
+            await asyncio.Event().wait()
+
+        print("⏳ Ожидание подключения бота (getUpdates или setWebhook)...")
+        await asyncio.wait_for(server.bot_ready.wait(), 120)
+        stats, elapsed = await run_population(server, args.users, args.mix, args.ramp, args.think,
+                                              args.step_timeout)
+        # Даем диспетчеру уведомлений разослать оставшееся
+        await asyncio.sleep(args.drain)
+        print_report(server, stats, elapsed)
+    finally:
+        if bot_process:
+            await stop_bot(*bot_process)
+        await runner.cleanup()
+
+
+def parse_mix(value):
+    """'catalog:0.7,application:0.3' -> {'catalog': 0.7, 'application': 0.3}"""
+    mix = {}
+    for item in value.split(","):
+        name, _, weight = item.partition(":")
+        if name not in SCRIPTS:
+            raise argparse.ArgumentTypeError(f"неизвестный сценарий {name}; доступны: {', '.join(SCRIPTS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Фальшивый Telegram Bot API и нагрузка пользователями")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--bot", choices=("none", "polling", "webhook"), default="none",
+                        help="Запустить bot.py в этом режиме (none - бот запускается вручную)")
+    parser.add_argument("--webhook-port", type=int, default=8090, help="Порт webhook-сервера бота")
+    parser.add_argument("--users", type=int, default=0, help="Число пользователей (0 - только сервер)")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("catalog:0.7,application:0.3"),
+                        help="Доли сценариев, например catalog:0.7,application:0.3")
+    parser.add_argument("--ramp", type=float, default=10, help="За сколько секунд подключаются все пользователи")
+    parser.add_argument("--think", type=float, default=0.5, help="Средняя пауза пользователя между шагами (сек)")
+    parser.add_argument("--step-timeout", type=float, default=15, help="Сколько ждать ответа бота (сек)")
+    parser.add_argument("--latency", type=float, default=0.0, help="Задержка ответа Bot API (сек)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Случайная добавка к задержке (сек)")
+    parser.add_argument("--retry-after-ratio", type=float, default=0.0, help="Доля ответов 429 RetryAfter")
+    parser.add_argument("--retry-after", type=int, default=1, help="retry_after в ответах 429 (сек)")
+    parser.add_argument("--drain", type=float, default=3, help="Пауза после прогона для рассылки уведомлений (сек)")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,135 @@
+"""
+Фальшивая сессия Bot API и генератор обновлений.
+
+FakeSession подменяет bot.session: вместо HTTP-запросов к Telegram
+записывает вызванные методы и возвращает правдоподобные ответы.
+UpdateFactory строит обновления (сообщения, callback-запросы) от имени
+тестовых пользователей.
+"""
+
+import datetime
+import itertools
+import os
+import tempfile
+
+
+def prepare_environment():
+    """
+    Задает переменные окружения для офлайн-запуска до импорта data.config:
+    тестовый токен и отдельные временные БД и снимок каталога,
+    чтобы не трогать database.db и catalog_snapshot.bin.
+    """
+    os.environ.setdefault("BOT_TOKEN", "123456:OFFLINE-TEST-TOKEN")
+    temp_dir = tempfile.mkdtemp(prefix="rent_bot_")
+    os.environ.setdefault("DATABASE_PATH", os.path.join(temp_dir, "database.db"))
+    os.environ.setdefault("CATALOG_SNAPSHOT_PATH", os.path.join(temp_dir, "catalog_snapshot.bin"))
+
+
+prepare_environment()
+
+from aiogram import types
+from aiogram.client.session.base import BaseSession
+from aiogram.methods import GetMe
+
+BOT_USER = types.User(id=123456, is_bot=True, first_name="RentBrigadir", username="rent_brigadir_bot")
+
+
+class FakeSession(BaseSession):
+    """
+    Сессия Bot API без сети: записывает вызовы в calls,
+    а последнюю inline-клавиатуру каждого чата - в markups.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+        self.markups = {}
+        self._message_ids = itertools.count(1000)
+
+    async def make_request(self, bot, method, timeout=None):
+        self.calls.append(method)
+        markup = getattr(method, "reply_markup", None)
+        if isinstance(markup, types.InlineKeyboardMarkup):
+            self.markups[getattr(method, "chat_id", None)] = markup
+        if isinstance(method, GetMe):
+            return BOT_USER
+
+        returning = str(method.__returning__)
+        if "Message" in returning:
+            chat_id = getattr(method, "chat_id", None) or 0
+            return types.Message(
+                message_id=getattr(method, "message_id", None) or next(self._message_ids),
+                date=datetime.datetime.now(),
+                chat=types.Chat(id=chat_id, type="private"),
+                from_user=BOT_USER,
+                text=getattr(method, "text", None)
+            )
+        return True
+
+    async def close(self):
+        pass
+
+    async def stream_content(self, url, headers=None, timeout=30, chunk_size=65536, raise_for_status=True):
+        yield b""
+
+
+def find_callback(markup, prefix, text=None):
+    """
+    Возвращает callback_data первой кнопки клавиатуры с префиксом prefix
+    (и подстрокой text в надписи, если задана) или None.
+    """
+    if markup is None:
+        return None
+    for row in markup.inline_keyboard:
+        for button in row:
+            if not button.callback_data or not button.callback_data.startswith(prefix):
+                continue
+            if text is None or text in button.text:
+                return button.callback_data
+    return None
+
+
+class UpdateFactory:
+    """Строит обновления Telegram с последовательными update_id."""
+
+    def __init__(self):
+        self._update_ids = itertools.count(1)
+        self._message_ids = itertools.count(1)
+
+    @staticmethod
+    def user(user_id, first_name="Test", username=None):
+        """Тестовый пользователь."""
+        return types.User(id=user_id, is_bot=False, first_name=first_name, username=username)
+
+    def _message(self, user, text, sender=None, message_id=None):
+        return types.Message(
+            message_id=message_id or next(self._message_ids),
+            date=datetime.datetime.now(),
+            chat=types.Chat(id=user.id, type="private"),
+            from_user=sender or user,
+            text=text
+        )
+
+    def message(self, user, text):
+        """Текстовое сообщение пользователя."""
+        return types.Update(update_id=next(self._update_ids), message=self._message(user, text))
+
+    def callback(self, user, data, message_id=None):
+        """Нажатие inline-кнопки с callback_data под сообщением бота (message_id - его номер)."""
+        return types.Update(
+            update_id=next(self._update_ids),
+            callback_query=types.CallbackQuery(
+                id=str(next(self._message_ids)),
+                from_user=user,
+                chat_instance=str(user.id),
+                message=self._message(user, "...", sender=BOT_USER, message_id=message_id),
+                data=data
+            )
+        )
+
+    def inline_query(self, user, query):
+        """Inline-запрос @bot <query>."""
+        return types.Update(
+            update_id=next(self._update_ids),
+            inline_query=types.InlineQuery(id=str(next(self._message_ids)), from_user=user, query=query, offset="")
+        )
@@ -0,0 +1,116 @@
+"""
+Офлайн-проверка режима webhook.
+
+Поднимает настоящее aiohttp-приложение бота (bot.create_webhook_app)
+на локальном тестовом сервере, подменяет Bot API фальшивой сессией
+и отправляет сценарий обновлений так, как это делает Telegram:
+POST JSON с заголовком X-Telegram-Bot-Api-Secret-Token.
+
+Проверяет отказ при неверном секрете и показывает, сколько ответов
+ушло прямо в теле ответа на webhook, а сколько отдельными запросами.
+
+Запуск из корня проекта:
+    python -m devtools.webhook_harness
+"""
+
+import asyncio
+import os
+import statistics
+import time
+
+os.environ.setdefault("WEBHOOK_SECRET", "offline-test-secret")
+
+from aiohttp import MultipartReader
+from aiohttp.test_utils import TestClient, TestServer
+
+from devtools.fake_session import FakeSession, UpdateFactory
+
+import bot as bot_module
+from data.config import ADMIN_IDS, WEBHOOK_PATH, WEBHOOK_SECRET
+from keyboards.callbacks import CategoryPage, ToolCard, PickTool
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+def build_scenario(updates):
+    """Сценарий: каталог, поиск, оформление заявки и админ-панель."""
+    user = updates.user(1001, "Иван", "ivan")
+    admin = updates.user(ADMIN_IDS[0], "Админ")
+    return [
+        updates.message(user, "/start"),
+        updates.message(user, "🔧 Инструменты"),
+        updates.callback(user, CategoryPage.of(1).pack()),
+        updates.callback(user, ToolCard.of(1).pack()),
+        updates.message(user, "/search"),
+        updates.message(user, "перфоратор"),
+        updates.message(user, "📝 Оставить заявку"),
+        updates.message(user, "бетономешалка"),
+        updates.callback(user, PickTool(tool_id=0).pack()),
+        updates.message(user, "3 дня"),
+        updates.message(user, "Иванов Иван"),
+        updates.message(user, "+7 900 000-00-00"),
+        updates.callback(user, "confirm_application"),
+        updates.message(user, "📞 Контакты"),
+        updates.inline_query(user, "перф"),
+        updates.message(admin, "/admin"),
+        updates.callback(admin, "new_applications"),
+    ]
+
+
+async def read_webhook_reply(response):
+    """Возвращает имя метода Bot API из тела ответа на webhook или None."""
+    if not response.content_type.startswith("multipart/"):
+        return None
+    reader = MultipartReader.from_response(response)
+    while True:
+        part = await reader.next()
+        if part is None:
+            return None
+        if part.name == "method":
+            return await part.text()
+
+
+async def run():
+    session = FakeSession()
+    bot_module.bot.session = session
+    bot_module.register_handlers()
+
+    client = TestClient(TestServer(bot_module.create_webhook_app()))
+    await client.start_server()
+    try:
+        update = UpdateFactory().message(UpdateFactory.user(1), "/start")
+        response = await client.post(WEBHOOK_PATH, data=update.model_dump_json(exclude_none=True),
+                                     headers={SECRET_HEADER: "wrong-secret"})
+        print(f"Неверный секрет: HTTP {response.status} (ожидается 401)")
+
+        latencies = []
+        inline_replies = {}
+        for update in build_scenario(UpdateFactory()):
+            calls_before = len(session.calls)
+            started = time.perf_counter()
+            response = await client.post(
+                WEBHOOK_PATH,
+                data=update.model_dump_json(exclude_none=True),
+                headers={SECRET_HEADER: WEBHOOK_SECRET, "Content-Type": "application/json"}
+            )
+            method = await read_webhook_reply(response)
+            latencies.append((time.perf_counter() - started) * 1000)
+
+            if response.status != 200:
+                print(f"❌ update {update.update_id}: HTTP {response.status}")
+            if method:
+                inline_replies[method] = inline_replies.get(method, 0) + 1
+            api_calls = [call.__api_method__ for call in session.calls[calls_before:]]
+            print(f"update {update.update_id:>2} ({update.event_type}): "
+                  f"в ответе webhook: {method or '-'}, запросы к API: {', '.join(api_calls) or '-'}")
+
+        print(f"\nОбновлений: {len(latencies)}, ответов в теле webhook: {sum(inline_replies.values())}, "
+              f"отдельных запросов к API: {len(session.calls)}")
+        print(f"Задержка, мс: медиана {statistics.median(latencies):.2f}, максимум {max(latencies):.2f}")
+    finally:
+        # Закрытие клиента вызывает on_shutdown бота (сброс буфера, закрытие БД)
+        await client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(run())
@@ -8,21 +8,34 @@
 from .user_handlers import *
 from .application_handlers import *
 from .admin_handlers import *
+from .search_handlers import *
+from .inline_handlers import *
 
 __all__ = [
     # user_handlers
     'cmd_start', 'cmd_help', 'cmd_contacts', 'cmd_delivery', 'cmd_catalog',
     'show_categories', 'show_contacts', 'show_delivery_info', 'show_help',
     'show_tools_by_category', 'show_tool_detail', 'back_to_categories', 
-    'back_to_main', 'cancel_to_tools',
+    'back_to_main', 'cancel_to_tools', 'is_known_category', 'is_known_tool',
     
     # application_handlers  
     'ApplicationStates', 'start_application', 'rent_tool', 'process_tool_name',
-    'process_rental_period', 'process_customer_name', 'process_phone',
+    'process_rental_period', 'process_customer_name', 'process_phone', 'choose_tool',
+    'quote_text',
+    'is_known_pick',
+    'start_tool_rent',
     'confirm_application', 'edit_application', 'cancel_application',
     
     # admin_handlers
     'admin_panel', 'show_new_applications', 'show_all_applications',
-    'show_application_detail', 'mark_application_processed', 'call_customer',
-    'show_admin_stats', 'refresh_applications', 'back_to_admin'
+    'show_application_detail', 'mark_application_processed', 'release_reservation', 'call_customer',
+    'show_admin_stats', 'refresh_applications', 'back_to_admin',
+    'show_inbox_page', 'cmd_rebuild_stats', 'show_funnel_report',
+    'cmd_metrics',
+    
+    # search_handlers
+    'SearchStates', 'start_search', 'process_search_query',
+    
+    # inline_handlers
+    'inline_tool_search'
 ]
\ No newline at end of file
@@ -5,8 +5,14 @@
 from aiogram import types, F
 from aiogram.filters import Command
 
-from data.config import ADMIN_IDS
-from database import db
+from datetime import date, datetime, timedelta, timezone
+
+from data.config import ADMIN_IDS, FUNNEL_REPORT_DAYS
+from database import async_db
+from services.catalog import catalog
+from services.events import FUNNEL_STEPS, event_hour
+from services.metrics import metrics
+from keyboards.callbacks import Inbox, ApplicationDetail, ApplicationProcessed, ApplicationCall, ReservationRelease
 from keyboards.admin_kb import (admin_main_keyboard, applications_list_keyboard, 
                                application_actions_keyboard)
 
@@ -27,68 +33,87 @@ async def admin_panel(message: types.Message):
     )
     await message.answer(admin_text, reply_markup=admin_main_keyboard(), parse_mode="HTML")
 
+# Подписи статусов брони в карточке заявки
+RESERVATION_STATUS_TITLES = {
+    "requested": "запрошена, подтвердится при обработке заявки",
+    "active": "подтверждена",
+    "released": "снята",
+}
+
+def reservation_dates_text(start_date, end_date):
+    """Период брони для сообщений администратору: 20.10.2025 – 25.10.2025."""
+    start, end = date.fromisoformat(start_date), date.fromisoformat(end_date)
+    return f"{start:%d.%m.%Y} – {end:%d.%m.%Y}"
+
+# Заголовки и тексты пустого списка для фильтров заявок
+INBOX_TITLES = {
+    "new": ("📋 <b>Новые заявки</b>", "📭 <b>Новых заявок нет</b>\n\nВсе заявки обработаны! 🎉"),
+    "processed": ("✅ <b>Обработанные заявки</b>", "📭 <b>Обработанных заявок нет</b>"),
+    "all": ("📋 <b>Все заявки</b>", "📭 <b>Заявок нет</b>"),
+}
+
+async def show_applications_page(callback: types.CallbackQuery, status="new", cursor=None, direction="next"):
+    """
+    Показывает страницу списка заявок с навигацией и фильтрами.
+    
+    Args:
+        callback: Callback запрос администратора
+        status: Фильтр по статусу ('new', 'processed', 'all')
+        cursor: ID крайней заявки соседней страницы или None
+        direction: "next" (старее) или "prev" (новее)
+    """
+    applications, total, has_prev, has_next = await async_db.get_applications_page(
+        status=None if status == "all" else status,
+        cursor=cursor,
+        direction=direction
+    )
+    title, empty_text = INBOX_TITLES[status]
+    
+    await callback.answer()
+    return callback.message.edit_text(
+        f"{title} ({total}):" if applications else empty_text,
+        reply_markup=applications_list_keyboard(applications, status, has_prev, has_next),
+        parse_mode="HTML"
+    )
+
 async def show_new_applications(callback: types.CallbackQuery):
-    """Показывает список новых заявок."""
+    """Показывает первую страницу новых заявок."""
     if callback.from_user.id not in ADMIN_IDS:
         await callback.answer("❌ Доступ запрещен")
         return
     
-    applications = db.get_new_applications()
-    
-    if not applications:
-        await callback.message.edit_text(
-            "📭 <b>Новых заявок нет</b>\n\n"
-            "Все заявки обработаны! 🎉",
-            reply_markup=admin_main_keyboard(),
-            parse_mode="HTML"
-        )
-        return
-    
-    await callback.message.edit_text(
-        f"📋 <b>Новые заявки</b> ({len(applications)}):",
-        reply_markup=applications_list_keyboard(applications),
-        parse_mode="HTML"
-    )
-    await callback.answer()
+    return await show_applications_page(callback, "new")
 
 async def show_all_applications(callback: types.CallbackQuery):
-    """Показывает все заявки."""
+    """Показывает первую страницу всех заявок."""
     if callback.from_user.id not in ADMIN_IDS:
         await callback.answer("❌ Доступ запрещен")
         return
     
-    # Получаем все заявки
-    db.cursor.execute('''
-        SELECT a.*, u.username, u.full_name as user_full_name 
-        FROM applications a 
-        LEFT JOIN users u ON a.user_id = u.id 
-        ORDER BY a.application_date DESC LIMIT 15
-    ''')
-    applications = db.cursor.fetchall()
-    
-    if not applications:
-        await callback.message.edit_text(
-            "📭 <b>Заявок нет</b>",
-            reply_markup=admin_main_keyboard(),
-            parse_mode="HTML"
-        )
+    return await show_applications_page(callback, "all")
+
+async def show_inbox_page(callback: types.CallbackQuery, callback_data: Inbox):
+    """
+    Показывает страницу заявок с фильтром по статусу: первую или соседнюю
+    с заявкой anchor_id в направлении direction.
+    """
+    if callback.from_user.id not in ADMIN_IDS:
+        await callback.answer("❌ Доступ запрещен")
         return
     
-    await callback.message.edit_text(
-        f"📋 <b>Последние заявки</b> ({len(applications)}):",
-        reply_markup=applications_list_keyboard(applications),
-        parse_mode="HTML"
-    )
-    await callback.answer()
+    if callback_data.anchor_id is None:
+        return await show_applications_page(callback, callback_data.status)
+    direction = "prev" if callback_data.direction == "p" else "next"
+    return await show_applications_page(callback, callback_data.status, callback_data.anchor_id, direction)
 
-async def show_application_detail(callback: types.CallbackQuery):
+async def show_application_detail(callback: types.CallbackQuery, callback_data: ApplicationDetail):
     """Показывает детальную информацию о заявке."""
     if callback.from_user.id not in ADMIN_IDS:
         await callback.answer("❌ Доступ запрещен")
         return
     
-    application_id = int(callback.data.split("_")[2])
-    application = db.get_application_by_id(application_id)
+    application_id = callback_data.application_id
+    application, reservation = await async_db.get_application_detail(application_id)
     
     if not application:
         await callback.message.edit_text("❌ Заявка не найдена")
@@ -109,37 +134,75 @@ async def show_application_detail(callback: types.CallbackQuery):
         f"<b>Статус:</b> {status}"
     )
     
+    if reservation:
+        start_date, end_date, units, reservation_status = reservation
+        detail_text += (
+            f"\n<b>Бронь:</b> {reservation_dates_text(start_date, end_date)} "
+            f"({RESERVATION_STATUS_TITLES[reservation_status]})"
+        )
+    
     await callback.message.edit_text(
         detail_text,
-        reply_markup=application_actions_keyboard(app_id),
+        reply_markup=application_actions_keyboard(
+            app_id, can_release=bool(reservation) and reservation[3] != "released"
+        ),
+        parse_mode="HTML"
+    )
+    await callback.answer()
+
+async def mark_application_processed(callback: types.CallbackQuery, callback_data: ApplicationProcessed):
+    """Помечает заявку как обработанную и подтверждает запрошенную клиентом бронь."""
+    if callback.from_user.id not in ADMIN_IDS:
+        await callback.answer("❌ Доступ запрещен")
+        return
+    
+    application_id = callback_data.application_id
+    reservation = await async_db.mark_application_processed(application_id)
+    
+    text = f"✅ <b>Заявка #{application_id} отмечена как обработанная</b>"
+    if reservation:
+        start_date, end_date, booked = reservation
+        if booked:
+            text += f"\n\n📆 Инструмент забронирован: {reservation_dates_text(start_date, end_date)}"
+        else:
+            text += (
+                f"\n\n⚠️ Забронировать не удалось: на {reservation_dates_text(start_date, end_date)} "
+                "свободных единиц уже нет. Согласуйте с клиентом другие даты."
+            )
+    
+    await callback.message.edit_text(
+        text,
+        reply_markup=admin_main_keyboard(),
         parse_mode="HTML"
     )
     await callback.answer()
 
-async def mark_application_processed(callback: types.CallbackQuery):
-    """Помечает заявку как обработанную."""
+async def release_reservation(callback: types.CallbackQuery, callback_data: ReservationRelease):
+    """Снимает бронь по заявке: единица инструмента снова свободна на эти даты."""
     if callback.from_user.id not in ADMIN_IDS:
         await callback.answer("❌ Доступ запрещен")
         return
     
-    application_id = int(callback.data.split("_")[2])
-    db.mark_application_processed(application_id)
+    application_id = callback_data.application_id
+    if not await async_db.release_reservation(application_id):
+        await callback.answer("Бронь уже снята")
+        return
     
     await callback.message.edit_text(
-        f"✅ <b>Заявка #{application_id} отмечена как обработанная</b>",
+        f"🔓 <b>Бронь по заявке #{application_id} снята</b>",
         reply_markup=admin_main_keyboard(),
         parse_mode="HTML"
     )
     await callback.answer()
 
-async def call_customer(callback: types.CallbackQuery):
+async def call_customer(callback: types.CallbackQuery, callback_data: ApplicationCall):
     """Показывает номер телефона клиента."""
     if callback.from_user.id not in ADMIN_IDS:
         await callback.answer("❌ Доступ запрещен")
         return
     
-    application_id = int(callback.data.split("_")[2])
-    application = db.get_application_by_id(application_id)
+    application_id = callback_data.application_id
+    application = await async_db.get_application_by_id(application_id)
     
     if application:
         phone = application[6]
@@ -151,62 +214,129 @@ async def call_customer(callback: types.CallbackQuery):
         )
 
 async def show_admin_stats(callback: types.CallbackQuery):
-    """Показывает статистику."""
+    """Показывает статистику из счетчиков, которые обновляются при каждой заявке."""
     if callback.from_user.id not in ADMIN_IDS:
         await callback.answer("❌ Доступ запрещен")
         return
     
     # Получаем статистику
-    db.cursor.execute('''
-        SELECT 
-            COUNT(*) as total_applications,
-            SUM(CASE WHEN status = 'new' THEN 1 ELSE 0 END) as new_applications,
-            SUM(CASE WHEN status = 'processed' THEN 1 ELSE 0 END) as processed_applications,
-            COUNT(DISTINCT user_id) as unique_customers
-        FROM applications
-    ''')
-    stats = db.cursor.fetchone()
+    stats = await async_db.get_applications_stats()
     
     if stats:
         total, new, processed, unique_customers = stats
+        daily = await async_db.get_daily_stats(days=7)
+        top_tools = await async_db.get_top_tools_stats(limit=3)
+        top_categories = await async_db.get_top_categories_stats(limit=3)
         
         stats_text = (
             "📊 <b>Статистика заявок</b>\n\n"
             f"• Всего заявок: <b>{total}</b>\n"
             f"• Новые заявки: <b>{new}</b>\n"
             f"• Обработанные: <b>{processed}</b>\n"
-            f"• Уникальных клиентов: <b>{unique_customers}</b>\n\n"
+            f"• Уникальных клиентов: <b>{unique_customers}</b>\n"
+            f"• За 7 дней: <b>{sum(day[1] for day in daily)}</b>\n\n"
             f"• Эффективность обработки: <b>{(processed/total*100) if total > 0 else 0:.1f}%</b>"
         )
+        
+        tool_lines = []
+        for tool_id, applications in top_tools:
+            tool = catalog.get_tool_by_id(tool_id)
+            if tool:
+                tool_lines.append(f"• {tool.name}: <b>{applications}</b>")
+        if tool_lines:
+            stats_text += "\n\n🔥 <b>Популярные инструменты:</b>\n" + "\n".join(tool_lines)
+        
+        category_lines = []
+        for category_id, applications in top_categories:
+            category = catalog.get_category_by_id(category_id)
+            if category:
+                category_lines.append(f"• {category.name}: <b>{applications}</b>")
+        if category_lines:
+            stats_text += "\n\n🗂 <b>Популярные категории:</b>\n" + "\n".join(category_lines)
     else:
         stats_text = "📊 <b>Статистика недоступна</b>"
     
-    await callback.message.edit_text(stats_text, parse_mode="HTML")
     await callback.answer()
+    return callback.message.edit_text(stats_text, parse_mode="HTML")
 
-async def refresh_applications(callback: types.CallbackQuery):
-    """Обновляет список заявок."""
+async def show_funnel_report(callback: types.CallbackQuery):
+    """
+    Показывает воронку оформления заявок и самые просматриваемые инструменты
+    за FUNNEL_REPORT_DAYS дней по почасовым агрегатам событий.
+    """
     if callback.from_user.id not in ADMIN_IDS:
         await callback.answer("❌ Доступ запрещен")
         return
     
-    applications = db.get_new_applications()
+    since = (datetime.now(timezone.utc) - timedelta(days=FUNNEL_REPORT_DAYS)).timestamp()
+    counts = await async_db.get_funnel_stats(event_hour(since))
+    top_viewed = await async_db.get_top_viewed_tools(event_hour(since), limit=5)
     
-    if not applications:
-        await callback.message.edit_text(
-            "📭 <b>Новых заявок нет</b>\n\n"
-            "Все заявки обработаны! 🎉",
-            reply_markup=admin_main_keyboard(),
-            parse_mode="HTML"
-        )
-        return
+    lines = [
+        f"📈 <b>Воронка заявок за {FUNNEL_REPORT_DAYS} дн.</b>\n",
+        f"👀 Просмотры каталога: <b>{counts.get('catalog_view', 0)}</b>",
+        f"🔧 Просмотры инструментов: <b>{counts.get('tool_view', 0)}</b>\n",
+    ]
+    
+    first = counts.get(FUNNEL_STEPS[0][0], 0)
+    previous = first
+    for event, title in FUNNEL_STEPS:
+        count = counts.get(event, 0)
+        step_rate = f"{count / previous * 100:.0f}%" if previous else "—"
+        total_rate = f"{count / first * 100:.0f}%" if first else "—"
+        lines.append(f"• {title}: <b>{count}</b> (шаг {step_rate}, всего {total_rate})")
+        previous = count
+    
+    tool_lines = []
+    for tool_id, views in top_viewed:
+        tool = catalog.get_tool_by_id(tool_id)
+        if tool:
+            tool_lines.append(f"• {tool.name}: <b>{views}</b>")
+    if tool_lines:
+        lines.append("\n🔥 <b>Чаще всего смотрят:</b>")
+        lines.extend(tool_lines)
     
-    await callback.message.edit_text(
-        f"📋 <b>Новые заявки</b> ({len(applications)}):",
-        reply_markup=applications_list_keyboard(applications),
-        parse_mode="HTML"
-    )
     await callback.answer()
+    return callback.message.edit_text("\n".join(lines), parse_mode="HTML")
+
+async def cmd_metrics(message: types.Message):
+    """Обработчик команды /metrics. Показывает задержки и ошибки обработчиков."""
+    if message.from_user.id not in ADMIN_IDS:
+        await message.answer("❌ Доступ запрещен")
+        return
+    
+    return message.answer(metrics.summary(), parse_mode="HTML")
+
+async def cmd_rebuild_stats(message: types.Message):
+    """
+    Обработчик команды /rebuild_stats.
+    Пересчитывает счетчики статистики с нуля и показывает расхождения.
+    """
+    if message.from_user.id not in ADMIN_IDS:
+        await message.answer("❌ Доступ запрещен")
+        return
+    
+    before, after = await async_db.rebuild_stats()
+    labels = ("Всего заявок", "Новые", "Обработанные", "Уникальных клиентов")
+    
+    drift = [
+        f"• {label}: {old} → <b>{new}</b>"
+        for label, old, new in zip(labels, before or (None,) * 4, after)
+        if old != new
+    ]
+    if drift:
+        text = "⚠️ <b>Счетчики пересчитаны, найдены расхождения:</b>\n" + "\n".join(drift)
+    else:
+        text = f"✅ <b>Счетчики пересчитаны, расхождений нет</b>\n\nВсего заявок: {after[0]}"
+    return message.answer(text, parse_mode="HTML")
+
+async def refresh_applications(callback: types.CallbackQuery):
+    """Обновляет список новых заявок."""
+    if callback.from_user.id not in ADMIN_IDS:
+        await callback.answer("❌ Доступ запрещен")
+        return
+    
+    return await show_applications_page(callback, "new")
 
 async def back_to_admin(callback: types.CallbackQuery):
     """Возвращает в админ-панель."""
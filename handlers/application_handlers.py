@@ -5,14 +5,22 @@
 с использованием Finite State Machine (FSM).
 """
 
+from datetime import date
+
 from aiogram import types, F
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 
-from database import db
+from data.config import ADMIN_IDS, RESERVATION_MAX_DAYS
+from database import async_db, ReservationConflict
+from keyboards.callbacks import RentTool, PickTool
 from keyboards.user_kb import (main_keyboard, cancel_application_keyboard, 
-                              confirmation_keyboard)
-from services.notifications import notify_admins_about_new_application
+                              confirmation_keyboard, tool_suggestions_keyboard, free_tools_keyboard)
+from services.catalog import catalog
+from services.events import event_log
+from services.notifications import notification_dispatcher
+from services.quotes import parse_rental_period, rental_dates, days_text
+from services.reservations import get_free_tools
 
 
 # ОПРЕДЕЛЕНИЕ СОСТОЯНИЙ FSM
@@ -23,12 +31,14 @@ class ApplicationStates(StatesGroup):
     
     States:
         waiting_for_tool_name: Ожидание ввода названия инструмента
+        waiting_for_tool_choice: Ожидание выбора инструмента из подсказок каталога
         waiting_for_rental_period: Ожидание ввода срока аренды  
         waiting_for_customer_name: Ожидание ввода ФИО клиента
         waiting_for_phone: Ожидание ввода телефона
         confirmation: Ожидание подтверждения заявки
     """
     waiting_for_tool_name = State()
+    waiting_for_tool_choice = State()
     waiting_for_rental_period = State()
     waiting_for_customer_name = State()
     waiting_for_phone = State()
@@ -45,28 +55,32 @@ async def start_application(message: types.Message, state: FSMContext):
         message: Объект сообщения от пользователя
         state: Контекст состояния FSM
     """
-    await message.answer(
+    event_log.track("application_start", message.from_user.id)
+    await state.set_state(ApplicationStates.waiting_for_tool_name)
+    return message.answer(
         "📝 <b>Начнем оформление заявки!</b>\n\n"
         "Введите название инструмента или оборудования, которое хотите арендовать:",
         reply_markup=cancel_application_keyboard(),
         parse_mode="HTML"
     )
-    await state.set_state(ApplicationStates.waiting_for_tool_name)
 
-async def rent_tool(callback: types.CallbackQuery, state: FSMContext):
+async def rent_tool(callback: types.CallbackQuery, state: FSMContext, callback_data: RentTool):
     """
     Начинает процесс аренды конкретного инструмента, предзаполняя его название.
     
     Args:
         callback: Callback запрос от inline кнопки
         state: Контекст состояния FSM
+        callback_data: Данные кнопки с ID инструмента
     """
-    tool_id = int(callback.data.split("_")[1])
-    tool = db.get_tool_by_id(tool_id)
+    tool = catalog.get_tool_by_id(callback_data.tool_id)
     
     if tool:
-        tool_name = tool[1]  # Название инструмента
-        await state.update_data(tool_name=tool_name)
+        tool_name = tool.name
+        await state.update_data(tool_name=tool_name, tool_id=tool.id)
+        # Инструмент выбран из каталога - шаг ввода названия пройден сразу
+        event_log.track("application_start", callback.from_user.id, tool.id)
+        event_log.track("application_tool", callback.from_user.id, tool.id)
         await callback.message.edit_text(
             f"📝 <b>Оформляем аренду:</b>\n🔧 {tool_name}\n\n"
             f"Введите срок аренды (например: '2 дня', '1 неделя', '1 месяц'):",
@@ -80,37 +94,116 @@ async def rent_tool(callback: types.CallbackQuery, state: FSMContext):
     await callback.answer()
 
 
+async def start_tool_rent(message: types.Message, state: FSMContext, tool_id):
+    """
+    Начинает аренду инструмента по deep link (/start rent_<id>),
+    например из карточки, отправленной через inline-режим.
+    
+    Args:
+        message: Сообщение с командой /start
+        state: Контекст состояния FSM
+        tool_id: ID инструмента из ссылки
+    """
+    tool = catalog.get_tool_by_id(tool_id)
+    
+    if not tool:
+        await message.answer("❌ Инструмент не найден")
+        return
+    
+    await state.update_data(tool_name=tool.name, tool_id=tool.id)
+    event_log.track("application_start", message.from_user.id, tool.id)
+    event_log.track("application_tool", message.from_user.id, tool.id)
+    await message.answer(
+        f"📝 <b>Оформляем аренду:</b>\n🔧 {tool.name}\n\n"
+        f"Введите срок аренды (например: '2 дня', '1 неделя', '1 месяц'):",
+        reply_markup=cancel_application_keyboard(),
+        parse_mode="HTML"
+    )
+    await state.set_state(ApplicationStates.waiting_for_rental_period)
+
+
 # ОБРАБОТЧИКИ СОСТОЯНИЙ FSM
 
 async def process_tool_name(message: types.Message, state: FSMContext):
     """
-    Обрабатывает ввод названия инструмента и переводит к следующему шагу.
+    Обрабатывает ввод названия инструмента.
+    Если в каталоге есть похожие инструменты, предлагает выбрать один из них,
+    иначе сразу переводит к следующему шагу.
     
     Args:
         message: Сообщение с названием инструмента
         state: Контекст состояния FSM
     """
-    await state.update_data(tool_name=message.text)
-    await message.answer(
+    await state.update_data(tool_name=message.text, tool_id=None)
+    matches = catalog.fuzzy_match(message.text or "")
+    
+    if matches:
+        await state.set_state(ApplicationStates.waiting_for_tool_choice)
+        return message.answer(
+            "🔎 Похожие инструменты из каталога:\n"
+            "Выберите нужный или оставьте название как написали.",
+            reply_markup=tool_suggestions_keyboard([tool for tool, score in matches])
+        )
+    
+    event_log.track("application_tool", message.from_user.id)
+    await state.set_state(ApplicationStates.waiting_for_rental_period)
+    return message.answer(
         "📅 Теперь введите срок аренды (например: '2 дня', '1 неделя', '1 месяц'):",
         reply_markup=cancel_application_keyboard()
     )
+
+def is_known_pick(callback_data):
+    """Проверка маршрута: подсказка ведет на инструмент каталога или оставляет название (0)."""
+    return callback_data.tool_id == 0 or catalog.get_tool_by_id(callback_data.tool_id) is not None
+
+async def choose_tool(callback: types.CallbackQuery, state: FSMContext, callback_data: PickTool):
+    """
+    Обрабатывает выбор инструмента из подсказок;
+    tool_id 0 - оставить название, введенное пользователем.
+    
+    Args:
+        callback: Callback запрос от кнопки подсказки
+        state: Контекст состояния FSM
+        callback_data: Данные кнопки подсказки
+    """
+    tool = catalog.get_tool_by_id(callback_data.tool_id)
+    if tool:
+        await state.update_data(tool_name=tool.name, tool_id=tool.id)
+    data = await state.get_data()
+    
+    event_log.track("application_tool", callback.from_user.id, data.get('tool_id'))
     await state.set_state(ApplicationStates.waiting_for_rental_period)
+    await callback.answer()
+    return callback.message.edit_text(
+        f"🔧 <b>Инструмент:</b> {data['tool_name']}\n\n"
+        "📅 Теперь введите срок аренды (например: '2 дня', '1 неделя', '1 месяц'):",
+        reply_markup=cancel_application_keyboard(),
+        parse_mode="HTML"
+    )
 
 async def process_rental_period(message: types.Message, state: FSMContext):
     """
     Обрабатывает ввод срока аренды и запрашивает ФИО.
+    Распознанные даты сохраняются для брони; свободна ли единица
+    инструмента, проверяется при подтверждении заявки вместе с ее записью.
     
     Args:
         message: Сообщение со сроком аренды
         state: Контекст состояния FSM
     """
-    await state.update_data(rental_period=message.text)
-    await message.answer(
+    period = rental_dates(message.text, date.today())
+    await state.update_data(
+        rental_period=message.text,
+        rental_days=(period[1] - period[0]).days + 1 if period else parse_rental_period(message.text),
+        rental_start=period[0].isoformat() if period else None,
+        rental_end=period[1].isoformat() if period else None
+    )
+    event_log.track("application_period", message.from_user.id)
+    await state.set_state(ApplicationStates.waiting_for_customer_name)
+    return message.answer(
         "👤 Введите ваше ФИО:",
         reply_markup=cancel_application_keyboard()
     )
-    await state.set_state(ApplicationStates.waiting_for_customer_name)
 
 async def process_customer_name(message: types.Message, state: FSMContext):
     """
@@ -121,11 +214,48 @@ async def process_customer_name(message: types.Message, state: FSMContext):
         state: Контекст состояния FSM
     """
     await state.update_data(customer_name=message.text)
-    await message.answer(
+    event_log.track("application_name", message.from_user.id)
+    await state.set_state(ApplicationStates.waiting_for_phone)
+    return message.answer(
         "📞 Введите ваш номер телефона:",
         reply_markup=cancel_application_keyboard()
     )
-    await state.set_state(ApplicationStates.waiting_for_phone)
+
+def quote_text(data):
+    """
+    Строки сводки заявки с датами брони, стоимостью аренды и залогом.
+    
+    Args:
+        data: Данные заявки из FSM (tool_id, rental_days, rental_start, rental_end)
+    
+    Returns:
+        str: Текст для parse_mode="HTML"; пустой, если инструмент не из каталога
+    """
+    tool = catalog.get_tool_by_id(data.get('tool_id'))
+    if not tool:
+        return ""
+    
+    text = ""
+    if data.get('rental_start'):
+        start = date.fromisoformat(data['rental_start'])
+        end = date.fromisoformat(data['rental_end'])
+        text += f"📆 <b>Даты:</b> {start:%d.%m.%Y} – {end:%d.%m.%Y}"
+        if (end - start).days + 1 > RESERVATION_MAX_DAYS:
+            text += f" (бронь больше чем на {days_text(RESERVATION_MAX_DAYS)} оформит менеджер)"
+        text += "\n"
+    
+    days = data.get('rental_days')
+    quote = catalog.quote(tool, days) if days else None
+    if not quote:
+        return text + f"💵 <b>Стоимость:</b> уточнит менеджер\n💰 <b>Залог:</b> {tool.deposit}₽\n"
+    
+    text += (
+        f"💵 <b>Стоимость:</b> {quote.total}₽ ({quote.tariffs_text()})\n"
+        f"💰 <b>Залог:</b> {quote.deposit}₽\n"
+    )
+    if quote.covered_days > quote.days:
+        text += f"<i>Аренда на {days_text(quote.covered_days)} дешевле, чем на {days_text(quote.days)}</i>\n"
+    return text
 
 async def process_phone(message: types.Message, state: FSMContext):
     """
@@ -136,6 +266,7 @@ async def process_phone(message: types.Message, state: FSMContext):
         state: Контекст состояния FSM
     """
     await state.update_data(phone=message.text)
+    event_log.track("application_phone", message.from_user.id)
     data = await state.get_data()
     
     # Формирование текста заявки для подтверждения
@@ -144,41 +275,79 @@ async def process_phone(message: types.Message, state: FSMContext):
         f"🔧 <b>Инструмент:</b> {data['tool_name']}\n"
         f"📅 <b>Срок аренды:</b> {data['rental_period']}\n"
         f"👤 <b>ФИО:</b> {data['customer_name']}\n"
-        f"📞 <b>Телефон:</b> {data['phone']}\n\n"
+        f"📞 <b>Телефон:</b> {data['phone']}\n"
+        f"{quote_text(data)}\n"
         "<i>Всё верно?</i>"
     )
     
-    await message.answer(application_text, reply_markup=confirmation_keyboard(), parse_mode="HTML")
     await state.set_state(ApplicationStates.confirmation)
+    return message.answer(application_text, reply_markup=confirmation_keyboard(), parse_mode="HTML")
 
 
 # ПОДТВЕРЖДЕНИЕ И ОТМЕНА ЗАЯВКИ
 
-async def confirm_application(callback: types.CallbackQuery, state: FSMContext, bot):
+async def confirm_application(callback: types.CallbackQuery, state: FSMContext):
     """
-    Подтверждает заявку, сохраняет в БД, уведомляет админов и очищает состояние.
+    Подтверждает заявку, сохраняет в БД вместе с уведомлениями админов
+    и очищает состояние. Уведомления рассылаются в фоне.
     
     Args:
         callback: Callback запрос от кнопки подтверждения
         state: Контекст состояния FSM
-        bot: Экземпляр бота для отправки уведомлений
     """
     data = await state.get_data()
+    if 'phone' not in data:
+        # Кнопка из старого сообщения: сессия уже завершена или удалена по сроку
+        await callback.answer("⌛ Заявка устарела, оформите ее заново", show_alert=True)
+        return
+    
+    # Запрос брони единицы инструмента из каталога на распознанные даты;
+    # бронь занимает единицу, когда администратор обработает заявку
+    reservation = None
+    if data.get('tool_id') and data.get('rental_start') and data['rental_days'] <= RESERVATION_MAX_DAYS:
+        reservation = (data['rental_start'], data['rental_end'], 1)
     
     # Сохранение заявки в базу данных
-    application_id = db.add_application(
-        user_id=callback.from_user.id,
-        service_name=data['tool_name'],
-        customer_name=data['customer_name'],
-        phone=data['phone'],
-        rental_period=data['rental_period']
-    )
+    try:
+        application_id = await async_db.add_application(
+            user_id=callback.from_user.id,
+            service_name=data['tool_name'],
+            customer_name=data['customer_name'],
+            phone=data['phone'],
+            rental_period=data['rental_period'],
+            tool_id=data.get('tool_id'),
+            notify_chat_ids=ADMIN_IDS,
+            reservation=reservation
+        )
+    except ReservationConflict:
+        # Все единицы на эти даты заняты: предлагаем другие даты или
+        # инструменты той же категории, свободные на эти даты (дешевле - выше)
+        tool = catalog.get_tool_by_id(data['tool_id'])
+        start = date.fromisoformat(data['rental_start'])
+        end = date.fromisoformat(data['rental_end'])
+        alternatives = []
+        if tool:
+            free_ids = {free.id for free in await get_free_tools(tool.category_id, start, end)}
+            alternatives = [other for other in catalog.get_tools_by_total(tool.category_id, data['rental_days'])
+                            if other.id in free_ids and other.id != tool.id][:3]
+        
+        await state.set_state(ApplicationStates.waiting_for_rental_period)
+        await callback.answer()
+        return callback.message.edit_text(
+            f"❌ <b>{data['tool_name']}</b> занят с {start:%d.%m} по {end:%d.%m}.\n\n"
+            "Введите другие даты (например: 'с 20.10 по 25.10' или 'с 20.10 на 3 дня')"
+            + (" или выберите инструмент, свободный на эти даты:" if alternatives else ":"),
+            reply_markup=free_tools_keyboard(alternatives),
+            parse_mode="HTML"
+        )
     
     await state.clear()  # Важно: очистка состояния после успешного сохранения
     
     if application_id:
-        # Уведомление администраторов о новой заявке
-        await notify_admins_about_new_application(application_id, bot)
+        event_log.track("application_confirm", callback.from_user.id, data.get('tool_id'))
+        
+        # Уведомления админов уже в очереди - будим диспетчер рассылки
+        notification_dispatcher.wake()
         
         # Подтверждение пользователю
         await callback.message.edit_text(
@@ -186,7 +355,8 @@ async def confirm_application(callback: types.CallbackQuery, state: FSMContext,
             f"🔧 <b>Инструмент:</b> {data['tool_name']}\n"
             f"📅 <b>Срок аренды:</b> {data['rental_period']}\n"
             f"👤 <b>ФИО:</b> {data['customer_name']}\n"
-            f"📞 <b>Телефон:</b> {data['phone']}\n\n"
+            f"📞 <b>Телефон:</b> {data['phone']}\n"
+            f"{quote_text(data)}\n"
             "<i>Наш менеджер свяжется с вами в ближайшее время для уточнения деталей.</i>",
             parse_mode="HTML"
         )
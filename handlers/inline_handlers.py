@@ -0,0 +1,29 @@
+"""
+Модуль обработчиков inline-режима.
+
+Позволяет вставлять карточки инструментов в любой чат
+через @bot <запрос> со ссылкой на оформление аренды в боте.
+"""
+
+from aiogram import Bot, types
+
+from data.config import INLINE_CACHE_TIME
+from services.inline_search import inline_search
+
+
+async def inline_tool_search(inline_query: types.InlineQuery, bot: Bot):
+    """
+    Отвечает на inline-запрос карточками подходящих инструментов.
+    
+    Args:
+        inline_query: Inline-запрос пользователя
+        bot: Экземпляр бота (нужен username для deep link)
+    """
+    me = await bot.me()
+    results = inline_search.search(inline_query.query, me.username)
+    
+    return inline_query.answer(
+        results,
+        cache_time=INLINE_CACHE_TIME,
+        is_personal=False
+    )
@@ -0,0 +1,66 @@
+"""
+Модуль обработчиков поиска инструментов.
+
+Пользователь вводит запрос в свободной форме ("перфоратор",
+"генератор 5 кВт") и получает подходящие инструменты из каталога,
+найденные полнотекстовым индексом FTS5.
+"""
+
+from aiogram import types
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.state import State, StatesGroup
+
+from database import async_db
+from keyboards.user_kb import search_results_keyboard
+from services.catalog import catalog
+
+
+class SearchStates(StatesGroup):
+    """
+    Состояния режима поиска.
+    
+    States:
+        waiting_for_query: Ожидание ввода поискового запроса
+    """
+    waiting_for_query = State()
+
+
+async def start_search(message: types.Message, state: FSMContext):
+    """
+    Включает режим поиска и просит ввести запрос.
+    
+    Args:
+        message: Объект сообщения от пользователя
+        state: Контекст состояния FSM
+    """
+    await state.set_state(SearchStates.waiting_for_query)
+    return message.answer(
+        "🔍 <b>Поиск инструментов</b>\n\n"
+        "Введите название или характеристику, например: "
+        "<i>перфоратор</i> или <i>генератор 5 кВт</i>",
+        parse_mode="HTML"
+    )
+
+async def process_search_query(message: types.Message, state: FSMContext):
+    """
+    Ищет инструменты по запросу и показывает результаты кнопками.
+    Режим поиска остается включенным для следующего запроса.
+    
+    Args:
+        message: Сообщение с поисковым запросом
+        state: Контекст состояния FSM
+    """
+    tool_ids = await async_db.search_tools(message.text or "")
+    tools = [tool for tool in map(catalog.get_tool_by_id, tool_ids) if tool]
+    
+    if not tools:
+        return message.answer(
+            "😔 Ничего не найдено. Попробуйте другой запрос "
+            "или выберите инструмент в каталоге (/catalog)."
+        )
+    
+    return message.answer(
+        f"🔍 Найдено инструментов: {len(tools)}\n"
+        "Цены указаны за 1 день аренды",
+        reply_markup=search_results_keyboard(tools)
+    )
@@ -6,22 +6,27 @@
 """
 
 from aiogram import types, F
-from aiogram.filters import Command
+from aiogram.filters import Command, CommandObject
 from aiogram.fsm.context import FSMContext
 
-from database import db
-from keyboards.user_kb import (main_keyboard, categories_keyboard, 
-                              tools_keyboard, tool_detail_keyboard)
+from handlers.application_handlers import start_tool_rent
+from services.catalog import catalog
+from services.events import event_log
+from services.render_cache import render_cache
+from services.user_buffer import user_buffer
+from keyboards.callbacks import CategoryPage, ToolCard
+from keyboards.user_kb import main_keyboard
 
 # ОБРАБОТЧИКИ КОМАНД
 
-async def cmd_start(message: types.Message):
+async def cmd_start(message: types.Message, state: FSMContext, command: CommandObject):
     """
     Обработчик команды /start. 
     Регистрирует пользователя и показывает главное меню.
+    По ссылке вида /start rent_<id> сразу начинает аренду инструмента.
     """
-    user = message.from_user
-    db.add_user(user_id=user.id, username=user.username, full_name=user.full_name)
+    # Запись в БД выполняется пакетно при сбросе буфера
+    user_buffer.touch(message.from_user)
     
     welcome_text = (
         "🏗️ <b>RentBrigadir</b> – надежный партнер №1 в реализации ваших проектов!\n\n"
@@ -32,42 +37,47 @@ async def cmd_start(message: types.Message):
         "• Гарантия качества и надежности\n\n"
         "🛠️ <b>Что можно сделать в этом боте:</b>\n"
         "• 🔧 Посмотреть каталог инструментов с ценами\n"
+        "• 🔍 Найти инструмент по названию\n"
         "• 📝 Быстро оформить заявку на аренду\n"
         "• 📞 Узнать контакты и режим работы\n"
         "• ℹ️ Получить помощь и консультацию\n\n"
         "Выберите действие ниже 👇"
     )
     await message.answer(welcome_text, reply_markup=main_keyboard(), parse_mode="HTML")
+    
+    # Deep link из inline-карточки инструмента
+    if command.args and command.args.startswith("rent_") and command.args[5:].isdigit():
+        await start_tool_rent(message, state, int(command.args[5:]))
 
 async def cmd_help(message: types.Message):
     """Обработчик команды /help. Показывает справку по использованию бота."""
-    await show_help(message)
+    return await show_help(message)
 
 async def cmd_contacts(message: types.Message):
     """Обработчик команды /contacts. Показывает контактную информацию."""
-    await show_contacts(message)
+    return await show_contacts(message)
 
 async def cmd_delivery(message: types.Message):
     """Обработчик команды /delivery. Показывает информацию о доставке."""
-    await show_delivery_info(message)
+    return await show_delivery_info(message)
 
 async def cmd_catalog(message: types.Message):
     """Обработчик команды /catalog. Показывает категории инструментов."""
-    await show_categories(message)
+    return await show_categories(message)
 
 # ОБРАБОТЧИКИ ТЕКСТОВЫХ СООБЩЕНИЙ (ГЛАВНОЕ МЕНЮ)
 
 async def show_categories(message: types.Message):
     """Показывает список категорий инструментов."""
-    categories = db.get_all_categories()
+    event_log.track("catalog_view", message.from_user.id)
+    categories = catalog.get_all_categories()
     
     if not categories:
-        await message.answer("📭 Категории временно отсутствуют. Попробуйте позже.")
-        return
+        return message.answer("📭 Категории временно отсутствуют. Попробуйте позже.")
     
-    await message.answer(
+    return message.answer(
         "🏗️ Выберите категорию инструментов:",
-        reply_markup=categories_keyboard(categories)
+        reply_markup=render_cache.categories_markup()
     )
 
 async def show_contacts(message: types.Message):
@@ -93,7 +103,7 @@ async def show_contacts(message: types.Message):
         "• Доставка оборудования\n"
         "• Консультации специалистов"
     )
-    await message.answer(contacts_text, parse_mode="HTML")
+    return message.answer(contacts_text, parse_mode="HTML")
 
 async def show_delivery_info(message: types.Message):
     """Показывает информацию об условиях доставки."""
@@ -136,7 +146,7 @@ async def show_delivery_info(message: types.Message):
 
 💡 <i>Доставка по умолчанию осуществляется "до подъезда"</i>
     """
-    await message.answer(delivery_text, parse_mode="HTML")
+    return message.answer(delivery_text, parse_mode="HTML")
 
 async def show_help(message: types.Message):
     """Показывает справку и ответы на частые вопросы."""
@@ -171,80 +181,84 @@ async def show_help(message: types.Message):
         "⚡ <b>Быстрые команды:</b>\n"
         "/start - Главное меню\n"
         "/catalog - Каталог инструментов\n"
+        "/search - Поиск инструментов\n"
         "/delivery - Условия доставки\n"
         "/contacts - Контактная информация\n"
         "/help - Эта справка"
     )
-    await message.answer(help_text, parse_mode="HTML")
+    return message.answer(help_text, parse_mode="HTML")
 
 
 # ОБРАБОТЧИКИ CALLBACK-ЗАПРОСОВ (ИНСТРУМЕНТЫ)
 
-# В функции show_tools_by_category:
-async def show_tools_by_category(callback: types.CallbackQuery):
-    category_id = int(callback.data.split("_")[1])
-    tools = db.get_tools_by_category(category_id)
-    category = db.get_category_by_id(category_id)
+def is_known_category(callback_data):
+    """Проверка маршрута: категория из кнопки есть в каталоге."""
+    return catalog.get_category_by_id(callback_data.category_id) is not None
+
+def is_known_tool(callback_data):
+    """Проверка маршрута: инструмент из кнопки есть в каталоге."""
+    return catalog.get_tool_by_id(callback_data.tool_id) is not None
+
+async def show_tools_page(callback: types.CallbackQuery, category_id, cursor=None):
+    """Показывает страницу инструментов категории, начиная после курсора."""
+    page = catalog.get_tools_page(category_id, after=cursor)
+    if not page.tools and cursor:
+        # Курсор устарел после обновления каталога - показываем первую страницу
+        page = catalog.get_tools_page(category_id)
     
-    if not tools:
-        await callback.message.edit_text("В этой категории инструменты временно отсутствуют")
-        return
+    if not page.tools:
+        return callback.message.edit_text("В этой категории инструменты временно отсутствуют")
     
-    # Безопасная распаковка - только id и name
-    category_name = category[1] if category else "Инструменты"
+    category = catalog.get_category_by_id(category_id)
+    category_name = category.name if category else "Инструменты"
+    page_info = f" (стр. {page.number} из {page.pages})" if page.pages > 1 else ""
     
-    await callback.message.edit_text(
-        f"<b>{category_name}</b>\n"
+    await callback.answer()
+    return callback.message.edit_text(
+        f"<b>{category_name}</b>{page_info}\n"
         "Цены указаны за 1 день аренды",
-        reply_markup=tools_keyboard(tools),
+        reply_markup=render_cache.tools_markup(page),
         parse_mode="HTML"
     )
-    await callback.answer()
 
-async def show_tool_detail(callback: types.CallbackQuery):
+async def show_tools_by_category(callback: types.CallbackQuery, callback_data: CategoryPage):
+    """
+    Показывает страницу инструментов категории, в т.ч. при возврате
+    из карточки инструмента на страницу, с которой она открыта.
+    """
+    return await show_tools_page(callback, callback_data.category_id, callback_data.cursor)
+
+async def show_tool_detail(callback: types.CallbackQuery, callback_data: ToolCard):
     """Показывает детальную информацию о выбранном инструменте."""
-    tool_id = int(callback.data.split("_")[1])
-    tool = db.get_tool_by_id(tool_id)
+    tool = catalog.get_tool_by_id(callback_data.tool_id)
     
     if not tool:
-        await callback.message.edit_text("❌ Инструмент не найден")
-        return
+        return callback.message.edit_text("❌ Инструмент не найден")
 
-    # Распаковка данных инструмента
-    (tool_id, name, description, category_id, 
-     price_1, price_2, price_3, price_4, price_5, price_6, price_7, price_14, price_30,
-     deposit, image_url, available) = tool
-    
-    # Форматирование текста с ценами
-    price_list = "\n".join([
-        f"• 1 день: {price_1}₽", f"• 2 дня: {price_2}₽", f"• 3 дня: {price_3}₽",
-        f"• 4 дня: {price_4}₽", f"• 5 дней: {price_5}₽", f"• 6 дней: {price_6}₽",
-        f"• 7 дней: {price_7}₽", f"• 14 дней: {price_14}₽", f"• 30 дней: {price_30}₽"
-    ])
-    
-    text = (
-        f"🔧 <b>{name}</b>\n\n"
-        f"{description}\n\n"
-        f"💵 <b>Цены за аренду:</b>\n{price_list}\n\n"
-        f"💰 <b>Залог:</b> {deposit}₽\n\n"
-        f"📞 Для аренды нажмите кнопку ниже 👇"
+    event_log.track("tool_view", callback.from_user.id, tool.id)
+
+    # Курсор страницы, с которой открыт инструмент, нужен для кнопки возврата
+    cursor = catalog.get_tools_page(tool.category_id, after=callback_data.cursor).cursor
+
+    return callback.message.edit_text(
+        render_cache.tool_card(tool),
+        reply_markup=render_cache.tool_detail_markup(tool, cursor),
+        parse_mode="HTML"
     )
-    
-    await callback.message.edit_text(text, reply_markup=tool_detail_keyboard(tool_id), parse_mode="HTML")
 
 async def back_to_categories(callback: types.CallbackQuery):
     """Возвращает пользователя к списку категорий инструментов."""
-    categories = db.get_all_categories()
+    event_log.track("catalog_view", callback.from_user.id)
+    categories = catalog.get_all_categories()
     
     if not categories:
-        await callback.message.edit_text("📭 Категории временно отсутствуют")
-        return
+        return callback.message.edit_text("📭 Категории временно отсутствуют")
     
-    await callback.message.edit_text(
+    await callback.answer()
+    return callback.message.edit_text(
         "🏗️ Выберите категорию инструментов:",
-        reply_markup=categories_keyboard(categories)
+        reply_markup=render_cache.categories_markup()
     )
-    await callback.answer()
 
 async def back_to_main(callback: types.CallbackQuery):
     """Возвращает пользователя в главное меню."""
@@ -256,28 +270,11 @@ async def back_to_main(callback: types.CallbackQuery):
     await callback.answer()
 
 
-async def back_to_tools(callback: types.CallbackQuery):
-    """Возвращает к списку инструментов текущей категории."""
-    # Нужно сохранять ID категории, но для простоты вернем к категориям
-    categories = db.get_all_categories()
-    
-    if not categories:
-        await callback.message.edit_text("📭 Категории временно отсутствуют")
-        return
-    
-    await callback.message.edit_text(
-        "🏗️ Выберите категорию инструментов:",
-        reply_markup=categories_keyboard(categories)
-    )
-    await callback.answer()
-
-
 async def cancel_to_tools(callback: types.CallbackQuery, state: FSMContext):
     """Отменяет текущее действие и возвращает к категориям инструментов."""
     await state.clear()
-    categories = db.get_all_categories()
-    await callback.message.edit_text(
+    await callback.answer()
+    return callback.message.edit_text(
         "🏗️ Выберите категорию инструментов:",
-        reply_markup=categories_keyboard(categories)
-    )
-    await callback.answer()
\ No newline at end of file
+        reply_markup=render_cache.categories_markup()
+    )
\ No newline at end of file
@@ -5,13 +5,21 @@
 и административных клавиатур.
 """
 
+from .callbacks import *
 from .user_kb import *
 from .admin_kb import *
 
 __all__ = [
+    # callbacks
+    'CategoryPage', 'ToolCard', 'RentTool', 'PickTool', 'Inbox',
+    'ApplicationDetail', 'ApplicationProcessed', 'ApplicationCall', 'ReservationRelease',
+    'LEGACY_CALLBACKS',
+    
     # user_kb
     'main_keyboard', 'categories_keyboard', 'tools_keyboard', 
-    'tool_detail_keyboard', 'cancel_application_keyboard', 'confirmation_keyboard',
+    'tool_detail_keyboard', 'search_results_keyboard',
+    'tool_suggestions_keyboard', 'free_tools_keyboard', 'cancel_application_keyboard',
+    'confirmation_keyboard',
     
     # admin_kb
     'application_actions_keyboard', 'applications_list_keyboard', 'admin_main_keyboard'
@@ -7,12 +7,15 @@
 
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 
-def application_actions_keyboard(application_id):
+from .callbacks import Inbox, ApplicationDetail, ApplicationProcessed, ApplicationCall, ReservationRelease
+
+def application_actions_keyboard(application_id, can_release=False):
     """
     Создает клавиатуру действий для конкретной заявки.
     
     Args:
         application_id (int): ID заявки
+        can_release (bool): Есть ли у заявки бронь, которую можно снять
         
     Returns:
         InlineKeyboardMarkup: Клавиатура с действиями администратора
@@ -22,11 +25,11 @@ def application_actions_keyboard(application_id):
             [
                 InlineKeyboardButton(
                     text="✅ Обработано", 
-                    callback_data=f"app_processed_{application_id}"
+                    callback_data=ApplicationProcessed(application_id=application_id).pack()
                 ),
                 InlineKeyboardButton(
                     text="📞 Позвонить", 
-                    callback_data=f"app_call_{application_id}"
+                    callback_data=ApplicationCall(application_id=application_id).pack()
                 )
             ],
             [
@@ -41,23 +44,42 @@ def application_actions_keyboard(application_id):
             ]
         ]
     )
+    if can_release:
+        keyboard.inline_keyboard.insert(1, [
+            InlineKeyboardButton(
+                text="🔓 Снять бронь",
+                callback_data=ReservationRelease(application_id=application_id).pack()
+            )
+        ])
     return keyboard
 
-def applications_list_keyboard(applications):
+# Фильтры списка заявок: (статус в callback_data, подпись кнопки)
+APPLICATION_FILTERS = (
+    ("new", "🆕 Новые"),
+    ("processed", "✅ Обработанные"),
+    ("all", "📋 Все"),
+)
+
+def applications_list_keyboard(applications, status="new", has_prev=False, has_next=False):
     """
-    Создает клавиатуру со списком заявок.
+    Создает клавиатуру со страницей списка заявок.
+    
+    Кнопки навигации несут ID крайней заявки страницы (Inbox.anchor_id):
+    направление n - более старые заявки, p - более новые.
     
     Args:
-        applications (list): Список заявок из БД
+        applications (list): Страница заявок из БД
+        status (str): Текущий фильтр ('new', 'processed', 'all')
+        has_prev (bool): Есть ли более новые заявки
+        has_next (bool): Есть ли более старые заявки
         
     Returns:
         InlineKeyboardMarkup: Клавиатура со списком заявок
     """
     keyboard = InlineKeyboardMarkup(inline_keyboard=[])
     
-    # Добавляем кнопки для каждой заявки (максимум 10)
-    for app in applications[:10]:
-        app_id, user_id, service_name, rental_period, app_date, customer_name, phone, status, username, user_full_name = app
+    for app in applications:
+        app_id, user_id, service_name, rental_period, app_date, customer_name, phone, app_status, username, user_full_name = app
         
         # Обрезаем длинные названия для удобства отображения
         display_name = service_name[:20] + "..." if len(service_name) > 20 else service_name
@@ -65,10 +87,32 @@ def applications_list_keyboard(applications):
         keyboard.inline_keyboard.append([
             InlineKeyboardButton(
                 text=f"#{app_id} {display_name} - {customer_name}", 
-                callback_data=f"app_detail_{app_id}"
+                callback_data=ApplicationDetail(application_id=app_id).pack()
             )
         ])
     
+    # Навигация по страницам
+    navigation = []
+    if has_prev and applications:
+        navigation.append(InlineKeyboardButton(
+            text="◀️ Новее", callback_data=Inbox(status=status, direction="p", anchor_id=applications[0][0]).pack()
+        ))
+    if has_next and applications:
+        navigation.append(InlineKeyboardButton(
+            text="Старее ▶️", callback_data=Inbox(status=status, direction="n", anchor_id=applications[-1][0]).pack()
+        ))
+    if navigation:
+        keyboard.inline_keyboard.append(navigation)
+    
+    # Фильтры по статусу
+    keyboard.inline_keyboard.append([
+        InlineKeyboardButton(
+            text=f"• {title}" if value == status else title,
+            callback_data=Inbox(status=value).pack()
+        )
+        for value, title in APPLICATION_FILTERS
+    ])
+    
     # Добавляем кнопку возврата
     keyboard.inline_keyboard.append([
         InlineKeyboardButton(text="🔙 Назад", callback_data="back_to_admin")
@@ -76,23 +120,29 @@ def applications_list_keyboard(applications):
     
     return keyboard
 
+# Главная клавиатура админ-панели статична и строится один раз при импорте
+_ADMIN_MAIN_KEYBOARD = InlineKeyboardMarkup(
+    inline_keyboard=[
+        [InlineKeyboardButton(
+            text="📋 Новые заявки", 
+            callback_data="new_applications"
+        )],
+        [InlineKeyboardButton(
+            text="📊 Статистика", 
+            callback_data="admin_stats"
+        )],
+        [InlineKeyboardButton(
+            text="📈 Воронка заявок", 
+            callback_data="admin_funnel"
+        )]
+    ]
+)
+
 def admin_main_keyboard():
     """
-    Создает главную клавиатуру админ-панели.
+    Возвращает главную клавиатуру админ-панели.
     
     Returns:
         InlineKeyboardMarkup: Основная клавиатура администратора
     """
-    keyboard = InlineKeyboardMarkup(
-        inline_keyboard=[
-            [InlineKeyboardButton(
-                text="📋 Новые заявки", 
-                callback_data="new_applications"
-            )],
-            [InlineKeyboardButton(
-                text="📊 Статистика", 
-                callback_data="admin_stats"
-            )]
-        ]
-    )
-    return keyboard
\ No newline at end of file
+    return _ADMIN_MAIN_KEYBOARD
@@ -0,0 +1,146 @@
+"""
+Схемы callback_data inline-кнопок.
+
+Каждая кнопка с параметрами описывается одной типизированной схемой:
+клавиатуры упаковывают ее методом pack(), а маршрутизатор callback-запросов
+(middlewares.callback_router) находит обработчик по короткому префиксу
+и распаковывает данные с проверкой типов. Упаковка компактная:
+"<префикс>:<поле>:<поле>", пустое поле - None.
+
+Кнопки без параметров (back_to_categories, confirm_application и т.п.)
+остаются строковыми константами.
+
+Кнопки в уже отправленных сообщениях несут старый формат
+"<префикс>_<поле>_<поле>" (tool_5, category_3_1500_42, app_detail_7);
+LEGACY_CALLBACKS переводит их в схемы, чтобы они продолжали работать.
+"""
+
+from typing import Literal, Optional
+
+from aiogram.filters.callback_data import CallbackData
+from pydantic import NonNegativeInt, PositiveInt
+
+
+class PageCursorMixin:
+    """Курсор страницы списка инструментов: (price_1_day, id) или None для первой страницы."""
+
+    @property
+    def cursor(self):
+        if self.after_id is None or self.price is None:
+            return None
+        return self.price, self.after_id
+
+    @staticmethod
+    def cursor_fields(cursor):
+        """Поля price и after_id для курсора."""
+        if cursor is None:
+            return {"price": None, "after_id": None}
+        price, after_id = cursor
+        return {"price": price, "after_id": after_id}
+
+
+class CategoryPage(PageCursorMixin, CallbackData, prefix="c"):
+    """Страница инструментов категории (в т.ч. возврат к ней из карточки)."""
+
+    category_id: PositiveInt
+    price: Optional[NonNegativeInt] = None
+    after_id: Optional[PositiveInt] = None
+
+    @classmethod
+    def of(cls, category_id, cursor=None):
+        return cls(category_id=category_id, **cls.cursor_fields(cursor))
+
+
+class ToolCard(PageCursorMixin, CallbackData, prefix="t"):
+    """Карточка инструмента; курсор - страница списка, с которой она открыта."""
+
+    tool_id: PositiveInt
+    price: Optional[NonNegativeInt] = None
+    after_id: Optional[PositiveInt] = None
+
+    @classmethod
+    def of(cls, tool_id, cursor=None):
+        return cls(tool_id=tool_id, **cls.cursor_fields(cursor))
+
+
+class RentTool(CallbackData, prefix="r"):
+    """Начало заявки на инструмент из его карточки."""
+
+    tool_id: PositiveInt
+
+
+class PickTool(CallbackData, prefix="p"):
+    """Выбор подсказки при вводе названия инструмента; 0 - оставить как написано."""
+
+    tool_id: NonNegativeInt
+
+
+class Inbox(CallbackData, prefix="i"):
+    """
+    Страница списка заявок: фильтр по статусу и направление от крайней
+    заявки соседней страницы (n - старее, p - новее).
+    """
+
+    status: Literal["new", "processed", "all"]
+    direction: Optional[Literal["n", "p"]] = None
+    anchor_id: Optional[PositiveInt] = None
+
+
+class ApplicationDetail(CallbackData, prefix="ad"):
+    """Карточка заявки."""
+
+    application_id: PositiveInt
+
+
+class ApplicationProcessed(CallbackData, prefix="ap"):
+    """Отметка заявки обработанной."""
+
+    application_id: PositiveInt
+
+
+class ApplicationCall(CallbackData, prefix="ac"):
+    """Показ телефона клиента по заявке."""
+
+    application_id: PositiveInt
+
+
+class ReservationRelease(CallbackData, prefix="rr"):
+    """Снятие брони инструмента по заявке."""
+
+    application_id: PositiveInt
+
+
+def legacy_cursor(parts):
+    """Курсор страницы из хвоста старой callback_data: [] или [price_1_day, tool_id]."""
+    if len(parts) == 2:
+        return int(parts[0]), int(parts[1])
+    return None
+
+
+def legacy_back_to_tools(parts):
+    """back_to_tools_<категория>[_<цена>_<id>]; самые старые кнопки без категории ведут к категориям."""
+    if not parts:
+        return "back_to_categories"
+    return CategoryPage.of(int(parts[0]), legacy_cursor(parts[1:]))
+
+
+def legacy_inbox(parts):
+    """inbox_<статус>[_<n|p>_<id>]; неизвестный статус - новые заявки."""
+    status = parts[0] if parts[0] in ("new", "processed", "all") else "new"
+    if len(parts) == 3:
+        return Inbox(status=status, direction=parts[1], anchor_id=int(parts[2]))
+    return Inbox(status=status)
+
+
+# Префикс старой callback_data -> перевод частей после него в схему (или строку кнопки)
+LEGACY_CALLBACKS = {
+    "category": lambda parts: CategoryPage.of(int(parts[0]), legacy_cursor(parts[1:])),
+    "tool": lambda parts: ToolCard.of(int(parts[0]), legacy_cursor(parts[1:])),
+    "rent": lambda parts: RentTool(tool_id=int(parts[0])),
+    "pick": lambda parts: PickTool(tool_id=int(parts[0])),
+    "back_to_tools": legacy_back_to_tools,
+    "inbox": legacy_inbox,
+    "app_detail": lambda parts: ApplicationDetail(application_id=int(parts[0])),
+    "app_processed": lambda parts: ApplicationProcessed(application_id=int(parts[0])),
+    "app_call": lambda parts: ApplicationCall(application_id=int(parts[0])),
+}
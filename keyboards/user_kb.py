@@ -4,20 +4,44 @@
 
 from aiogram.types import ReplyKeyboardMarkup, KeyboardButton, InlineKeyboardMarkup, InlineKeyboardButton
 
+from .callbacks import CategoryPage, ToolCard, RentTool, PickTool
+
+# Статические клавиатуры не зависят от данных и строятся один раз при импорте
+
+_MAIN_KEYBOARD = ReplyKeyboardMarkup(
+    keyboard=[
+        [KeyboardButton(text="🔧 Инструменты"), KeyboardButton(text="🔍 Поиск")],
+        [KeyboardButton(text="📝 Оставить заявку"), KeyboardButton(text="🚚 Доставка")],
+        [KeyboardButton(text="📞 Контакты"), KeyboardButton(text="ℹ️ Помощь")]
+    ],
+    resize_keyboard=True,
+    input_field_placeholder="Выберите действие..."
+)
+
+_CANCEL_APPLICATION_KEYBOARD = InlineKeyboardMarkup(
+    inline_keyboard=[
+        [InlineKeyboardButton(
+            text="🔙 Назад к инструментам",
+            callback_data="cancel_to_tools"
+        )]
+    ]
+)
+
+_CONFIRMATION_KEYBOARD = InlineKeyboardMarkup(
+    inline_keyboard=[
+        [
+            InlineKeyboardButton(text="✅ Да, отправить", callback_data="confirm_application"),
+            InlineKeyboardButton(text="✏️ Нет, изменить", callback_data="edit_application")
+        ],
+        [InlineKeyboardButton(text="🔙 Назад к инструментам", callback_data="cancel_to_tools")]
+    ]
+)
+
 def main_keyboard():
     """
-    Создает главную reply-клавиатуру бота.
+    Возвращает главную reply-клавиатуру бота.
     """
-    keyboard = ReplyKeyboardMarkup(
-        keyboard=[
-            [KeyboardButton(text="🔧 Инструменты")],
-            [KeyboardButton(text="📝 Оставить заявку"), KeyboardButton(text="🚚 Доставка")],
-            [KeyboardButton(text="📞 Контакты"), KeyboardButton(text="ℹ️ Помощь")]
-        ],
-        resize_keyboard=True,
-        input_field_placeholder="Выберите действие..."
-    )
-    return keyboard
+    return _MAIN_KEYBOARD
 
 def categories_keyboard(categories):
     """
@@ -25,16 +49,11 @@ def categories_keyboard(categories):
     """
     keyboard = InlineKeyboardMarkup(inline_keyboard=[])
     
-    # ИСПРАВЛЯЕМ РАСПАКОВКУ - теперь только 2 значения
     for category in categories:
-        category_id = category[0]  # id
-        name = category[1]         # name
-        # emoji больше нет - убрали category[2]
-        
         keyboard.inline_keyboard.append([
             InlineKeyboardButton(
-                text=name,
-                callback_data=f"category_{category_id}"
+                text=category.name,
+                callback_data=CategoryPage.of(category.id).pack()
             )
         ])
     
@@ -44,25 +63,35 @@ def categories_keyboard(categories):
     
     return keyboard
 
-def tools_keyboard(tools):
+def tools_keyboard(page):
     """
-    Создает inline-клавиатуру со списком инструментов.
+    Создает inline-клавиатуру со страницей инструментов категории.
     """
     keyboard = InlineKeyboardMarkup(inline_keyboard=[])
     
-    # УБИРАЕМ ОГРАНИЧЕНИЕ [8] - показываем ВСЕ инструменты
-    for tool in tools:  # Без [:8]
-        tool_id = tool[0]
-        name = tool[1]
-        price_1_day = tool[4]
-        
+    for tool in page.tools:
         keyboard.inline_keyboard.append([
             InlineKeyboardButton(
-                text=f"{name} - {price_1_day}₽/день",
-                callback_data=f"tool_{tool_id}"
+                text=f"{tool.name} - {tool.price_1_day}₽/день",
+                callback_data=ToolCard.of(tool.id, page.cursor).pack()
             )
         ])
     
+    # Переход между страницами: кнопки несут курсор соседней страницы
+    navigation = []
+    if page.has_prev:
+        navigation.append(InlineKeyboardButton(
+            text="◀️ Назад",
+            callback_data=CategoryPage.of(page.category_id, page.prev_cursor).pack()
+        ))
+    if page.next_cursor:
+        navigation.append(InlineKeyboardButton(
+            text="Далее ▶️",
+            callback_data=CategoryPage.of(page.category_id, page.next_cursor).pack()
+        ))
+    if navigation:
+        keyboard.inline_keyboard.append(navigation)
+    
     # Навигационные кнопки
     keyboard.inline_keyboard.append([
         InlineKeyboardButton(text="🔙 К категориям", callback_data="back_to_categories")
@@ -70,49 +99,92 @@ def tools_keyboard(tools):
     
     return keyboard
 
-def tool_detail_keyboard(tool_id):
+def tool_detail_keyboard(tool_id, category_id, cursor=None):
     """
     Создает inline-клавиатуру для детальной страницы инструмента.
+    Кнопка возврата ведет на ту страницу списка, с которой открыт инструмент.
     """
     keyboard = InlineKeyboardMarkup(
         inline_keyboard=[
             [InlineKeyboardButton(
                 text="📝 Арендовать этот инструмент",
-                callback_data=f"rent_{tool_id}"
+                callback_data=RentTool(tool_id=tool_id).pack()
             )],
             [InlineKeyboardButton(
                 text="🔙 К списку инструментов",
-                callback_data="back_to_tools"
+                callback_data=CategoryPage.of(category_id, cursor).pack()
             )]
         ]
     )
     return keyboard
 
-def cancel_application_keyboard():
+def search_results_keyboard(tools):
     """
-    Создает inline-клавиатуру для отмены заявки.
+    Создает inline-клавиатуру с результатами поиска инструментов.
     """
-    keyboard = InlineKeyboardMarkup(
-        inline_keyboard=[
-            [InlineKeyboardButton(
-                text="🔙 Назад к инструментам",
-                callback_data="cancel_to_tools"
-            )]
-        ]
-    )
+    keyboard = InlineKeyboardMarkup(inline_keyboard=[])
+    
+    for tool in tools:
+        keyboard.inline_keyboard.append([
+            InlineKeyboardButton(
+                text=f"{tool.name} - {tool.price_1_day}₽/день",
+                callback_data=ToolCard.of(tool.id).pack()
+            )
+        ])
+    
+    keyboard.inline_keyboard.append([
+        InlineKeyboardButton(text="🔙 К категориям", callback_data="back_to_categories")
+    ])
+    
+    return keyboard
+
+def tool_suggestions_keyboard(tools):
+    """
+    Создает inline-клавиатуру с подсказками инструментов из каталога
+    для названия, введенного в заявке.
+    """
+    keyboard = InlineKeyboardMarkup(inline_keyboard=[])
+    
+    for tool in tools:
+        keyboard.inline_keyboard.append([
+            InlineKeyboardButton(text=f"🔧 {tool.name}", callback_data=PickTool(tool_id=tool.id).pack())
+        ])
+    
+    keyboard.inline_keyboard.append([
+        InlineKeyboardButton(text="✏️ Оставить как написано", callback_data=PickTool(tool_id=0).pack())
+    ])
+    
     return keyboard
 
+def free_tools_keyboard(tools):
+    """
+    Создает inline-клавиатуру с инструментами, свободными на выбранные даты,
+    когда выбранный инструмент занят.
+    """
+    keyboard = InlineKeyboardMarkup(inline_keyboard=[])
+    
+    for tool in tools:
+        keyboard.inline_keyboard.append([
+            InlineKeyboardButton(
+                text=f"🔧 {tool.name} - {tool.price_1_day}₽/день",
+                callback_data=RentTool(tool_id=tool.id).pack()
+            )
+        ])
+    
+    keyboard.inline_keyboard.append([
+        InlineKeyboardButton(text="🔙 Назад к инструментам", callback_data="cancel_to_tools")
+    ])
+    
+    return keyboard
+
+def cancel_application_keyboard():
+    """
+    Возвращает inline-клавиатуру для отмены заявки.
+    """
+    return _CANCEL_APPLICATION_KEYBOARD
+
 def confirmation_keyboard():
     """
-    Создает inline-клавиатуру для подтверждения заявки.
+    Возвращает inline-клавиатуру для подтверждения заявки.
     """
-    keyboard = InlineKeyboardMarkup(
-        inline_keyboard=[
-            [
-                InlineKeyboardButton(text="✅ Да, отправить", callback_data="confirm_application"),
-                InlineKeyboardButton(text="✏️ Нет, изменить", callback_data="edit_application")
-            ],
-            [InlineKeyboardButton(text="🔙 Назад к инструментам", callback_data="cancel_to_tools")]
-        ]
-    )
-    return keyboard
\ No newline at end of file
+    return _CONFIRMATION_KEYBOARD
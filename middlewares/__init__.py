@@ -0,0 +1,20 @@
+"""
+Пакет middleware для Telegram бота.
+
+Содержит промежуточные обработчики, которые выполняются
+до вызова обработчиков сообщений и callback-запросов.
+"""
+
+from .user_activity import *
+from .callback_router import *
+from .metrics import *
+from .throttling import *
+from .startup import *
+
+__all__ = [
+    'UserActivityMiddleware',
+    'CallbackRouter',
+    'HandlerMetricsMiddleware',
+    'ThrottlingMiddleware',
+    'FirstUpdateMiddleware'
+]
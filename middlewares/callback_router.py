@@ -0,0 +1,145 @@
+"""
+Маршрутизатор callback-запросов.
+"""
+
+from aiogram import BaseMiddleware
+from aiogram.dispatcher.event.handler import HandlerObject
+from aiogram.fsm.state import State
+
+from services.metrics import metrics
+
+STALE_TEXT = "⌛ Кнопка устарела, откройте меню заново"
+
+
+class Route:
+    """Обработчик callback-запроса, схема его данных и условия вызова."""
+
+    __slots__ = ("handler", "schema", "states", "check")
+
+    def __init__(self, handler, schema, states, check):
+        self.handler = handler
+        self.schema = schema
+        self.states = states
+        self.check = check
+
+
+def target_callback(data):
+    """Функция, которая обработает апдейт: цель маршрута или обработчик диспетчера."""
+    route = data.get("route")
+    return route.handler.callback if route else data["handler"].callback
+
+
+class CallbackRouter(BaseMiddleware):
+    """
+    Выбирает обработчик callback-запроса одним поиском по словарю.
+
+    Ключ маршрута - префикс схемы из keyboards.callbacks (часть callback_data
+    до первого ":") или вся строка для кнопок без параметров. Регистрируется
+    как внешний middleware (dp.callback_query.outer_middleware), а единственный
+    обработчик диспетчера - dispatch(). Данные кнопки распаковываются и
+    проверяются здесь, до обработчика: неизвестный префикс, неверный формат,
+    чужое состояние FSM или несуществующий объект каталога только гасят
+    "часики" подсказкой и не доходят до БД. Распакованная схема передается
+    обработчику аргументом callback_data.
+
+    Кнопки старого формата (tool_5, app_detail_7) из отправленных ранее
+    сообщений переводятся в новый таблицей алиасов; к ней обращаются,
+    только если прямого маршрута нет.
+    """
+
+    def __init__(self):
+        self.routes = {}
+        self.aliases = {}
+
+    def add(self, payload, callback, states=None, check=None):
+        """
+        Регистрирует обработчик.
+
+        Args:
+            payload: Схема CallbackData или строка callback_data кнопки без параметров
+            callback: Функция-обработчик
+            states (tuple): Состояния FSM, в которых кнопка действует (None - в любом)
+            check: Проверка распакованных данных без обращения к БД (например,
+                есть ли инструмент в каталоге); False - данные устарели
+        """
+        key = payload if isinstance(payload, str) else payload.__prefix__
+        if key in self.routes:
+            raise ValueError(f"Маршрут callback-запросов {key!r} уже зарегистрирован")
+        if states is not None:
+            states = frozenset(state.state if isinstance(state, State) else state for state in states)
+        self.routes[key] = Route(
+            HandlerObject(callback=callback),
+            None if isinstance(payload, str) else payload,
+            states,
+            check
+        )
+        metrics.register(callback.__name__)
+
+    def alias(self, prefix, convert):
+        """
+        Регистрирует старый формат callback_data "<prefix>_<поле>_<поле>".
+
+        Args:
+            prefix (str): Префикс старой callback_data без "_"
+            convert: Функция: список полей -> схема CallbackData или строка кнопки
+        """
+        if prefix in self.aliases:
+            raise ValueError(f"Алиас callback-запросов {prefix!r} уже зарегистрирован")
+        self.aliases[prefix] = convert
+
+    def upgrade(self, callback_data):
+        """
+        Переводит callback_data старого формата в новый.
+
+        Returns:
+            str: callback_data в новом формате или None, если формат неизвестен
+        """
+        for prefix, convert in self.aliases.items():
+            tail = callback_data[len(prefix):]
+            if not callback_data.startswith(prefix) or tail[:1] not in ("", "_"):
+                continue
+            try:
+                payload = convert(tail.split("_")[1:] if tail else [])
+            except (IndexError, TypeError, ValueError):
+                return None
+            return payload if isinstance(payload, str) else payload.pack()
+        return None
+
+    def resolve(self, callback_data, raw_state):
+        """
+        Находит маршрут и распаковывает данные кнопки.
+
+        Returns:
+            tuple: (маршрут, данные схемы) или (None, None), если кнопка устарела
+        """
+        callback_data = callback_data or ""
+        route = self.routes.get(callback_data.partition(":")[0])
+        if route is None:
+            callback_data = self.upgrade(callback_data)
+            route = self.routes.get((callback_data or "").partition(":")[0])
+        if route is None:
+            return None, None
+        if route.states is not None and raw_state not in route.states:
+            return None, None
+        if route.schema is None:
+            return route, None
+        try:
+            unpacked = route.schema.unpack(callback_data)
+        except (TypeError, ValueError):
+            return None, None
+        if route.check and not route.check(unpacked):
+            return None, None
+        return route, unpacked
+
+    async def __call__(self, handler, event, data):
+        route, unpacked = self.resolve(event.data, data.get("raw_state"))
+        if route is None:
+            metrics.dropped["stale"] += 1
+            return event.answer(STALE_TEXT)
+        data["route"] = route
+        data["callback_data"] = unpacked
+        return await handler(event, data)
+
+    async def dispatch(self, callback, route, **data):
+        """Единственный обработчик callback-запросов диспетчера: вызывает цель маршрута."""
+        return await route.handler.call(callback, **data)
@@ -0,0 +1,48 @@
+"""
+Middleware для метрик обработчиков.
+"""
+
+import time
+
+from aiogram import BaseMiddleware
+from aiogram.methods import TelegramMethod
+
+from middlewares.callback_router import target_callback
+from services.metrics import metrics, current_timings, UpdateTimer, defer_to_reply
+
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    """
+    Замеряет длительность обработчика, выбранного фильтрами.
+
+    Регистрируется как внутренний middleware (dp.message.middleware),
+    поэтому вызывается только для совпавшего обработчика и знает его имя
+    (для callback-запросов - имя цели маршрута CallbackRouter).
+    Время в БД и Bot API накапливается в UpdateTimer слушателями
+    AsyncDatabase и middleware сессии бота.
+
+    Метод, который обработчик вернул вместо вызова (return message.answer(...)),
+    диспетчер отправляет уже после middleware: замер передается этому методу
+    и завершается при его отправке (ApiTimingMiddleware). Если апдейт пришел
+    через webhook (в данных есть reply_in_webhook), ответ уходит в теле
+    HTTP-ответа, и время API такого вызова записывается как не измеренное.
+    """
+
+    async def __call__(self, handler, event, data):
+        timer = UpdateTimer(metrics.register(target_callback(data).__name__), time.perf_counter())
+        token = current_timings.set(timer)
+        try:
+            result = await handler(event, data)
+        except BaseException:
+            timer.finish(failed=True)
+            raise
+        finally:
+            current_timings.reset(token)
+
+        if not isinstance(result, TelegramMethod):
+            timer.finish(failed=False)
+        elif data.get("reply_in_webhook"):
+            timer.finish(failed=False, api_measured=False)
+        else:
+            defer_to_reply(result, timer)
+        return result
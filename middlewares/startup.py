@@ -0,0 +1,37 @@
+"""
+Middleware первого апдейта для быстрого старта.
+"""
+
+from aiogram import BaseMiddleware
+from aiogram.methods import TelegramMethod
+
+from data.config import BOT_MODE
+from services.startup import deferred_startup, startup_profiler
+
+
+class FirstUpdateMiddleware(BaseMiddleware):
+    """
+    Запускает отложенные задачи запуска после обработки первого апдейта.
+
+    Регистрируется как внешний middleware всех апдейтов (dp.update.outer_middleware);
+    после первого апдейта остается только проверка флага. В режиме webhook
+    ответ уходит в теле ответа на webhook, поэтому первый ответ для профиля
+    запуска отмечается здесь, а не в middleware сессии.
+    """
+
+    def __init__(self):
+        self.pending = True
+
+    async def __call__(self, handler, event, data):
+        if not self.pending:
+            return await handler(event, data)
+        self.pending = False
+        startup_profiler.mark("первый апдейт получен")
+        try:
+            result = await handler(event, data)
+        finally:
+            startup_profiler.mark("первый апдейт обработан")
+            deferred_startup.trigger()
+        if BOT_MODE == "webhook" and isinstance(result, TelegramMethod):
+            startup_profiler.finish("первый ответ (в теле webhook)")
+        return result
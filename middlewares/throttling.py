@@ -0,0 +1,130 @@
+"""
+Middleware ограничения частоты запросов пользователей.
+"""
+
+import asyncio
+import time
+
+from aiogram import BaseMiddleware
+from aiogram.methods import TelegramMethod
+from aiogram.types import CallbackQuery
+
+from data.config import THROTTLE_LIMITS, THROTTLE_SWEEP_INTERVAL, THROTTLE_DUPLICATE_TTL
+from middlewares.callback_router import target_callback
+from services.metrics import metrics
+
+# Группа лимитов по модулю обработчика; остальные обработчики - группа "default"
+HANDLER_GROUPS = {
+    "user_handlers": "user",
+    "search_handlers": "search",
+    "application_handlers": "application",
+    "admin_handlers": "admin",
+}
+
+
+class ThrottlingMiddleware(BaseMiddleware):
+    """
+    Корзина токенов на пользователя и группу обработчиков и подавление
+    повторных нажатий одной и той же кнопки.
+
+    Регистрируется как внутренний middleware (dp.callback_query.middleware),
+    поэтому знает выбранный обработчик и его группу. Пока callback с некоторыми
+    callback_data обрабатывается, такие же нажатия того же пользователя
+    только гасят "часики" на кнопке и не доходят до обработчика и БД.
+    Если обработчик вернул метод Bot API, его отправляет диспетчер уже после
+    middleware, поэтому нажатие остается "в обработке" еще duplicate_ttl сек.
+
+    Корзина хранится как [токены, время пополнения, предупрежден]; корзины,
+    которые успели бы наполниться до краев, ничем не отличаются от новых
+    и периодически удаляются.
+    """
+
+    def __init__(self, limits=THROTTLE_LIMITS, sweep_interval=THROTTLE_SWEEP_INTERVAL,
+                 duplicate_ttl=THROTTLE_DUPLICATE_TTL):
+        self.limits = limits
+        self.sweep_interval = sweep_interval
+        self.duplicate_ttl = duplicate_ttl
+        # (user_id, группа) -> [токены, время пополнения, предупрежден]
+        self._buckets = {}
+        # (user_id, callback_data) нажатий, которые сейчас обрабатываются
+        self._in_flight = set()
+        self._next_sweep = time.monotonic() + sweep_interval
+
+    def _limit(self, group):
+        return self.limits.get(group, self.limits["default"])
+
+    def _take(self, key, now):
+        """
+        Забирает токен из корзины.
+
+        Returns:
+            tuple: (разрешено, нужно ли предупредить пользователя)
+        """
+        rate, capacity = self._limit(key[1])
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [capacity, now, False]
+        else:
+            bucket[0] = min(capacity, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            bucket[2] = False
+            return True, False
+        # Предупреждаем один раз за серию отказов
+        warn = not bucket[2]
+        bucket[2] = True
+        return False, warn
+
+    def _sweep(self, now):
+        """Удаляет корзины, которые за время простоя наполнились бы полностью."""
+        self._buckets = {
+            key: bucket for key, bucket in self._buckets.items()
+            if (now - bucket[1]) * self._limit(key[1])[0] < self._limit(key[1])[1]
+        }
+        self._next_sweep = now + self.sweep_interval
+
+    async def __call__(self, handler, event, data):
+        user = data.get("event_from_user")
+        if user is None:
+            return await handler(event, data)
+
+        duplicate_key = None
+        if isinstance(event, CallbackQuery):
+            duplicate_key = (user.id, event.data)
+            if duplicate_key in self._in_flight:
+                metrics.dropped["duplicate"] += 1
+                return event.answer()
+
+        now = time.monotonic()
+        if now >= self._next_sweep:
+            self._sweep(now)
+        module = target_callback(data).__module__.rpartition(".")[2]
+        allowed, warn = self._take((user.id, HANDLER_GROUPS.get(module, "default")), now)
+        if not allowed:
+            metrics.dropped["throttled"] += 1
+            if duplicate_key:
+                return event.answer("⏳ Слишком часто, подождите немного")
+            if warn:
+                return event.answer("⏳ Слишком много сообщений подряд, подождите немного")
+            return None
+
+        if duplicate_key is None:
+            return await handler(event, data)
+        self._in_flight.add(duplicate_key)
+        try:
+            result = await handler(event, data)
+        except BaseException:
+            self._in_flight.discard(duplicate_key)
+            raise
+
+        if isinstance(result, TelegramMethod):
+            # Ответ еще не отправлен: повторное нажатие до его отправки
+            # (например, второй "Да, отправить") тоже должно отбрасываться
+            asyncio.get_running_loop().call_later(
+                self.duplicate_ttl, self._in_flight.discard, duplicate_key
+            )
+        else:
+            self._in_flight.discard(duplicate_key)
+        return result
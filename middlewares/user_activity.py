@@ -0,0 +1,22 @@
+"""
+Middleware для учета активности пользователей.
+"""
+
+from aiogram import BaseMiddleware
+
+from services.user_buffer import user_buffer
+
+
+class UserActivityMiddleware(BaseMiddleware):
+    """
+    Отмечает пользователя в буфере регистрации при каждом событии.
+
+    Запись в БД не выполняется: last_seen обновляется пакетно
+    при сбросе буфера, без отдельного commit() на каждое сообщение.
+    """
+
+    async def __call__(self, handler, event, data):
+        user = data.get("event_from_user")
+        if user and not user.is_bot:
+            user_buffer.touch(user)
+        return await handler(event, data)
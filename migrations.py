@@ -0,0 +1,489 @@
+"""
+Модуль версионных миграций схемы базы данных.
+
+Текущая версия схемы хранится в таблице schema_version.
+При подключении к БД применяются по порядку все миграции
+с номером больше текущей версии, каждая в своей транзакции.
+"""
+
+
+def _initial_schema(conn):
+    """Исходные таблицы бота."""
+    # Таблица пользователей
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY,
+            username TEXT,
+            full_name TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # Таблица категорий
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS categories (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL UNIQUE
+        )
+    ''')
+
+    # Таблица инструментов
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS tools (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            description TEXT,
+            category_id INTEGER,
+            price_1_day INTEGER,
+            price_2_days INTEGER,
+            price_3_days INTEGER,
+            price_4_days INTEGER,
+            price_5_days INTEGER,
+            price_6_days INTEGER,
+            price_7_days INTEGER,
+            price_14_days INTEGER,
+            price_30_days INTEGER,
+            deposit INTEGER,
+            image_url TEXT,
+            available BOOLEAN DEFAULT TRUE
+        )
+    ''')
+
+    # Таблица заявок
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS applications (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            service_name TEXT,
+            rental_period TEXT,
+            application_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            customer_name TEXT,
+            phone TEXT,
+            status TEXT DEFAULT 'new'
+        )
+    ''')
+
+
+def _users_last_seen(conn):
+    """Время последней активности пользователя."""
+    # В БД, созданных до появления миграций, колонка уже может существовать
+    if not _has_column(conn, 'users', 'last_seen'):
+        conn.execute("ALTER TABLE users ADD COLUMN last_seen TIMESTAMP")
+
+
+def _catalog_meta(conn):
+    """Служебные значения каталога (хеш последнего импорта CSV)."""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS catalog_meta (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        )
+    ''')
+
+
+def _hot_query_indexes(conn):
+    """Индексы для частых запросов к заявкам и инструментам."""
+    # Новые заявки: WHERE status = ? ORDER BY application_date
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_applications_status_date
+        ON applications (status, application_date)
+    ''')
+    # Последние заявки: ORDER BY application_date
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_applications_date
+        ON applications (application_date)
+    ''')
+    # Статистика: покрывающий индекс для подсчета по статусам и клиентам
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_applications_user_status
+        ON applications (user_id, status)
+    ''')
+    # Инструменты категории: WHERE category_id = ? AND available ORDER BY price_1_day
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_tools_category_price
+        ON tools (category_id, available, price_1_day)
+    ''')
+
+
+def _tools_fts(conn):
+    """Полнотекстовый индекс FTS5 по названию и описанию инструментов."""
+    # External content: текст хранится только в tools, индекс синхронизируют триггеры.
+    # prefix ускоряет поиск по началу слова ("перфорат*") для русских словоформ
+    conn.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS tools_fts USING fts5(
+            name, description,
+            content='tools', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2',
+            prefix='2 3 4'
+        )
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS tools_fts_insert AFTER INSERT ON tools BEGIN
+            INSERT INTO tools_fts (rowid, name, description)
+            VALUES (new.id, new.name, new.description);
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS tools_fts_delete AFTER DELETE ON tools BEGIN
+            INSERT INTO tools_fts (tools_fts, rowid, name, description)
+            VALUES ('delete', old.id, old.name, old.description);
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS tools_fts_update AFTER UPDATE ON tools BEGIN
+            INSERT INTO tools_fts (tools_fts, rowid, name, description)
+            VALUES ('delete', old.id, old.name, old.description);
+            INSERT INTO tools_fts (rowid, name, description)
+            VALUES (new.id, new.name, new.description);
+        END
+    ''')
+    # Индексируем инструменты, импортированные до появления FTS
+    conn.execute("INSERT INTO tools_fts (tools_fts) VALUES ('rebuild')")
+
+
+def _applications_tool_id(conn):
+    """Ссылка заявки на инструмент каталога."""
+    if not _has_column(conn, 'applications', 'tool_id'):
+        conn.execute("ALTER TABLE applications ADD COLUMN tool_id INTEGER REFERENCES tools (id) ON DELETE SET NULL")
+
+
+def _fsm_sessions(conn):
+    """Состояния FSM пользователей (незавершенные заявки)."""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS fsm_sessions (
+            key TEXT PRIMARY KEY,
+            state TEXT,
+            data TEXT NOT NULL DEFAULT '{}',
+            updated_at REAL NOT NULL
+        )
+    ''')
+    # Очистка брошенных сессий: WHERE updated_at < ?
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_fsm_sessions_updated
+        ON fsm_sessions (updated_at)
+    ''')
+
+
+def _notification_outbox(conn):
+    """Очередь исходящих уведомлений, записываемая вместе с заявкой."""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS notification_outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL,
+            application_id INTEGER REFERENCES applications (id) ON DELETE CASCADE,
+            chat_id INTEGER NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at REAL NOT NULL,
+            last_error TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    # Выборка к отправке: WHERE status = 'pending' AND next_attempt_at <= ?
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_notification_outbox_due
+        ON notification_outbox (next_attempt_at) WHERE status = 'pending'
+    ''')
+
+
+def rebuild_stats(conn):
+    """
+    Пересчитывает счетчики статистики заявок с нуля по таблице applications.
+    Вызывается внутри транзакции писателя.
+    """
+    for table in ('stats_totals', 'stats_customers', 'stats_daily', 'stats_tools', 'stats_categories'):
+        conn.execute(f"DELETE FROM {table}")
+
+    conn.execute('''
+        INSERT INTO stats_totals (id, total, new_count, processed_count, unique_customers)
+        SELECT 1,
+            COUNT(*),
+            COALESCE(SUM(status = 'new'), 0),
+            COALESCE(SUM(status = 'processed'), 0),
+            COUNT(DISTINCT user_id)
+        FROM applications
+    ''')
+    conn.execute('''
+        INSERT INTO stats_customers (user_id, applications)
+        SELECT user_id, COUNT(*) FROM applications
+        WHERE user_id IS NOT NULL
+        GROUP BY user_id
+    ''')
+    conn.execute('''
+        INSERT INTO stats_daily (day, applications, processed)
+        SELECT date(application_date), COUNT(*), SUM(status = 'processed')
+        FROM applications
+        GROUP BY date(application_date)
+    ''')
+    conn.execute('''
+        INSERT INTO stats_tools (tool_id, applications)
+        SELECT tool_id, COUNT(*) FROM applications
+        WHERE tool_id IS NOT NULL
+        GROUP BY tool_id
+    ''')
+    conn.execute('''
+        INSERT INTO stats_categories (category_id, applications)
+        SELECT t.category_id, COUNT(*)
+        FROM applications a
+        JOIN tools t ON t.id = a.tool_id
+        WHERE t.category_id IS NOT NULL
+        GROUP BY t.category_id
+    ''')
+
+
+def _stats_counters(conn):
+    """Счетчики статистики заявок, обновляемые триггерами в транзакции записи."""
+    # Сводка для панели администратора - всегда одна строка с id = 1
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS stats_totals (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            total INTEGER NOT NULL DEFAULT 0,
+            new_count INTEGER NOT NULL DEFAULT 0,
+            processed_count INTEGER NOT NULL DEFAULT 0,
+            unique_customers INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    # Заявки по клиентам: нужны, чтобы считать уникальных клиентов без COUNT(DISTINCT)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS stats_customers (
+            user_id INTEGER PRIMARY KEY,
+            applications INTEGER NOT NULL
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS stats_daily (
+            day TEXT PRIMARY KEY,
+            applications INTEGER NOT NULL DEFAULT 0,
+            processed INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS stats_tools (
+            tool_id INTEGER PRIMARY KEY,
+            applications INTEGER NOT NULL
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS stats_categories (
+            category_id INTEGER PRIMARY KEY,
+            applications INTEGER NOT NULL
+        )
+    ''')
+
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS stats_application_insert AFTER INSERT ON applications BEGIN
+            UPDATE stats_totals SET
+                total = total + 1,
+                new_count = new_count + (new.status = 'new'),
+                processed_count = processed_count + (new.status = 'processed'),
+                unique_customers = unique_customers + (
+                    new.user_id IS NOT NULL
+                    AND NOT EXISTS (SELECT 1 FROM stats_customers WHERE user_id = new.user_id)
+                )
+            WHERE id = 1;
+            INSERT INTO stats_customers (user_id, applications)
+            SELECT new.user_id, 1 WHERE new.user_id IS NOT NULL
+            ON CONFLICT (user_id) DO UPDATE SET applications = applications + 1;
+            INSERT INTO stats_daily (day, applications, processed)
+            VALUES (date(new.application_date), 1, new.status = 'processed')
+            ON CONFLICT (day) DO UPDATE SET
+                applications = applications + 1,
+                processed = processed + excluded.processed;
+            INSERT INTO stats_tools (tool_id, applications)
+            SELECT new.tool_id, 1 WHERE new.tool_id IS NOT NULL
+            ON CONFLICT (tool_id) DO UPDATE SET applications = applications + 1;
+            INSERT INTO stats_categories (category_id, applications)
+            SELECT category_id, 1 FROM tools WHERE id = new.tool_id AND category_id IS NOT NULL
+            ON CONFLICT (category_id) DO UPDATE SET applications = applications + 1;
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS stats_application_status AFTER UPDATE OF status ON applications
+        WHEN old.status IS NOT new.status BEGIN
+            UPDATE stats_totals SET
+                new_count = new_count - (old.status = 'new') + (new.status = 'new'),
+                processed_count = processed_count - (old.status = 'processed') + (new.status = 'processed')
+            WHERE id = 1;
+            UPDATE stats_daily
+            SET processed = processed - (old.status = 'processed') + (new.status = 'processed')
+            WHERE day = date(new.application_date);
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS stats_application_delete AFTER DELETE ON applications BEGIN
+            UPDATE stats_customers SET applications = applications - 1 WHERE user_id = old.user_id;
+            UPDATE stats_totals SET
+                total = total - 1,
+                new_count = new_count - (old.status = 'new'),
+                processed_count = processed_count - (old.status = 'processed'),
+                unique_customers = unique_customers - (
+                    SELECT COUNT(*) FROM stats_customers WHERE user_id = old.user_id AND applications = 0
+                )
+            WHERE id = 1;
+            DELETE FROM stats_customers WHERE user_id = old.user_id AND applications = 0;
+            UPDATE stats_daily SET
+                applications = applications - 1,
+                processed = processed - (old.status = 'processed')
+            WHERE day = date(old.application_date);
+            UPDATE stats_tools SET applications = applications - 1 WHERE tool_id = old.tool_id;
+            UPDATE stats_categories SET applications = applications - 1
+            WHERE category_id = (SELECT category_id FROM tools WHERE id = old.tool_id);
+        END
+    ''')
+
+    # Заполняем счетчики по уже накопленным заявкам
+    rebuild_stats(conn)
+
+
+def _funnel_events(conn):
+    """Журнал событий воронки и почасовые агрегаты для отчетов."""
+    # Сырые события только дописываются и не читаются отчетами
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            created_at REAL NOT NULL,
+            event TEXT NOT NULL,
+            user_id INTEGER,
+            tool_id INTEGER
+        )
+    ''')
+    # Почасовые агрегаты: tool_id = 0 для событий без инструмента
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS events_hourly (
+            hour TEXT NOT NULL,
+            event TEXT NOT NULL,
+            tool_id INTEGER NOT NULL DEFAULT 0,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (hour, event, tool_id)
+        )
+    ''')
+
+
+def _catalog_version(conn):
+    """Счетчик изменений каталога для проверки снимка быстрого старта."""
+    conn.execute("INSERT OR IGNORE INTO catalog_meta (key, value) VALUES ('catalog_version', '0')")
+    # Любое изменение категорий или инструментов увеличивает версию,
+    # поэтому снимок, собранный до изменения, перестает совпадать с БД
+    for table in ('categories', 'tools'):
+        for event in ('INSERT', 'UPDATE', 'DELETE'):
+            conn.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS {table}_version_{event.lower()} AFTER {event} ON {table} BEGIN
+                    UPDATE catalog_meta SET value = CAST(value AS INTEGER) + 1
+                    WHERE key = 'catalog_version';
+                END
+            ''')
+
+
+def _reservations(conn):
+    """Количество единиц инструмента и бронирования на даты по заявкам."""
+    if not _has_column(conn, 'tools', 'units'):
+        conn.execute("ALTER TABLE tools ADD COLUMN units INTEGER NOT NULL DEFAULT 1")
+    # Даты - ISO-строки 'YYYY-MM-DD', конец включительно
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS reservations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            application_id INTEGER REFERENCES applications (id) ON DELETE CASCADE,
+            tool_id INTEGER NOT NULL REFERENCES tools (id) ON DELETE CASCADE,
+            start_date TEXT NOT NULL,
+            end_date TEXT NOT NULL,
+            units INTEGER NOT NULL DEFAULT 1,
+            status TEXT NOT NULL DEFAULT 'active',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    # Пересечение с периодом: WHERE tool_id = ? AND end_date >= ? AND start_date <= ?.
+    # Первым после tool_id идет end_date, поэтому завершившиеся брони
+    # не просматриваются; индекс покрывающий и только по активным броням
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_reservations_tool_dates
+        ON reservations (tool_id, end_date, start_date, units) WHERE status = 'active'
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_reservations_application
+        ON reservations (application_id)
+    ''')
+
+
+def _reservation_requests(conn):
+    """Брони по заявкам клиентов ждут подтверждения администратора."""
+    # Статусы броней: 'requested' - даты из заявки клиента, единицу не занимают;
+    # 'active' - подтверждена администратором; 'released' - снята.
+    # Брони необработанных заявок еще никто не подтверждал
+    conn.execute('''
+        UPDATE reservations SET status = 'requested'
+        WHERE status = 'active'
+          AND application_id IN (SELECT id FROM applications WHERE status = 'new')
+    ''')
+
+
+# Упорядоченный список миграций: (версия, описание, функция)
+MIGRATIONS = [
+    (1, "Исходная схема", _initial_schema),
+    (2, "users.last_seen", _users_last_seen),
+    (3, "Таблица catalog_meta", _catalog_meta),
+    (4, "Индексы для частых запросов", _hot_query_indexes),
+    (5, "Полнотекстовый поиск по инструментам", _tools_fts),
+    (6, "applications.tool_id", _applications_tool_id),
+    (7, "Таблица fsm_sessions", _fsm_sessions),
+    (8, "Таблица notification_outbox", _notification_outbox),
+    (9, "Счетчики статистики заявок", _stats_counters),
+    (10, "Журнал событий воронки", _funnel_events),
+    (11, "Версия каталога", _catalog_version),
+    (12, "Бронирования инструментов", _reservations),
+    (13, "Подтверждение броней администратором", _reservation_requests),
+]
+
+
+def _has_column(conn, table, column):
+    return column in [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+
+def get_schema_version(conn):
+    """Возвращает текущую версию схемы БД."""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    return conn.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version").fetchone()[0]
+
+
+def apply_migrations(conn):
+    """
+    Применяет к БД все миграции новее текущей версии схемы.
+
+    Каждая миграция начинается с BEGIN IMMEDIATE до чтения версии схемы:
+    блокировка записи берется сразу, поэтому процесс, запущенный
+    одновременно (несколько webhook-воркеров), ждет ее и видит шаг
+    уже примененным, а не применяет его второй раз.
+
+    Args:
+        conn: Соединение-писатель sqlite3
+
+    Returns:
+        int: Версия схемы после применения миграций
+    """
+    current_version = 0
+
+    for version, description, migrate in MIGRATIONS:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            current_version = get_schema_version(conn)
+            if version <= current_version:
+                conn.rollback()
+                continue
+            migrate(conn)
+            conn.execute(
+                "INSERT INTO schema_version (version, description) VALUES (?, ?)",
+                (version, description)
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        current_version = version
+        print(f"✅ Применена миграция {version}: {description}")
+
+    return current_version
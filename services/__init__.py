@@ -4,9 +4,62 @@
 Содержит модули с бизнес-логикой и утилитами.
 """
 
+from .catalog import *
+from .catalog_snapshot import *
+from .events import *
+from .fsm_storage import *
+from .inline_search import *
+from .metrics import *
 from .notifications import *
+from .quotes import *
+from .render_cache import *
+from .reservations import *
+from .startup import *
+from .user_buffer import *
 
 __all__ = [
-    'notify_admins_about_new_application',
-    'notify_application_processed'
+    'Category',
+    'Tool',
+    'Catalog',
+    'catalog',
+    'PRICE_TIERS',
+    'tokenize',
+    'load_catalog',
+    'save_catalog_snapshot',
+    'FUNNEL_STEPS',
+    'EventLog',
+    'event_log',
+    'event_hour',
+    'SQLiteStorage',
+    'fsm_storage',
+    'TTLCache',
+    'InlineSearch',
+    'inline_search',
+    'Histogram',
+    'HandlerMetrics',
+    'Metrics',
+    'metrics',
+    'ApiTimingMiddleware',
+    'start_metrics_server',
+    'new_application_text',
+    'Quote',
+    'PriceMatrix',
+    'parse_rental_period',
+    'parse_dates',
+    'rental_dates',
+    'days_text',
+    'TokenBucket',
+    'NotificationDispatcher',
+    'notification_dispatcher',
+    'RenderCache',
+    'render_cache',
+    'tool_card_text',
+    'get_free_tools',
+    'StartupProfiler',
+    'DeferredStartup',
+    'FirstResponseMiddleware',
+    'startup_profiler',
+    'deferred_startup',
+    'UserBuffer',
+    'user_buffer'
 ]
\ No newline at end of file
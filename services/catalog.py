@@ -0,0 +1,328 @@
+"""
+Модуль кэша каталога инструментов.
+
+Каталог меняется только при импорте tools.csv, поэтому категории
+и инструменты один раз загружаются в память и отдаются обработчикам
+без обращений к БД. При каждом импорте кэш пересобирается целиком
+и подменяется одной операцией присваивания.
+"""
+
+import re
+from bisect import bisect_left, bisect_right
+
+from data.config import TOOLS_PAGE_SIZE, FUZZY_MIN_SCORE
+from database import db
+from services.quotes import PriceMatrix
+
+
+def tokenize(text):
+    """Разбивает текст на слова в нижнем регистре."""
+    return re.findall(r"\w+", text.lower().replace("ё", "е"))
+
+
+def trigrams(text):
+    """
+    Возвращает множество символьных триграмм нормализованного текста.
+    Слова дополняются пробелами, чтобы начало и конец слова давали свои триграммы.
+    """
+    grams = set()
+    for word in tokenize(text):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class Category:
+    """Категория инструментов."""
+
+    __slots__ = ("id", "name")
+
+    def __init__(self, id, name):
+        self.id = id
+        self.name = name
+
+
+class Tool:
+    """Инструмент каталога с ценами по срокам аренды PRICE_TIERS."""
+
+    __slots__ = ("id", "name", "description", "category_id", "prices",
+                 "deposit", "image_url", "available", "units")
+
+    def __init__(self, id, name, description, category_id, prices, deposit, image_url, available, units=1):
+        self.id = id
+        self.name = name
+        self.description = description
+        self.category_id = category_id
+        self.prices = prices
+        self.deposit = deposit
+        self.image_url = image_url
+        self.available = available
+        self.units = units
+
+    @classmethod
+    def from_row(cls, row):
+        """Создает инструмент из строки таблицы tools."""
+        return cls(
+            id=row[0],
+            name=row[1],
+            description=row[2],
+            category_id=row[3],
+            prices=tuple(row[4:13]),
+            deposit=row[13],
+            image_url=row[14],
+            available=bool(row[15]),
+            units=row[16],
+        )
+
+    @property
+    def price_1_day(self):
+        return self.prices[0]
+
+
+class ToolsPage:
+    """
+    Страница списка инструментов категории.
+
+    Курсор страницы - ключ (price_1_day, id) последнего инструмента
+    перед ней, None для первой страницы.
+    """
+
+    __slots__ = ("category_id", "tools", "cursor", "has_prev", "prev_cursor",
+                 "next_cursor", "number", "pages")
+
+    def __init__(self, category_id, tools, cursor, has_prev, prev_cursor, next_cursor, number, pages):
+        self.category_id = category_id
+        self.tools = tools
+        self.cursor = cursor
+        self.has_prev = has_prev
+        self.prev_cursor = prev_cursor
+        self.next_cursor = next_cursor
+        self.number = number
+        self.pages = pages
+
+
+class CatalogSnapshot:
+    """Неизменяемый снимок каталога с готовыми индексами."""
+
+    __slots__ = ("version", "categories", "categories_by_id",
+                 "tools_by_id", "tools_by_category", "tool_keys_by_category",
+                 "prefix_index", "trigram_index", "trigram_counts", "price_matrix")
+
+    def __init__(self, version, categories, tools):
+        self.version = version
+        self.categories = sorted(categories, key=lambda c: c.name)
+        self.categories_by_id = {c.id: c for c in categories}
+        self.tools_by_id = {t.id: t for t in tools}
+
+        # Списки по категориям отсортированы так же, как в get_tools_by_category
+        self.tools_by_category = {}
+        for tool in sorted(tools, key=lambda t: (t.price_1_day, t.id)):
+            if tool.available:
+                self.tools_by_category.setdefault(tool.category_id, []).append(tool)
+
+        # Ключи (price_1_day, id) для постраничного вывода через bisect
+        self.tool_keys_by_category = {
+            category_id: [(t.price_1_day, t.id) for t in category_tools]
+            for category_id, category_tools in self.tools_by_category.items()
+        }
+
+        # Отсортированные пары (слово, id) из названий инструментов и категорий:
+        # все слова с заданным префиксом лежат в списке подряд
+        index = set()
+        for category_tools in self.tools_by_category.values():
+            for tool in category_tools:
+                category = self.categories_by_id.get(tool.category_id)
+                text = f"{tool.name} {category.name if category else ''}"
+                index.update((word, tool.id) for word in tokenize(text))
+        self.prefix_index = sorted(index)
+
+        # Триграммный индекс названий для нечеткого поиска: триграмма -> ID инструментов
+        self.trigram_index = {}
+        self.trigram_counts = {}
+        for category_tools in self.tools_by_category.values():
+            for tool in category_tools:
+                grams = trigrams(tool.name)
+                self.trigram_counts[tool.id] = len(grams)
+                for gram in grams:
+                    self.trigram_index.setdefault(gram, []).append(tool.id)
+
+        # Стоимость аренды всех инструментов на любой срок до QUOTE_MAX_DAYS
+        self.price_matrix = PriceMatrix(tools)
+
+
+class Catalog:
+    """Процессный кэш каталога: категории и инструменты без запросов к БД."""
+
+    def __init__(self):
+        self._snapshot = CatalogSnapshot(0, [], [])
+
+    @property
+    def version(self):
+        """Номер версии каталога, растет при каждой перезагрузке."""
+        return self._snapshot.version
+
+    def load(self, category_rows, tool_rows):
+        """
+        Пересобирает кэш из строк таблиц categories и tools.
+
+        Новый снимок строится целиком и подменяет старый атомарно,
+        поэтому обработчики никогда не видят частично обновленный каталог.
+        """
+        categories = [Category(row[0], row[1]) for row in category_rows]
+        tools = [Tool.from_row(row) for row in tool_rows]
+        self._snapshot = CatalogSnapshot(self._snapshot.version + 1, categories, tools)
+        print(f"✅ Каталог загружен в память: {len(categories)} категорий, {len(tools)} инструментов")
+
+    @property
+    def snapshot(self):
+        """Текущий снимок каталога (для сохранения на диск)."""
+        return self._snapshot
+
+    def install(self, snapshot):
+        """
+        Подменяет кэш готовым снимком, например прочитанным с диска.
+
+        Индексы не пересобираются; снимок получает следующий номер версии,
+        чтобы кэши, привязанные к версии каталога, сбросились.
+        """
+        snapshot.version = self._snapshot.version + 1
+        self._snapshot = snapshot
+        print(f"✅ Каталог загружен из снимка: {len(snapshot.categories)} категорий, "
+              f"{len(snapshot.tools_by_id)} инструментов")
+
+    def get_all_categories(self):
+        """Получить все категории (отсортированы по названию)"""
+        return self._snapshot.categories
+
+    def get_category_by_id(self, category_id):
+        """Получить категорию по ID"""
+        return self._snapshot.categories_by_id.get(category_id)
+
+    def get_tools_by_category(self, category_id):
+        """Получить доступные инструменты категории (по цене за 1 день)"""
+        return self._snapshot.tools_by_category.get(category_id, [])
+
+    def get_tools_by_total(self, category_id, days):
+        """Получить доступные инструменты категории по стоимости аренды на days дней"""
+        snapshot = self._snapshot
+        return snapshot.price_matrix.sort(snapshot.tools_by_category.get(category_id, []), days)
+
+    def quote(self, tool, days):
+        """
+        Рассчитать стоимость аренды инструмента.
+
+        Args:
+            tool (Tool): Инструмент из каталога
+            days (int): Срок аренды в днях
+
+        Returns:
+            Quote: Стоимость, комбинация тарифов и залог или None,
+                если срок вне 1..QUOTE_MAX_DAYS
+        """
+        return self._snapshot.price_matrix.quote(tool, days)
+
+    def get_tools_page(self, category_id, after=None, limit=TOOLS_PAGE_SIZE):
+        """
+        Получить страницу инструментов категории после курсора.
+
+        Args:
+            category_id (int): ID категории
+            after (tuple): Ключ (price_1_day, id), после которого начинается страница
+            limit (int): Размер страницы
+
+        Returns:
+            ToolsPage: Страница с курсорами соседних страниц
+        """
+        snapshot = self._snapshot
+        tools = snapshot.tools_by_category.get(category_id, [])
+        keys = snapshot.tool_keys_by_category.get(category_id, [])
+
+        start = bisect_right(keys, after) if after else 0
+        end = start + limit
+        prev_start = max(0, start - limit)
+
+        return ToolsPage(
+            category_id=category_id,
+            tools=tools[start:end],
+            cursor=keys[start - 1] if start else None,
+            has_prev=start > 0,
+            prev_cursor=keys[prev_start - 1] if prev_start else None,
+            next_cursor=keys[end - 1] if end < len(keys) else None,
+            number=(start + limit - 1) // limit + 1,
+            pages=max(1, (len(keys) + limit - 1) // limit),
+        )
+
+    def get_tool_by_id(self, tool_id):
+        """Получить инструмент по ID"""
+        return self._snapshot.tools_by_id.get(tool_id)
+
+    def fuzzy_match(self, text, limit=3, min_score=FUZZY_MIN_SCORE):
+        """
+        Находит инструменты с названием, похожим на произвольный текст.
+
+        Похожесть - коэффициент Дайса по символьным триграммам,
+        поэтому опечатки и перестановка слов ("перфоратор макита",
+        "KEOS 250") не мешают совпадению.
+
+        Args:
+            text (str): Название, введенное пользователем
+            limit (int): Максимальное количество результатов
+            min_score (float): Минимальная похожесть от 0 до 1
+
+        Returns:
+            list: Пары (инструмент, похожесть) по убыванию похожести
+        """
+        snapshot = self._snapshot
+        query_grams = trigrams(text)
+        if not query_grams:
+            return []
+
+        common = {}
+        for gram in query_grams:
+            for tool_id in snapshot.trigram_index.get(gram, ()):
+                common[tool_id] = common.get(tool_id, 0) + 1
+
+        scored = []
+        for tool_id, count in common.items():
+            score = 2 * count / (len(query_grams) + snapshot.trigram_counts[tool_id])
+            if score >= min_score:
+                scored.append((score, tool_id))
+        scored.sort(reverse=True)
+        return [(snapshot.tools_by_id[tool_id], score) for score, tool_id in scored[:limit]]
+
+    def search_by_prefix(self, query, limit=20):
+        """
+        Ищет доступные инструменты, у которых каждое слово запроса
+        является началом какого-либо слова названия или категории.
+
+        Args:
+            query (str): Текст запроса
+            limit (int): Максимальное количество результатов
+
+        Returns:
+            list: Инструменты, отсортированные по цене за 1 день
+        """
+        snapshot = self._snapshot
+        index = snapshot.prefix_index
+        matched = None
+
+        for prefix in tokenize(query):
+            ids = set()
+            position = bisect_left(index, (prefix,))
+            while position < len(index) and index[position][0].startswith(prefix):
+                ids.add(index[position][1])
+                position += 1
+            matched = ids if matched is None else matched & ids
+            if not matched:
+                return []
+
+        if matched is None:
+            return []
+        tools = sorted((snapshot.tools_by_id[tool_id] for tool_id in matched),
+                       key=lambda t: (t.price_1_day, t.id))
+        return tools[:limit]
+
+
+# Глобальный кэш каталога, перезагружается при каждом импорте в БД
+catalog = Catalog()
+db.add_catalog_listener(catalog.load)
@@ -0,0 +1,140 @@
+"""
+Модуль снимка каталога для быстрого старта.
+
+Готовый каталог (категории, инструменты, индексы поиска, матрица
+стоимости аренды) и тексты карточек инструментов сохраняются
+в двоичный файл и при следующем запуске читаются одним чтением
+вместо синхронизации с tools.csv и пересборки индексов.
+
+Формат файла: заголовок (сигнатура, версия формата, длина ключа,
+HMAC-SHA256 ключа и данных), ключ снимка и pickle с данными. Ключ - хеш
+tools.csv и версия каталога в БД (ее увеличивают триггеры на categories
+и tools), поэтому снимок считается действительным, только если с момента
+его записи не менялись ни файл, ни таблицы каталога.
+
+pickle.loads исполняет код из файла, поэтому данные распаковываются,
+только если подпись совпала. Ключ подписи выводится из BOT_TOKEN: снимок,
+записанный кем-то без токена бота, отбрасывается как поврежденный.
+"""
+
+import hashlib
+import hmac
+import os
+import pickle
+import struct
+from pathlib import Path
+
+from data.config import BOT_TOKEN, CATALOG_SNAPSHOT_PATH, CSV_FILE_PATH
+from database import async_db
+from services.catalog import catalog
+from services.render_cache import render_cache, tool_card_text
+
+MAGIC = b"RBCS"
+# Увеличивается при любом изменении классов каталога или состава данных
+FORMAT_VERSION = 4
+HEADER = struct.Struct("<4sHH32s")
+# Ключ подписи снимков: отдельный от самого токена
+SIGNING_KEY = hmac.new(BOT_TOKEN.encode(), b"catalog-snapshot", hashlib.sha256).digest()
+
+
+def csv_file_hash(csv_file_path=CSV_FILE_PATH):
+    """Хеш файла инструментов (тот же, что сохраняет импорт); None, если файла нет."""
+    try:
+        return hashlib.sha256(Path(csv_file_path).read_bytes()).hexdigest()
+    except FileNotFoundError:
+        return None
+
+
+def snapshot_key(csv_hash, catalog_version):
+    """Ключ снимка: хеш tools.csv и версия каталога в БД."""
+    return f"{csv_hash}:{catalog_version}".encode()
+
+
+def sign(key, payload):
+    """Подпись снимка: HMAC-SHA256 ключа снимка и данных."""
+    signature = hmac.new(SIGNING_KEY, key, hashlib.sha256)
+    signature.update(payload)
+    return signature.digest()
+
+
+def read_snapshot(key, path=CATALOG_SNAPSHOT_PATH):
+    """
+    Читает снимок, если он записан для того же ключа.
+
+    Returns:
+        tuple: (CatalogSnapshot, {ID инструмента: текст карточки}) или None
+    """
+    try:
+        data = Path(path).read_bytes()
+    except FileNotFoundError:
+        return None
+
+    if len(data) < HEADER.size:
+        return None
+    magic, format_version, key_size, signature = HEADER.unpack_from(data)
+    if magic != MAGIC or format_version != FORMAT_VERSION:
+        return None
+    start = HEADER.size + key_size
+    if data[HEADER.size:start] != key:
+        return None
+    payload = memoryview(data)[start:]
+    if not hmac.compare_digest(sign(key, payload), signature):
+        print(f"⚠️ Снимок каталога {path} поврежден или подписан другим ключом")
+        return None
+    try:
+        return pickle.loads(payload)
+    except Exception as e:
+        # Например, классы каталога изменились без увеличения FORMAT_VERSION
+        print(f"⚠️ Снимок каталога {path} не прочитан: {e}")
+        return None
+
+
+def write_snapshot(key, snapshot, cards, path=CATALOG_SNAPSHOT_PATH):
+    """Атомарно записывает снимок: во временный файл и переименованием поверх старого."""
+    payload = pickle.dumps((snapshot, cards), protocol=pickle.HIGHEST_PROTOCOL)
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, len(key), sign(key, payload))
+    # У каждого процесса свой временный файл (несколько webhook-воркеров)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as file:
+        file.write(header + key + payload)
+    os.replace(temp_path, path)
+
+
+async def load_catalog():
+    """
+    Загружает каталог при быстром старте.
+
+    Если снимок совпадает с tools.csv и БД, каталог и карточки берутся
+    из него. Иначе каталог синхронизируется с CSV как при обычном
+    запуске, а новый снимок нужно сохранить (save_catalog_snapshot).
+
+    Returns:
+        bool: True, если каталог загружен из снимка
+    """
+    csv_hash = csv_file_hash()
+    imported_hash, catalog_version = await async_db.get_catalog_state()
+    if csv_hash is not None and csv_hash == imported_hash:
+        loaded = read_snapshot(snapshot_key(csv_hash, catalog_version))
+        if loaded:
+            snapshot, cards = loaded
+            catalog.install(snapshot)
+            render_cache.preload_tool_cards(cards)
+            return True
+
+    print("⚠️ Снимок каталога устарел, синхронизация с tools.csv")
+    await async_db.sync_catalog()
+    return False
+
+
+async def save_catalog_snapshot():
+    """Сохраняет текущий каталог и карточки, если каталог в БД соответствует tools.csv."""
+    csv_hash = csv_file_hash()
+    imported_hash, catalog_version = await async_db.get_catalog_state()
+    if csv_hash is None or csv_hash != imported_hash:
+        # Импорт не удался: такой каталог нельзя связывать с текущим файлом
+        return
+
+    snapshot = catalog.snapshot
+    cards = {tool.id: tool_card_text(tool) for tool in snapshot.tools_by_id.values()}
+    write_snapshot(snapshot_key(csv_hash, catalog_version), snapshot, cards)
+    print(f"✅ Снимок каталога сохранен: {CATALOG_SNAPSHOT_PATH}")
@@ -0,0 +1,112 @@
+"""
+Модуль журнала событий воронки.
+
+Обработчики отмечают просмотры каталога, карточек инструментов и шаги
+оформления заявки вызовом event_log.track(). Событие только добавляется
+в кольцевой буфер в памяти; запись в БД идет пачками в фоне: сырые события
+дописываются в таблицу events, а счетчики - в почасовые агрегаты
+events_hourly, по которым строятся отчеты.
+"""
+
+import asyncio
+import time
+from collections import Counter, deque
+from datetime import datetime, timezone
+
+from data.config import EVENT_BUFFER_SIZE, EVENT_FLUSH_SIZE, EVENT_FLUSH_INTERVAL
+from database import async_db
+
+# Шаги оформления заявки по порядку: (событие, название в отчете)
+FUNNEL_STEPS = (
+    ("application_start", "Начали заявку"),
+    ("application_tool", "Выбрали инструмент"),
+    ("application_period", "Указали срок"),
+    ("application_name", "Указали ФИО"),
+    ("application_phone", "Указали телефон"),
+    ("application_confirm", "Подтвердили"),
+)
+
+
+def event_hour(timestamp):
+    """Час события в UTC в формате агрегатов events_hourly."""
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime("%Y-%m-%d %H:00")
+
+
+class EventLog:
+    """Кольцевой буфер событий с фоновой пакетной записью в БД."""
+
+    def __init__(self, capacity=EVENT_BUFFER_SIZE, flush_size=EVENT_FLUSH_SIZE,
+                 flush_interval=EVENT_FLUSH_INTERVAL):
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        # При переполнении (БД недоступна) вытесняются самые старые события
+        self._buffer = deque(maxlen=capacity)
+        self._lock = asyncio.Lock()
+        self._task = None
+        self._flush_task = None
+
+    def track(self, event, user_id=None, tool_id=None):
+        """
+        Отмечает событие. Не обращается к БД.
+
+        Args:
+            event (str): Имя события (catalog_view, tool_view, шаги FUNNEL_STEPS)
+            user_id (int): Telegram ID пользователя
+            tool_id (int): ID инструмента каталога, если событие с ним связано
+        """
+        self._buffer.append((time.time(), event, user_id, tool_id))
+
+        if len(self._buffer) >= self.flush_size and not self._flush_task:
+            self._flush_task = asyncio.create_task(self._flush_by_size())
+
+    async def _flush_by_size(self):
+        try:
+            await self.flush()
+        finally:
+            self._flush_task = None
+
+    async def flush(self):
+        """Записывает накопленные события и их почасовые агрегаты одной транзакцией."""
+        async with self._lock:
+            if not self._buffer:
+                return
+            batch = list(self._buffer)
+            self._buffer.clear()
+
+            rollups = Counter(
+                (event_hour(created_at), event, tool_id or 0)
+                for created_at, event, user_id, tool_id in batch
+            )
+            try:
+                await async_db.append_events(
+                    batch, [(*key, count) for key, count in rollups.items()]
+                )
+            except Exception as e:
+                # Возвращаем пачку в начало буфера; лишнее вытеснит ограничение емкости
+                self._buffer.extendleft(reversed(batch))
+                print(f"❌ Ошибка записи событий: {e}")
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def start(self):
+        """Запускает фоновую периодическую запись событий."""
+        if not self._task:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Останавливает фоновую запись и сбрасывает остаток буфера в БД."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+
+# Глобальный журнал событий
+event_log = EventLog()
@@ -0,0 +1,203 @@
+"""
+Модуль хранилища состояний FSM в SQLite.
+
+Незавершенные заявки переживают перезапуск бота: состояния и данные
+FSM хранятся в таблице fsm_sessions. Активные сессии держатся в
+LRU-кэше ограниченного размера, изменения копятся в буфере и пишутся
+в БД пакетно по порогу размера или времени. Сессии, которые не менялись
+дольше FSM_SESSION_TTL, периодически удаляются из кэша и из БД.
+
+Кэш и отложенная запись верны, только пока сессиями владеет один процесс.
+Если процессов несколько (WEBHOOK_WORKERS > 1), соседние апдейты одного
+пользователя попадают в разные процессы, поэтому хранилище работает
+в общем режиме (FSM_SHARED): каждое чтение идет в БД, а каждая запись
+сразу фиксируется и видна остальным процессам.
+"""
+
+import asyncio
+import json
+import time
+from collections import OrderedDict
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder
+
+from data.config import (FSM_CACHE_SIZE, FSM_FLUSH_SIZE, FSM_FLUSH_INTERVAL,
+                         FSM_SESSION_TTL, FSM_EXPIRE_INTERVAL, FSM_SHARED)
+from database import async_db
+
+
+class SQLiteStorage(BaseStorage):
+    """
+    Хранилище FSM: LRU-кэш в памяти поверх таблицы fsm_sessions.
+    При shared=True кэш не используется, запись идет сразу в БД.
+    """
+
+    def __init__(self, cache_size=FSM_CACHE_SIZE, flush_size=FSM_FLUSH_SIZE,
+                 flush_interval=FSM_FLUSH_INTERVAL, ttl=FSM_SESSION_TTL,
+                 expire_interval=FSM_EXPIRE_INTERVAL, shared=FSM_SHARED):
+        self.shared = shared
+        self.cache_size = cache_size
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.ttl = ttl
+        self.expire_interval = expire_interval
+        self.key_builder = DefaultKeyBuilder(with_bot_id=True, with_destiny=True)
+
+        # key -> [state, data, updated_at], порядок - от давно использованных к недавним
+        self._cache = OrderedDict()
+        # Измененные, но еще не записанные сессии: key -> (state, data, updated_at)
+        self._pending = {}
+        # Пачка, которая пишется в БД прямо сейчас
+        self._flushing = {}
+        self._lock = asyncio.Lock()
+        self._tasks = []
+        self._flush_task = None
+
+    async def _read_session(self, key):
+        """Читает сессию из БД; брошенная дольше TTL считается пустой."""
+        row = await async_db.get_fsm_session(key)
+        if row and row[2] >= time.time() - self.ttl:
+            return [row[0], json.loads(row[1]), row[2]]
+        return [None, {}, time.time()]
+
+    async def _load(self, key):
+        """Возвращает сессию из кэша, буфера записи или БД и кладет ее в кэш."""
+        if self.shared:
+            # Сессию мог изменить другой процесс - всегда читаем из БД
+            return await self._read_session(key)
+
+        session = self._cache.get(key)
+        if session is not None:
+            self._cache.move_to_end(key)
+            return session
+
+        unsaved = self._pending.get(key) or self._flushing.get(key)
+        if unsaved is not None:
+            state, data, updated_at = unsaved
+            session = [state, dict(data), updated_at]
+        else:
+            session = await self._read_session(key)
+            # Пока шло чтение, сессию мог загрузить или изменить другой апдейт
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+
+        self._cache[key] = session
+        # Вытесняем давно не использованные сессии; несохраненные изменения
+        # остаются в _pending и будут прочитаны оттуда
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return session
+
+    def _mark_dirty(self, key, session):
+        """Ставит сессию в очередь на запись в БД."""
+        session[2] = time.time()
+        self._pending[key] = (session[0], dict(session[1]), session[2])
+
+        if len(self._pending) >= self.flush_size and not self._flush_task:
+            self._flush_task = asyncio.create_task(self._flush_by_size())
+
+    async def set_state(self, key, state=None):
+        storage_key = self.key_builder.build(key)
+        state = state.state if isinstance(state, State) else state
+        if self.shared:
+            now = time.time()
+            await async_db.set_fsm_state(storage_key, state, now, now - self.ttl)
+            return
+        session = await self._load(storage_key)
+        session[0] = state
+        self._mark_dirty(storage_key, session)
+
+    async def get_state(self, key):
+        session = await self._load(self.key_builder.build(key))
+        return session[0]
+
+    async def set_data(self, key, data):
+        storage_key = self.key_builder.build(key)
+        if self.shared:
+            now = time.time()
+            data = json.dumps(dict(data), ensure_ascii=False)
+            await async_db.set_fsm_data(storage_key, data, now, now - self.ttl)
+            return
+        session = await self._load(storage_key)
+        session[1] = dict(data)
+        self._mark_dirty(storage_key, session)
+
+    async def get_data(self, key):
+        session = await self._load(self.key_builder.build(key))
+        return dict(session[1])
+
+    async def _flush_by_size(self):
+        try:
+            await self.flush()
+        finally:
+            self._flush_task = None
+
+    async def flush(self):
+        """Записывает накопленные изменения сессий в БД одной транзакцией."""
+        async with self._lock:
+            if not self._pending:
+                return
+            self._flushing, self._pending = self._pending, {}
+            rows = [
+                (key, state, json.dumps(data, ensure_ascii=False), updated_at)
+                for key, (state, data, updated_at) in self._flushing.items()
+            ]
+            try:
+                await async_db.save_fsm_sessions(rows)
+            except Exception as e:
+                # Возвращаем пачку в буфер, не затирая более свежие изменения
+                for key, session in self._flushing.items():
+                    self._pending.setdefault(key, session)
+                print(f"❌ Ошибка записи состояний FSM: {e}")
+            finally:
+                self._flushing = {}
+
+    async def expire(self):
+        """Удаляет из кэша и БД сессии, не менявшиеся дольше TTL."""
+        before = time.time() - self.ttl
+        for key in [key for key, session in self._cache.items() if session[2] < before]:
+            del self._cache[key]
+        # Сначала сохраняем свежие изменения, чтобы не удалить их строки
+        await self.flush()
+        try:
+            removed = await async_db.delete_expired_fsm_sessions(before)
+        except Exception as e:
+            print(f"❌ Ошибка очистки состояний FSM: {e}")
+            return
+        if removed:
+            print(f"🧹 Удалено брошенных сессий FSM: {removed}")
+
+    async def _run_flush(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def _run_expire(self):
+        while True:
+            await self.expire()
+            await asyncio.sleep(self.expire_interval)
+
+    def start(self):
+        """Запускает фоновую запись изменений и очистку брошенных сессий."""
+        if not self._tasks:
+            self._tasks = [
+                asyncio.create_task(self._run_flush()),
+                asyncio.create_task(self._run_expire()),
+            ]
+
+    async def close(self):
+        """Останавливает фоновые задачи и сбрасывает остаток изменений в БД."""
+        for task in self._tasks:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+        await self.flush()
+
+
+# Глобальное хранилище состояний FSM
+fsm_storage = SQLiteStorage()
@@ -0,0 +1,112 @@
+"""
+Модуль поиска инструментов для inline-режима (@bot <запрос>).
+
+Результаты строятся из кэша каталога по префиксному индексу
+и кэшируются по нормализованному запросу с вытеснением по TTL и LRU,
+поэтому быстрый набор текста не создает нагрузку на БД.
+"""
+
+import time
+from collections import OrderedDict
+
+from aiogram.types import (InlineQueryResultArticle, InputTextMessageContent,
+                           InlineKeyboardMarkup, InlineKeyboardButton)
+
+from data.config import INLINE_RESULTS_LIMIT, INLINE_CACHE_SIZE, INLINE_CACHE_TTL
+from services.catalog import catalog, tokenize
+
+
+class TTLCache:
+    """LRU-кэш ограниченного размера с истечением записей по времени."""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+
+    def get(self, key):
+        """Возвращает значение или None, если его нет или оно устарело."""
+        item = self._data.get(key)
+        if item is None:
+            return None
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key, value):
+        """Сохраняет значение, вытесняя самую давно использованную запись."""
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+def normalize_query(query):
+    """Приводит запрос к виду ключа кэша: слова в нижнем регистре через пробел."""
+    return " ".join(tokenize(query))
+
+
+def tool_inline_result(tool, bot_username):
+    """
+    Создает inline-результат с карточкой инструмента и ссылкой на аренду.
+
+    Args:
+        tool (Tool): Инструмент из каталога
+        bot_username (str): Username бота для deep link
+
+    Returns:
+        InlineQueryResultArticle: Результат для answerInlineQuery
+    """
+    rent_url = f"https://t.me/{bot_username}?start=rent_{tool.id}"
+    return InlineQueryResultArticle(
+        id=str(tool.id),
+        title=tool.name,
+        description=f"{tool.price_1_day}₽/день · залог {tool.deposit}₽",
+        input_message_content=InputTextMessageContent(
+            message_text=(
+                f"🔧 <b>{tool.name}</b>\n\n"
+                f"💵 <b>Цена:</b> {tool.price_1_day}₽ за 1 день\n"
+                f"💰 <b>Залог:</b> {tool.deposit}₽\n\n"
+                f"📝 <a href=\"{rent_url}\">Арендовать в RentBrigadir</a>"
+            ),
+            parse_mode="HTML"
+        ),
+        reply_markup=InlineKeyboardMarkup(inline_keyboard=[[
+            InlineKeyboardButton(text="📝 Арендовать", url=rent_url)
+        ]])
+    )
+
+
+class InlineSearch:
+    """Поиск для inline-режима с кэшем готовых результатов."""
+
+    def __init__(self, maxsize=INLINE_CACHE_SIZE, ttl=INLINE_CACHE_TTL):
+        self._cache = TTLCache(maxsize, ttl)
+
+    def search(self, query, bot_username):
+        """
+        Возвращает готовые inline-результаты для запроса.
+
+        Ключ кэша включает версию каталога, поэтому после импорта
+        старые результаты перестают использоваться автоматически.
+        """
+        key = (catalog.version, normalize_query(query))
+        results = self._cache.get(key)
+        if results is None:
+            tools = catalog.search_by_prefix(key[1], limit=INLINE_RESULTS_LIMIT)
+            results = [tool_inline_result(tool, bot_username) for tool in tools]
+            self._cache.set(key, results)
+        return results
+
+
+# Глобальный поиск для inline-режима
+inline_search = InlineSearch()
@@ -0,0 +1,296 @@
+"""
+Модуль метрик обработчиков.
+
+Для каждого обработчика из register_handlers() копятся гистограммы
+длительности (общей, в обращениях к БД и в запросах к Bot API),
+число вызовов и ошибок. Корзины гистограмм выделяются один раз
+при регистрации обработчиков; на обработку апдейта приходится засечка
+времени в небольшом объекте UpdateTimer в контекстной переменной.
+
+Метод Bot API, который обработчик вернул вместо вызова
+(return message.answer(...)), при polling отправляет диспетчер уже после
+обработчика: замер переходит к этому методу и завершается в middleware
+сессии бота, поэтому длительность и время API включают отправку ответа.
+В режиме webhook такой ответ уходит в теле HTTP-ответа, и время API
+для него не измеряется ("н/и" в сводке).
+
+Сводка доступна администратору командой /metrics, а при заданном
+METRICS_PORT - в формате Prometheus по HTTP.
+"""
+
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextvars import ContextVar
+
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+
+from data.config import METRICS_HOST, METRICS_PORT
+
+# Верхние границы корзин гистограмм (мс); последняя корзина - все, что больше
+BUCKETS_MS = (0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# UpdateTimer текущего апдейта; None вне обработчика
+current_timings = ContextVar("current_timings", default=None)
+
+
+class Histogram:
+    """Гистограмма длительностей с фиксированными корзинами BUCKETS_MS."""
+
+    __slots__ = ("counts", "total_ms")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.total_ms = 0.0
+
+    def observe(self, ms):
+        self.counts[bisect_left(BUCKETS_MS, ms)] += 1
+        self.total_ms += ms
+
+    @property
+    def count(self):
+        return sum(self.counts)
+
+    def percentile(self, q):
+        """
+        Оценка перцентиля (мс) с линейной интерполяцией внутри корзины.
+
+        Args:
+            q (float): Доля от 0 до 1 (0.95 для p95)
+        """
+        total = self.count
+        if not total:
+            return 0.0
+        rank = q * total
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            if seen + bucket_count >= rank and bucket_count:
+                lower = BUCKETS_MS[index - 1] if index else 0.0
+                upper = BUCKETS_MS[index] if index < len(BUCKETS_MS) else lower * 2
+                return lower + (upper - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return BUCKETS_MS[-1]
+
+
+class HandlerMetrics:
+    """Метрики одного обработчика."""
+
+    __slots__ = ("name", "calls", "errors", "duration", "db", "api", "api_unmeasured")
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.errors = 0
+        self.duration = Histogram()
+        self.db = Histogram()
+        self.api = Histogram()
+        # Вызовы, ответ которых ушел в теле ответа на webhook (время API неизвестно)
+        self.api_unmeasured = 0
+
+    def observe(self, seconds, db_seconds, api_seconds, failed):
+        """api_seconds=None - время Bot API не измерено."""
+        self.calls += 1
+        if failed:
+            self.errors += 1
+        self.duration.observe(seconds * 1000)
+        self.db.observe(db_seconds * 1000)
+        if api_seconds is None:
+            self.api_unmeasured += 1
+        else:
+            self.api.observe(api_seconds * 1000)
+
+    def api_mean_text(self):
+        """Среднее время Bot API (мс) по измеренным вызовам или "н/и"."""
+        if not self.api.count:
+            return "н/и" if self.api_unmeasured else "0.0"
+        return f"{self.api.total_ms / self.api.count:.1f}"
+
+
+class UpdateTimer:
+    """Замер одного апдейта: метрики обработчика, начало, время в БД и Bot API (сек)."""
+
+    __slots__ = ("entry", "started", "db", "api")
+
+    def __init__(self, entry, started):
+        self.entry = entry
+        self.started = started
+        self.db = 0.0
+        self.api = 0.0
+
+    def finish(self, failed, api_measured=True):
+        """Записывает замер в метрики обработчика."""
+        self.entry.observe(time.perf_counter() - self.started, self.db,
+                           self.api if api_measured else None, failed)
+
+
+class Metrics:
+    """Реестр метрик обработчиков процесса."""
+
+    def __init__(self):
+        self.handlers = {}
+        # Апдейты, отброшенные до обработчика, по причине (throttled, duplicate, stale)
+        self.dropped = Counter()
+        self.started_at = time.monotonic()
+
+    def register(self, name):
+        """Заранее создает метрики обработчика (корзины выделяются здесь)."""
+        if name not in self.handlers:
+            self.handlers[name] = HandlerMetrics(name)
+        return self.handlers[name]
+
+    def register_dispatcher(self, dp):
+        """Регистрирует все обработчики сообщений, callback- и inline-запросов диспетчера."""
+        for observer in (dp.message, dp.callback_query, dp.inline_query):
+            for handler in observer.handlers:
+                self.register(handler.callback.__name__)
+
+    @property
+    def uptime(self):
+        return time.monotonic() - self.started_at
+
+    def summary(self):
+        """Текстовая сводка p50/p95/p99 по обработчикам (HTML)."""
+        active = sorted(
+            (handler for handler in self.handlers.values() if handler.calls),
+            key=lambda handler: handler.calls, reverse=True
+        )
+        total_calls = sum(handler.calls for handler in active)
+        lines = [
+            "⏱ <b>Метрики обработчиков</b>\n",
+            f"Апдейтов: <b>{total_calls}</b> за {self.uptime / 60:.0f} мин "
+            f"({total_calls / max(self.uptime, 1):.2f}/сек)\n",
+            "<i>обработчик: вызовы, ошибки | p50/p95/p99 мс | среднее БД/API мс</i>",
+        ]
+        unmeasured = any(handler.api_unmeasured for handler in active)
+        for handler in active:
+            duration = handler.duration
+            lines.append(
+                f"• <code>{handler.name}</code>: {handler.calls}, {handler.errors} | "
+                f"{duration.percentile(0.5):.1f}/{duration.percentile(0.95):.1f}/"
+                f"{duration.percentile(0.99):.1f} | "
+                f"{handler.db.total_ms / handler.calls:.1f}/{handler.api_mean_text()}"
+            )
+        if not active:
+            lines.append("Обработчики еще не вызывались")
+        if unmeasured:
+            lines.append("\n<i>API н/и - ответ ушел в теле ответа на webhook, время Bot API "
+                         "не измерено; среднее API - по вызовам, где оно измерено</i>")
+        if self.dropped:
+            lines.append(f"\nОтброшено: частые запросы {self.dropped['throttled']}, "
+                         f"повторные нажатия {self.dropped['duplicate']}, "
+                         f"устаревшие кнопки {self.dropped['stale']}")
+        return "\n".join(lines)
+
+    def prometheus(self):
+        """Все метрики в текстовом формате Prometheus."""
+        lines = []
+        histograms = (
+            ("bot_handler_duration_seconds", "Handler execution time", "duration"),
+            ("bot_handler_db_seconds", "Time spent in database calls per update", "db"),
+            ("bot_handler_api_seconds", "Time spent in Bot API requests per update (measured calls only)", "api"),
+        )
+        for metric, description, attribute in histograms:
+            lines.append(f"# HELP {metric} {description}")
+            lines.append(f"# TYPE {metric} histogram")
+            for handler in self.handlers.values():
+                histogram = getattr(handler, attribute)
+                label = f'handler="{handler.name}"'
+                cumulative = 0
+                for upper, bucket_count in zip(BUCKETS_MS, histogram.counts):
+                    cumulative += bucket_count
+                    lines.append(f'{metric}_bucket{{{label},le="{upper / 1000:g}"}} {cumulative}')
+                lines.append(f'{metric}_bucket{{{label},le="+Inf"}} {histogram.count}')
+                lines.append(f"{metric}_sum{{{label}}} {histogram.total_ms / 1000:.6f}")
+                lines.append(f"{metric}_count{{{label}}} {histogram.count}")
+
+        lines.append("# HELP bot_handler_api_unmeasured_total Handler calls whose reply went out "
+                     "in the webhook response, so Bot API time is not measured")
+        lines.append("# TYPE bot_handler_api_unmeasured_total counter")
+        for handler in self.handlers.values():
+            lines.append(f'bot_handler_api_unmeasured_total{{handler="{handler.name}"}} {handler.api_unmeasured}')
+        lines.append("# HELP bot_handler_errors_total Handler calls that raised an exception")
+        lines.append("# TYPE bot_handler_errors_total counter")
+        for handler in self.handlers.values():
+            lines.append(f'bot_handler_errors_total{{handler="{handler.name}"}} {handler.errors}')
+        lines.append("# HELP bot_updates_dropped_total Updates dropped before the handler")
+        lines.append("# TYPE bot_updates_dropped_total counter")
+        for reason in ("throttled", "duplicate", "stale"):
+            lines.append(f'bot_updates_dropped_total{{reason="{reason}"}} {self.dropped[reason]}')
+        lines.append("# HELP bot_uptime_seconds Seconds since process start")
+        lines.append("# TYPE bot_uptime_seconds gauge")
+        lines.append(f"bot_uptime_seconds {self.uptime:.0f}")
+        return "\n".join(lines) + "\n"
+
+
+def record_db_time(seconds):
+    """Слушатель AsyncDatabase: добавляет время обращения к БД текущему апдейту."""
+    timer = current_timings.get()
+    if timer is not None:
+        timer.db += seconds
+
+
+def defer_to_reply(method, timer):
+    """
+    Передает незавершенный замер методу, который обработчик вернул
+    и который диспетчер отправит после него. Атрибут с "_" не попадает
+    в запрос к Bot API.
+    """
+    method._metrics_timer = timer
+
+
+class ApiTimingMiddleware(BaseRequestMiddleware):
+    """
+    Middleware сессии бота: добавляет время запросов к Bot API текущему
+    апдейту, а для возвращенного обработчиком метода завершает его замер.
+    """
+
+    async def __call__(self, make_request, bot, method):
+        reply_timer = getattr(method, "_metrics_timer", None)
+        timer = reply_timer or current_timings.get()
+        if timer is None:
+            return await make_request(bot, method)
+        started = time.perf_counter()
+        failed = True
+        try:
+            result = await make_request(bot, method)
+            failed = False
+            return result
+        finally:
+            timer.api += time.perf_counter() - started
+            if reply_timer is not None:
+                method._metrics_timer = None
+                reply_timer.finish(failed)
+
+
+async def start_metrics_server(host=METRICS_HOST, port=METRICS_PORT):
+    """
+    Запускает HTTP-эндпоинт /metrics для Prometheus, если задан порт.
+
+    Returns:
+        web.AppRunner: Запущенный сервер или None
+    """
+    if not port:
+        return None
+    # aiohttp.web нужен только эндпоинту метрик и не замедляет запуск бота
+    from aiohttp import web
+
+    async def handle(request):
+        return web.Response(text=metrics.prometheus(), content_type="text/plain", charset="utf-8")
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    try:
+        await web.TCPSite(runner, host, port).start()
+    except OSError as e:
+        # Порт занят, например другим webhook-воркером
+        print(f"⚠️ Эндпоинт метрик не запущен: {e}")
+        await runner.cleanup()
+        return None
+    print(f"✅ Метрики Prometheus: http://{host}:{port}/metrics")
+    return runner
+
+
+# Глобальный реестр метрик
+metrics = Metrics()
@@ -1,38 +1,233 @@
 """
 Модуль для отправки уведомлений.
+
+Уведомления не отправляются из обработчиков напрямую: они записываются
+в таблицу notification_outbox вместе с заявкой, а фоновый диспетчер
+рассылает их параллельно под общим лимитом скорости Telegram и лимитом
+на каждый чат (Telegram допускает около одного сообщения в секунду в чат),
+соблюдает RetryAfter и повторяет неудачные отправки с задержкой.
 """
 
+import asyncio
+import time
+
 from aiogram import Bot
-from data.config import ADMIN_IDS
-from database import db
+from aiogram.exceptions import TelegramRetryAfter, TelegramForbiddenError, TelegramBadRequest
+
+from data.config import (NOTIFY_RATE_LIMIT, NOTIFY_CHAT_RATE_LIMIT, NOTIFY_CONCURRENCY, NOTIFY_BATCH_SIZE,
+                         NOTIFY_POLL_INTERVAL, NOTIFY_MAX_ATTEMPTS, NOTIFY_RETRY_BASE)
+from database import async_db
 from keyboards.admin_kb import application_actions_keyboard
 
-async def notify_admins_about_new_application(application_id: int, bot: Bot):
-    """Отправка уведомлений о новой заявке"""
-    application = db.get_application_by_id(application_id)
-    
-    if application:
-        app_id, user_id, service_name, rental_period, app_date, customer_name, phone, status, username, user_full_name = application
-        
-        notification_text = (
-            "🆕 <b>НОВАЯ ЗАЯВКА!</b>\n\n"
-            f"<b>№ заявки:</b> #{app_id}\n"
-            f"<b>Инструмент:</b> {service_name}\n"
-            f"<b>Срок аренды:</b> {rental_period}\n"
-            f"<b>Клиент:</b> {customer_name}\n"
-            f"<b>Телефон:</b> {phone}\n"
-            f"<b>Дата:</b> {app_date}\n"
-            f"<b>Username:</b> @{username if username else 'нет'}\n"
-            f"<b>User ID:</b> {user_id}"
-        )
-        
-        for admin_id in ADMIN_IDS:
+# Максимальная задержка между повторами (сек)
+RETRY_MAX_DELAY = 300
+# На сколько секунд забранная пачка скрыта от других процессов
+CLAIM_LEASE = 120
+
+
+def new_application_text(application):
+    """Текст уведомления администратора о новой заявке."""
+    app_id, user_id, service_name, rental_period, app_date, customer_name, phone, status, username, user_full_name = application
+
+    return (
+        "🆕 <b>НОВАЯ ЗАЯВКА!</b>\n\n"
+        f"<b>№ заявки:</b> #{app_id}\n"
+        f"<b>Инструмент:</b> {service_name}\n"
+        f"<b>Срок аренды:</b> {rental_period}\n"
+        f"<b>Клиент:</b> {customer_name}\n"
+        f"<b>Телефон:</b> {phone}\n"
+        f"<b>Дата:</b> {app_date}\n"
+        f"<b>Username:</b> @{username if username else 'нет'}\n"
+        f"<b>User ID:</b> {user_id}"
+    )
+
+
+class TokenBucket:
+    """Ограничитель скорости: не более rate операций в секунду, всплеск до capacity."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0
+        self._lock = asyncio.Lock()
+
+    def is_idle(self):
+        """Корзина полна и не на паузе - ничем не отличается от новой."""
+        now = time.monotonic()
+        return (now >= self._paused_until and not self._lock.locked()
+                and self._tokens + (now - self._updated) * self.rate >= self.capacity)
+
+    def pause(self, seconds):
+        """Останавливает выдачу токенов (ответ RetryAfter от Telegram)."""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    async def acquire(self):
+        """Ждет, пока появится свободный токен, и забирает его."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class NotificationDispatcher:
+    """Фоновая рассылка уведомлений из notification_outbox."""
+
+    def __init__(self, rate=NOTIFY_RATE_LIMIT, chat_rate=NOTIFY_CHAT_RATE_LIMIT, concurrency=NOTIFY_CONCURRENCY,
+                 batch_size=NOTIFY_BATCH_SIZE, poll_interval=NOTIFY_POLL_INTERVAL,
+                 max_attempts=NOTIFY_MAX_ATTEMPTS, retry_base=NOTIFY_RETRY_BASE):
+        self.bucket = TokenBucket(rate)
+        self.chat_rate = chat_rate
+        # chat_id -> TokenBucket: лимит отправки в один чат
+        self.chat_buckets = {}
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        self._bot = None
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    def wake(self):
+        """Сообщает диспетчеру о новых уведомлениях, не дожидаясь опроса."""
+        self._wakeup.set()
+
+    def _chat_bucket(self, chat_id):
+        bucket = self.chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = self.chat_buckets[chat_id] = TokenBucket(self.chat_rate, capacity=1)
+        return bucket
+
+    def _sweep_chat_buckets(self):
+        """Удаляет корзины чатов, в которые давно ничего не отправлялось."""
+        self.chat_buckets = {
+            chat_id: bucket for chat_id, bucket in self.chat_buckets.items() if not bucket.is_idle()
+        }
+
+    def _retry(self, notification_id, attempts, error, delay=None):
+        """Строка для complete_notifications: повтор с задержкой или отказ."""
+        if delay is None:
+            if attempts >= self.max_attempts:
+                return ('failed', attempts, time.time(), error, notification_id)
+            delay = min(self.retry_base * 2 ** (attempts - 1), RETRY_MAX_DELAY)
+        return ('pending', attempts, time.time() + delay, error, notification_id)
+
+    async def _send(self, semaphore, notification, text, markup):
+        """
+        Отправляет одно уведомление.
+
+        Returns:
+            tuple: None при успехе, иначе строка повтора для complete_notifications
+        """
+        notification_id, kind, application_id, chat_id, attempts = notification
+        attempts += 1
+        if text is None:
+            return ('failed', attempts, time.time(), "заявка не найдена", notification_id)
+
+        # Очередь в свой чат ждем до семафора, чтобы не занимать слоты
+        # отправки, пока в чат еще нельзя писать
+        chat_bucket = self._chat_bucket(chat_id)
+        await chat_bucket.acquire()
+        async with semaphore:
+            await self.bucket.acquire()
             try:
-                await bot.send_message(
-                    admin_id,
-                    notification_text,
-                    reply_markup=application_actions_keyboard(app_id),
-                    parse_mode="HTML"
-                )
-            except Exception:
-                print(f"❌ Не удалось отправить уведомление админу {admin_id}")
\ No newline at end of file
+                await self._bot.send_message(chat_id, text, reply_markup=markup, parse_mode="HTML")
+            except TelegramRetryAfter as e:
+                # Лимит превышен: притормаживаем все отправки, попытку не засчитываем
+                self.bucket.pause(e.retry_after)
+                chat_bucket.pause(e.retry_after)
+                return self._retry(notification_id, attempts - 1, str(e), delay=e.retry_after)
+            except (TelegramForbiddenError, TelegramBadRequest) as e:
+                # Бот заблокирован или чат не существует - повтор не поможет
+                print(f"❌ Не удалось отправить уведомление в чат {chat_id}: {e}")
+                return ('failed', attempts, time.time(), str(e), notification_id)
+            except Exception as e:
+                print(f"⚠️ Ошибка отправки уведомления в чат {chat_id} (попытка {attempts}): {e}")
+                return self._retry(notification_id, attempts, str(e))
+        return None
+
+    async def dispatch_due(self):
+        """
+        Отправляет пачку уведомлений, время которых наступило.
+
+        Returns:
+            int: Количество обработанных уведомлений
+        """
+        notifications = await async_db.claim_due_notifications(time.time(), self.batch_size, CLAIM_LEASE)
+        if not notifications:
+            return 0
+
+        # Каждая заявка читается и форматируется один раз на всех получателей
+        texts = {}
+        for application_id in {notification[2] for notification in notifications}:
+            application = await async_db.get_application_by_id(application_id)
+            texts[application_id] = new_application_text(application) if application else None
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        results = await asyncio.gather(*[
+            self._send(semaphore, notification, texts[notification[2]],
+                       application_actions_keyboard(notification[2]))
+            for notification in notifications
+        ])
+
+        self._sweep_chat_buckets()
+
+        sent_ids = [notification[0] for notification, result in zip(notifications, results) if result is None]
+        retries = [result for result in results if result is not None]
+        await async_db.complete_notifications(sent_ids, retries)
+        return len(notifications)
+
+    async def _run(self):
+        while True:
+            # Сбрасываем сигнал до выборки: wake() во время рассылки не потеряется
+            self._wakeup.clear()
+            try:
+                processed = await self.dispatch_due()
+            except Exception as e:
+                print(f"❌ Ошибка рассылки уведомлений: {e}")
+                processed = 0
+            if processed >= self.batch_size:
+                continue
+
+            # Ждем нового уведомления, ближайшего повтора или периода опроса
+            timeout = self.poll_interval
+            try:
+                next_attempt_at = await async_db.get_next_notification_time()
+                if next_attempt_at is not None:
+                    timeout = min(timeout, max(0, next_attempt_at - time.time()))
+            except Exception as e:
+                print(f"❌ Ошибка чтения очереди уведомлений: {e}")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self, bot: Bot):
+        """Запускает фоновую рассылку от имени бота."""
+        self._bot = bot
+        if not self._task:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Останавливает рассылку; неотправленное останется в очереди до запуска."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+# Глобальный диспетчер уведомлений
+notification_dispatcher = NotificationDispatcher()
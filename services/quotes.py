@@ -0,0 +1,239 @@
+"""
+Модуль расчета стоимости аренды по тарифной сетке.
+
+У инструмента девять тарифов (PRICE_TIERS: 1-7, 14 и 30 дней). Стоимость
+произвольного срока - самая дешевая комбинация тарифов, покрывающая
+не меньше запрошенных дней (например, 46 дней = 30 + 14 + 2). Если более
+длинный тариф дешевле короткого (7 дней дешевле 6), берется он.
+
+Расчет идет динамическим программированием сразу по всем инструментам:
+для каждого числа дней вычисляется строка итогов по всему каталогу.
+Матрица строится при загрузке каталога, поэтому расчет стоимости
+и сортировка категории по итогу за N дней - только чтение строки.
+"""
+
+import math
+import re
+from array import array
+from datetime import date, timedelta
+
+from data.config import QUOTE_MAX_DAYS
+
+# Сроки аренды (в днях), для которых в таблице tools хранятся цены
+PRICE_TIERS = (1, 2, 3, 4, 5, 6, 7, 14, 30)
+
+# Числительные, которыми пишут срок аренды словами
+NUMBER_WORDS = {
+    "один": 1, "одна": 1, "одну": 1, "два": 2, "две": 2, "три": 3, "четыре": 4,
+    "пять": 5, "шесть": 6, "семь": 7, "восемь": 8, "девять": 9, "десять": 10,
+    "полтора": 1.5, "полторы": 1.5,
+}
+
+# Начала слов-единиц срока и их длина в днях
+UNIT_STEMS = (("сут", 1), ("дн", 1), ("ден", 1), ("нед", 7), ("мес", 30))
+
+# Дата "20.10", "5.11.2025": месяц всегда двузначный, чтобы "1.5 месяца" оставалось числом
+DATE_PATTERN = re.compile(r"\b(\d{1,2})[./](\d{2})(?:[./](\d{2}|\d{4}))?\b")
+
+
+def _unit_days(word):
+    for stem, days in UNIT_STEMS:
+        if word.startswith(stem):
+            return days
+    return None
+
+
+def parse_rental_period(text):
+    """
+    Переводит срок аренды, введенный текстом, в число дней.
+
+    Понимает числа и числительные с единицами ("2 дня", "две недели",
+    "1 месяц и 2 недели", "полмесяца", "полторы недели"), а также число
+    без единицы как количество дней. Месяц считается за 30 дней,
+    дробный итог округляется вверх. Даты в тексте не учитываются
+    (период между датами считает rental_dates).
+
+    Returns:
+        int: Число дней от 1 до QUOTE_MAX_DAYS или None, если срок не распознан
+    """
+    total = 0
+    quantity = None
+    found = False
+    text = DATE_PATTERN.sub(" ", text or "")
+    for token in re.findall(r"\d+(?:[.,]\d+)?|[а-яё]+", text.lower()):
+        if token[0].isdigit():
+            quantity = float(token.replace(",", "."))
+            continue
+        if token in NUMBER_WORDS:
+            quantity = NUMBER_WORDS[token]
+            continue
+        # "полмесяца", "полнедели"
+        half = token.startswith("пол") and _unit_days(token[3:])
+        unit = _unit_days(token)
+        if half:
+            total += half / 2
+        elif unit:
+            total += (1 if quantity is None else quantity) * unit
+        else:
+            continue
+        quantity = None
+        found = True
+
+    if quantity is not None:
+        # Число в конце без единицы - количество дней
+        total += quantity
+        found = True
+    days = math.ceil(total)
+    if not found or not 1 <= days <= QUOTE_MAX_DAYS:
+        return None
+    return days
+
+
+def parse_dates(text, today):
+    """
+    Находит в тексте даты вида ДД.ММ или ДД.ММ.ГГГГ.
+
+    Дата без года относится к ближайшему будущему: "05.01", введенное
+    в декабре, - январь следующего года. Несуществующие даты пропускаются.
+
+    Returns:
+        list: Объекты date в порядке появления в тексте
+    """
+    dates = []
+    for day, month, year in DATE_PATTERN.findall(text or ""):
+        if year:
+            year = int(year) + (2000 if len(year) == 2 else 0)
+        try:
+            found = date(year or today.year, int(month), int(day))
+            if not year and found < today:
+                found = found.replace(year=today.year + 1)
+        except ValueError:
+            continue
+        dates.append(found)
+    return dates
+
+
+def rental_dates(text, today):
+    """
+    Даты аренды из текста срока.
+
+    Две даты - начало и конец ("с 20.10 по 25.10"), одна дата и срок -
+    начало и длительность ("с 20.10 на 3 дня"), только срок - аренда
+    с сегодняшнего дня.
+
+    Args:
+        text (str): Срок аренды, введенный пользователем
+        today (date): Текущая дата
+
+    Returns:
+        tuple: (начало, конец включительно) или None, если период не распознан,
+            начинается в прошлом или длиннее QUOTE_MAX_DAYS
+    """
+    dates = parse_dates(text, today)
+    if len(dates) >= 2:
+        start, end = dates[0], dates[1]
+    else:
+        days = parse_rental_period(text)
+        if days is None:
+            return None
+        start = dates[0] if dates else today
+        end = start + timedelta(days=days - 1)
+
+    if start < today or end < start or (end - start).days >= QUOTE_MAX_DAYS:
+        return None
+    return start, end
+
+
+def days_text(days):
+    """Число дней с согласованным словом: 1 день, 2 дня, 5 дней."""
+    if days % 10 == 1 and days % 100 != 11:
+        word = "день"
+    elif 2 <= days % 10 <= 4 and not 12 <= days % 100 <= 14:
+        word = "дня"
+    else:
+        word = "дней"
+    return f"{days} {word}"
+
+
+class Quote:
+    """Стоимость аренды инструмента на срок и комбинация тарифов."""
+
+    __slots__ = ("days", "total", "parts", "deposit")
+
+    def __init__(self, days, total, parts, deposit):
+        self.days = days
+        self.total = total
+        self.parts = parts
+        self.deposit = deposit
+
+    @property
+    def covered_days(self):
+        """Дней по тарифам; больше запрошенных, если длинный тариф дешевле."""
+        return sum(self.parts)
+
+    def tariffs_text(self):
+        """Комбинация тарифов для сводки: "2 × 30 дней + 14 дней + 2 дня"."""
+        groups = []
+        for days in sorted(set(self.parts), reverse=True):
+            count = self.parts.count(days)
+            groups.append(f"{count} × {days_text(days)}" if count > 1 else days_text(days))
+        return " + ".join(groups)
+
+
+class PriceMatrix:
+    """
+    Итоговые цены инструментов каталога для сроков от 0 до max_days.
+
+    totals[n][i] - минимальная стоимость аренды инструмента tools[i]
+    не меньше чем на n дней. Строка для n вычисляется одной операцией
+    над всеми инструментами сразу из уже готовых строк n - 1, ..., n - 30;
+    комбинация тарифов восстанавливается по матрице при расчете.
+    """
+
+    __slots__ = ("tools", "positions", "totals")
+
+    def __init__(self, tools, max_days=QUOTE_MAX_DAYS):
+        self.tools = list(tools)
+        self.positions = {tool.id: i for i, tool in enumerate(self.tools)}
+        # Столбцы цен по тарифам: tier_prices[t][i] - цена тарифа t у tools[i]
+        tier_prices = list(zip(*(tool.prices for tool in self.tools))) or [()] * len(PRICE_TIERS)
+
+        self.totals = [array("q", bytes(8 * len(self.tools)))]
+        for n in range(1, max_days + 1):
+            candidates = [
+                [price + rest for price, rest in zip(prices, self.totals[max(0, n - days)])]
+                for days, prices in zip(PRICE_TIERS, tier_prices)
+            ]
+            self.totals.append(array("q", map(min, zip(*candidates))))
+
+    def total(self, tool, days):
+        """Стоимость аренды инструмента на days дней или None."""
+        position = self.positions.get(tool.id)
+        if position is None or not 1 <= days < len(self.totals):
+            return None
+        return self.totals[days][position]
+
+    def quote(self, tool, days):
+        """Стоимость аренды на days дней с комбинацией тарифов или None."""
+        total = self.total(tool, days)
+        if total is None:
+            return None
+        position = self.positions[tool.id]
+        parts = []
+        remaining = days
+        while remaining > 0:
+            # Тариф, которым заканчивается оптимальная комбинация для remaining дней
+            for days_tier, price in zip(PRICE_TIERS, tool.prices):
+                rest = max(0, remaining - days_tier)
+                if price + self.totals[rest][position] == self.totals[remaining][position]:
+                    break
+            parts.append(days_tier)
+            remaining = rest
+        parts.sort(reverse=True)
+        return Quote(days, total, tuple(parts), tool.deposit)
+
+    def sort(self, tools, days):
+        """Инструменты по возрастанию стоимости аренды на days дней."""
+        row = self.totals[days]
+        positions = self.positions
+        return sorted(tools, key=lambda tool: (row[positions[tool.id]], tool.id))
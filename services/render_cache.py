@@ -0,0 +1,108 @@
+"""
+Модуль кэша отрисовки каталога.
+
+Клавиатуры категорий и страниц инструментов, а также HTML-карточки
+инструментов зависят только от данных каталога. Они строятся один раз
+и хранятся до смены версии каталога, после чего кэш сбрасывается целиком.
+"""
+
+from keyboards.user_kb import categories_keyboard, tools_keyboard, tool_detail_keyboard
+from services.catalog import catalog
+
+
+def tool_card_text(tool):
+    """
+    Форматирует HTML-карточку инструмента с ценами и залогом.
+
+    Args:
+        tool (Tool): Инструмент из каталога
+
+    Returns:
+        str: Текст карточки для parse_mode="HTML"
+    """
+    (price_1, price_2, price_3, price_4, price_5, price_6, price_7, price_14, price_30) = tool.prices
+
+    # Форматирование текста с ценами
+    price_list = "\n".join([
+        f"• 1 день: {price_1}₽", f"• 2 дня: {price_2}₽", f"• 3 дня: {price_3}₽",
+        f"• 4 дня: {price_4}₽", f"• 5 дней: {price_5}₽", f"• 6 дней: {price_6}₽",
+        f"• 7 дней: {price_7}₽", f"• 14 дней: {price_14}₽", f"• 30 дней: {price_30}₽"
+    ])
+
+    return (
+        f"🔧 <b>{tool.name}</b>\n\n"
+        f"{tool.description}\n\n"
+        f"💵 <b>Цены за аренду:</b>\n{price_list}\n\n"
+        f"💰 <b>Залог:</b> {tool.deposit}₽\n\n"
+        f"📞 Для аренды нажмите кнопку ниже 👇"
+    )
+
+
+class RenderCache:
+    """Кэш готовых клавиатур и карточек, привязанный к версии каталога."""
+
+    def __init__(self):
+        self._version = None
+        self._categories_markup = None
+        self._tools_markups = {}
+        self._tool_markups = {}
+        self._tool_cards = {}
+
+    def _check_version(self):
+        """Сбрасывает кэш, если каталог был перезагружен."""
+        if self._version != catalog.version:
+            self._version = catalog.version
+            self._categories_markup = None
+            self._tools_markups = {}
+            self._tool_markups = {}
+            self._tool_cards = {}
+
+    def preload_tool_cards(self, cards):
+        """
+        Заполняет кэш карточек готовыми текстами текущей версии каталога.
+
+        Args:
+            cards (dict): {ID инструмента: HTML-текст карточки}
+        """
+        self._check_version()
+        self._tool_cards = dict(cards)
+
+    def categories_markup(self):
+        """Клавиатура со списком категорий."""
+        self._check_version()
+        if self._categories_markup is None:
+            self._categories_markup = categories_keyboard(catalog.get_all_categories())
+        return self._categories_markup
+
+    def tools_markup(self, page):
+        """Клавиатура страницы инструментов категории."""
+        self._check_version()
+        key = (page.category_id, page.cursor)
+        markup = self._tools_markups.get(key)
+        if markup is None:
+            markup = tools_keyboard(page)
+            self._tools_markups[key] = markup
+        return markup
+
+    def tool_detail_markup(self, tool, cursor=None):
+        """Клавиатура карточки инструмента с возвратом на страницу cursor."""
+        self._check_version()
+        key = (tool.id, cursor)
+        markup = self._tool_markups.get(key)
+        if markup is None:
+            markup = tool_detail_keyboard(tool.id, tool.category_id, cursor)
+            self._tool_markups[key] = markup
+        return markup
+
+    def tool_card(self, tool):
+        """HTML-текст карточки инструмента."""
+        self._check_version()
+        text = self._tool_cards.get(tool.id)
+        if text is None:
+            text = tool_card_text(tool)
+            self._tool_cards[tool.id] = text
+        return text
+
+
+# Глобальный кэш отрисовки каталога
+render_cache = RenderCache()
@@ -0,0 +1,32 @@
+"""
+Модуль доступности инструментов на даты.
+
+Количество единиц инструмента берется из кэша каталога (tools.units),
+занятость - из броней заявок в БД: запрос по индексу
+(tool_id, end_date, start_date) возвращает только брони, пересекающие
+период, а пик одновременно занятых единиц считает database.busy_units.
+"""
+
+from database import async_db
+from services.catalog import catalog
+
+
+async def get_free_tools(category_id, start, end, units=1):
+    """
+    Доступные инструменты категории, свободные на весь период.
+
+    Фильтр к catalog.get_tools_by_category: порядок тот же,
+    для всей категории выполняется один запрос к БД.
+
+    Args:
+        category_id (int): ID категории
+        start (date): Начало аренды
+        end (date): Конец аренды включительно
+        units (int): Сколько единиц нужно
+
+    Returns:
+        list: Инструменты, у которых свободно не меньше units единиц
+    """
+    tools = catalog.get_tools_by_category(category_id)
+    busy = await async_db.get_busy_units([tool.id for tool in tools], start.isoformat(), end.isoformat())
+    return [tool for tool in tools if tool.units - busy.get(tool.id, 0) >= units]
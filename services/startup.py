@@ -0,0 +1,120 @@
+"""
+Модуль быстрого старта: отложенные задачи и профилирование запуска.
+
+Для ответа на первый апдейт нужны только БД, каталог и хранилище FSM.
+Остальное (рассылка уведомлений, эндпоинт метрик, запись снимка
+каталога) запускается после обработки первого апдейта или по таймауту,
+если апдейтов нет.
+
+При STARTUP_PROFILE=1 печатаются этапы запуска и время до первого
+ответа бота от начала импорта bot.py.
+"""
+
+import asyncio
+import time
+
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiogram.methods import DeleteWebhook, GetMe, GetUpdates, SetWebhook
+
+from data.config import STARTUP_DEFER_TIMEOUT, STARTUP_PROFILE
+
+# Служебные методы запуска и получения апдейтов - не ответы пользователю
+SERVICE_METHODS = (GetUpdates, GetMe, DeleteWebhook, SetWebhook)
+
+
+class StartupProfiler:
+    """Отметки времени этапов запуска до первого ответа бота."""
+
+    def __init__(self, enabled=STARTUP_PROFILE):
+        self.enabled = enabled
+        # Переопределяется временем начала импорта bot.py
+        self.started = time.perf_counter()
+        self.marks = []
+        self.finished = False
+
+    def mark(self, stage):
+        """Запоминает момент завершения этапа."""
+        if self.enabled and not self.finished:
+            self.marks.append((stage, time.perf_counter()))
+
+    def finish(self, stage="первый ответ"):
+        """Отмечает последний этап и печатает отчет (один раз)."""
+        if not self.enabled or self.finished:
+            return
+        self.mark(stage)
+        self.finished = True
+        print(self.report())
+
+    def report(self):
+        """Таблица этапов: время от старта и длительность этапа, мс."""
+        lines = ["⏱ Профиль запуска (мс от старта / длительность этапа):"]
+        previous = self.started
+        for stage, moment in self.marks:
+            lines.append(f"  {(moment - self.started) * 1000:8.1f}  {(moment - previous) * 1000:8.1f}  {stage}")
+            previous = moment
+        return "\n".join(lines)
+
+
+class FirstResponseMiddleware(BaseRequestMiddleware):
+    """Middleware сессии бота: отмечает первый запрос-ответ пользователю."""
+
+    async def __call__(self, make_request, bot, method):
+        if startup_profiler.finished or isinstance(method, SERVICE_METHODS):
+            return await make_request(bot, method)
+        try:
+            return await make_request(bot, method)
+        finally:
+            startup_profiler.finish()
+
+
+class DeferredStartup:
+    """
+    Задачи запуска, отложенные до первого апдейта.
+
+    Задачи выполняются по порядку одной фоновой задачей; ошибка
+    одной задачи не отменяет остальные.
+    """
+
+    def __init__(self, timeout=STARTUP_DEFER_TIMEOUT):
+        self.timeout = timeout
+        self._jobs = []
+        self._timer = None
+        self._task = None
+
+    def add(self, name, job):
+        """Добавляет задачу: job - асинхронная функция без аргументов."""
+        self._jobs.append((name, job))
+
+    def schedule(self):
+        """Запускает таймер, по которому задачи выполнятся и без апдейтов."""
+        if self._task is None and self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.timeout, self.trigger)
+
+    def trigger(self):
+        """Запускает отложенные задачи (повторные вызовы игнорируются)."""
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        for name, job in self._jobs:
+            try:
+                await job()
+            except Exception as e:
+                print(f"❌ Отложенная задача запуска {name}: {e}")
+            startup_profiler.mark(f"отложено: {name}")
+
+    async def stop(self):
+        """Отменяет таймер и дожидается уже начатых задач (перед закрытием БД)."""
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+        if self._task:
+            await self._task
+
+
+# Глобальные профиль запуска и список отложенных задач
+startup_profiler = StartupProfiler()
+deferred_startup = DeferredStartup()
@@ -0,0 +1,83 @@
+"""
+Модуль буферизованной регистрации пользователей.
+
+Вместо INSERT + commit() на каждый /start пользователи копятся в памяти,
+дубликаты по Telegram ID схлопываются, а запись в БД идет одной
+транзакцией executemany по порогу размера или времени.
+"""
+
+import asyncio
+from datetime import datetime, timezone
+
+from data.config import USER_BUFFER_SIZE, USER_BUFFER_FLUSH_INTERVAL
+from database import async_db
+
+
+class UserBuffer:
+    """Буфер пользователей с отложенной пакетной записью в таблицу users."""
+
+    def __init__(self, max_size=USER_BUFFER_SIZE, flush_interval=USER_BUFFER_FLUSH_INTERVAL):
+        self.max_size = max_size
+        self.flush_interval = flush_interval
+        self._pending = {}
+        self._lock = asyncio.Lock()
+        self._task = None
+        self._flush_task = None
+
+    def touch(self, user):
+        """
+        Запоминает пользователя и время его последней активности.
+
+        Args:
+            user: Объект пользователя Telegram (types.User)
+        """
+        last_seen = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+        self._pending[user.id] = (user.id, user.username, user.full_name, last_seen)
+
+        if len(self._pending) >= self.max_size and not self._flush_task:
+            self._flush_task = asyncio.create_task(self._flush_by_size())
+
+    async def _flush_by_size(self):
+        try:
+            await self.flush()
+        finally:
+            self._flush_task = None
+
+    async def flush(self):
+        """Записывает накопленных пользователей в БД одной транзакцией."""
+        async with self._lock:
+            if not self._pending:
+                return
+            batch, self._pending = self._pending, {}
+            try:
+                await async_db.upsert_users(list(batch.values()))
+            except Exception as e:
+                # Возвращаем пачку в буфер, не затирая более свежие данные
+                for user_id, row in batch.items():
+                    self._pending.setdefault(user_id, row)
+                print(f"❌ Ошибка записи пользователей: {e}")
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def start(self):
+        """Запускает фоновую периодическую запись буфера."""
+        if not self._task:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Останавливает фоновую запись и сбрасывает остаток буфера в БД."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+
+# Глобальный буфер пользователей
+user_buffer = UserBuffer()
@@ -0,0 +1,43 @@
+"""
+Общие настройки тестов.
+
+Конфигурация читается при импорте data.config, поэтому переменные
+окружения задаются до импорта модулей бота.
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+TEMP_DIR = tempfile.mkdtemp(prefix="rentbrigadir-tests-")
+
+os.environ.setdefault("BOT_TOKEN", "123456:TEST")
+os.environ["DATABASE_PATH"] = os.path.join(TEMP_DIR, "database.db")
+os.environ["CATALOG_SNAPSHOT_PATH"] = os.path.join(TEMP_DIR, "catalog_snapshot.bin")
+sys.path.insert(0, str(ROOT))
+# tools.csv ищется относительно текущего каталога
+os.chdir(ROOT)
+
+import pytest  # noqa: E402
+
+from database import Database  # noqa: E402
+
+
+@pytest.fixture
+def database(tmp_path):
+    """Новая БД со схемой последней версии (без импорта каталога)."""
+    db = Database(str(tmp_path / "database.db"), read_pool_size=2)
+    db.connect(fast_start=True)
+    yield db
+    db.close()
+
+
+@pytest.fixture
+def catalog_database(tmp_path):
+    """Новая БД с каталогом, импортированным из tools.csv."""
+    db = Database(str(tmp_path / "database.db"), read_pool_size=2)
+    db.connect()
+    yield db
+    db.close()
@@ -0,0 +1,50 @@
+"""Тесты статистики админ-панели."""
+
+import asyncio
+
+import pytest
+from aiogram.types import User
+
+from data.config import ADMIN_IDS
+from database import async_db
+from handlers.admin_handlers import show_admin_stats
+from services.catalog import catalog
+
+
+class FakeMessage:
+    def edit_text(self, text, **kwargs):
+        # Как в aiogram: возвращает метод Bot API, а не отправляет его
+        return text
+
+
+class FakeCallback:
+    """Нажатие кнопки "Статистика" администратором."""
+
+    def __init__(self):
+        self.from_user = User(id=ADMIN_IDS[0], is_bot=False, first_name="Админ")
+        self.message = FakeMessage()
+
+    async def answer(self, *args, **kwargs):
+        pass
+
+
+@pytest.fixture
+def stats_db(tmp_path):
+    """Подключает глобальный async_db к новой БД с каталогом из tools.csv."""
+    async_db.db.db_path = str(tmp_path / "database.db")
+    async_db.db.connect()
+    yield async_db.db
+    async_db.db.close()
+
+
+def test_admin_stats_show_top_categories(stats_db):
+    first, second = catalog.get_all_categories()[:2]
+    tools = catalog.get_tools_by_category(first.id)[:2] + catalog.get_tools_by_category(second.id)[:1]
+    for user_id, tool in enumerate(tools, start=1):
+        stats_db.add_application(user_id, tool.name, "Иван", "+79000000000", "3 дня", tool_id=tool.id)
+
+    text = asyncio.run(show_admin_stats(FakeCallback()))
+
+    assert "Популярные категории" in text
+    categories = text.split("Популярные категории:</b>\n")[1].splitlines()
+    assert categories == [f"• {first.name}: <b>2</b>", f"• {second.name}: <b>1</b>"]
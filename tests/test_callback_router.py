@@ -0,0 +1,59 @@
+"""Тесты маршрутизатора callback-запросов: кнопки старого формата."""
+
+import pytest
+
+from keyboards.callbacks import (CategoryPage, ToolCard, RentTool, PickTool, Inbox,
+                                 ApplicationDetail, ApplicationProcessed, ApplicationCall,
+                                 LEGACY_CALLBACKS)
+from middlewares.callback_router import CallbackRouter
+
+SCHEMAS = (CategoryPage, ToolCard, RentTool, PickTool, Inbox,
+           ApplicationDetail, ApplicationProcessed, ApplicationCall)
+
+
+async def handler(callback, callback_data=None):
+    return callback_data
+
+
+@pytest.fixture
+def router():
+    router = CallbackRouter()
+    for schema in SCHEMAS:
+        router.add(schema, handler)
+    router.add("back_to_categories", handler)
+    for prefix, convert in LEGACY_CALLBACKS.items():
+        router.alias(prefix, convert)
+    return router
+
+
+@pytest.mark.parametrize("old, new", [
+    ("category_3", CategoryPage.of(3)),
+    ("category_3_1500_42", CategoryPage.of(3, (1500, 42))),
+    ("tool_5", ToolCard.of(5)),
+    ("tool_5_1500_42", ToolCard.of(5, (1500, 42))),
+    ("rent_5", RentTool(tool_id=5)),
+    ("pick_0", PickTool(tool_id=0)),
+    ("back_to_tools_3", CategoryPage.of(3)),
+    ("back_to_tools_3_1500_42", CategoryPage.of(3, (1500, 42))),
+    ("inbox_processed", Inbox(status="processed")),
+    ("inbox_all_n_17", Inbox(status="all", direction="n", anchor_id=17)),
+    ("inbox_unknown", Inbox(status="new")),
+    ("app_detail_7", ApplicationDetail(application_id=7)),
+    ("app_processed_7", ApplicationProcessed(application_id=7)),
+    ("app_call_7", ApplicationCall(application_id=7)),
+])
+def test_legacy_callback_resolves_to_schema(router, old, new):
+    route, unpacked = router.resolve(old, None)
+    assert route is router.routes[new.__prefix__]
+    assert unpacked == new
+
+
+def test_legacy_back_to_tools_without_category(router):
+    route, unpacked = router.resolve("back_to_tools", None)
+    assert route is router.routes["back_to_categories"]
+    assert unpacked is None
+
+
+@pytest.mark.parametrize("callback_data", ["tool_x", "tool_", "app_detail_0", "tools_5", "unknown_1", ""])
+def test_malformed_legacy_callback_is_stale(router, callback_data):
+    assert router.resolve(callback_data, None) == (None, None)
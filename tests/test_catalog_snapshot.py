@@ -0,0 +1,45 @@
+"""Тесты снимка каталога: данные распаковываются только с верной подписью."""
+
+import pickle
+
+import pytest
+
+from services import catalog_snapshot
+from services.catalog_snapshot import read_snapshot, write_snapshot, snapshot_key
+
+KEY = snapshot_key("csv-hash", 7)
+
+
+class Exploit:
+    """Объект, распаковка которого выполняет код."""
+
+    def __reduce__(self):
+        return (pytest.fail, ("pickle.loads вызван для неподписанного снимка",))
+
+
+def test_snapshot_roundtrip(tmp_path):
+    path = tmp_path / "snapshot.bin"
+    write_snapshot(KEY, {"tools": [1, 2]}, {1: "карточка"}, path)
+
+    assert read_snapshot(KEY, path) == ({"tools": [1, 2]}, {1: "карточка"})
+    assert read_snapshot(snapshot_key("csv-hash", 8), path) is None
+
+
+def test_tampered_snapshot_is_not_unpickled(tmp_path):
+    path = tmp_path / "snapshot.bin"
+    write_snapshot(KEY, {}, {}, path)
+    data = path.read_bytes()
+    header_size = catalog_snapshot.HEADER.size + len(KEY)
+    # Подпись от прежних данных, данные подменены
+    path.write_bytes(data[:header_size] + pickle.dumps(Exploit()))
+
+    assert read_snapshot(KEY, path) is None
+
+
+def test_snapshot_signed_with_other_key_is_rejected(tmp_path, monkeypatch):
+    path = tmp_path / "snapshot.bin"
+    monkeypatch.setattr(catalog_snapshot, "SIGNING_KEY", b"other-token-key")
+    write_snapshot(KEY, Exploit(), {}, path)
+    monkeypatch.undo()
+
+    assert read_snapshot(KEY, path) is None
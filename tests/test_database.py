@@ -0,0 +1,73 @@
+"""Тесты Database и AsyncDatabase: выборки для админ-панели, работа вне event loop."""
+
+import asyncio
+import functools
+import time
+
+from database import AsyncDatabase
+
+# Длительность "медленного" обращения к БД (долгий commit, занятый диск)
+SLOW_CALL = 0.2
+# Допустимая задержка тиков event loop, пока идут медленные обращения
+MAX_LOOP_LAG = 0.05
+
+
+def test_applications_page_total_follows_status_counters(database):
+    ids = [database.add_application(user_id, "Перфоратор", "Иван", "+79000000000") for user_id in range(1, 6)]
+    database.mark_application_processed(ids[0])
+    database.mark_application_processed(ids[1])
+
+    assert database.get_applications_page()[1] == 5
+    assert database.get_applications_page("new")[1] == 3
+    assert database.get_applications_page("processed")[1] == 2
+    # Общее число не зависит от страницы
+    assert database.get_applications_page("new", ids[-1], "next", limit=1)[1] == 3
+
+
+def slowed(method):
+    """Обертка метода Database, блокирующая поток на SLOW_CALL перед вызовом."""
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        time.sleep(SLOW_CALL)
+        return method(*args, **kwargs)
+    return wrapper
+
+
+def test_slow_database_calls_do_not_block_event_loop(database):
+    for name in ("add_application", "get_application_by_id", "get_applications_page"):
+        setattr(database, name, slowed(getattr(database, name)))
+    async_db = AsyncDatabase(database)
+
+    async def ticker(stop, lags, interval=0.01):
+        while not stop.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(interval)
+            lags.append(time.perf_counter() - started - interval)
+
+    async def scenario():
+        stop, lags = asyncio.Event(), []
+        ticks = asyncio.create_task(ticker(stop, lags))
+        started = time.perf_counter()
+        ids = await asyncio.gather(*[
+            async_db.add_application(user_id, "Перфоратор", "Иван", "+79000000000")
+            for user_id in range(1, 5)
+        ])
+        await asyncio.gather(
+            *[async_db.get_application_by_id(application_id) for application_id in ids],
+            async_db.get_applications_page(),
+        )
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await ticks
+        return elapsed, lags
+
+    try:
+        elapsed, lags = asyncio.run(scenario())
+    finally:
+        async_db._read_executor.shutdown(wait=True)
+        async_db._write_executor.shutdown(wait=True)
+
+    # Записи идут по одной (4 x SLOW_CALL), чтения - параллельно в пуле
+    assert elapsed >= 5 * SLOW_CALL
+    assert len(lags) > elapsed / 0.02
+    assert max(lags) < MAX_LOOP_LAG
@@ -0,0 +1,83 @@
+"""
+Тесты хранилища FSM в SQLite.
+
+Два экземпляра SQLiteStorage на одном файле БД играют роль двух
+webhook-воркеров, между которыми распределяются апдейты пользователя.
+"""
+
+import asyncio
+
+import pytest
+from aiogram.fsm.storage.base import StorageKey
+
+from database import async_db
+from services.fsm_storage import SQLiteStorage
+
+KEY = StorageKey(bot_id=1, chat_id=10, user_id=10)
+
+
+@pytest.fixture
+def storage_db(tmp_path):
+    """Подключает глобальный async_db к новой БД на время теста."""
+    async_db.db.db_path = str(tmp_path / "database.db")
+    async_db.db.connect(fast_start=True)
+    yield async_db.db
+    async_db.db.close()
+
+
+def test_shared_storages_see_each_other(storage_db):
+    async def scenario():
+        first, second = SQLiteStorage(shared=True), SQLiteStorage(shared=True)
+
+        # Оба процесса уже прочитали сессию
+        assert await first.get_state(KEY) is None
+        assert await second.get_state(KEY) is None
+
+        await first.set_state(KEY, "ApplicationStates:waiting_for_rental_period")
+        assert await second.get_state(KEY) == "ApplicationStates:waiting_for_rental_period"
+
+        await second.set_data(KEY, {"tool_id": 5, "rental_days": 3})
+        assert await first.get_data(KEY) == {"tool_id": 5, "rental_days": 3}
+
+        # Запись состояния одним процессом не затирает данные, записанные другим
+        await first.set_state(KEY, "ApplicationStates:waiting_for_customer_name")
+        assert await second.get_data(KEY) == {"tool_id": 5, "rental_days": 3}
+        assert await second.get_state(KEY) == "ApplicationStates:waiting_for_customer_name"
+
+    asyncio.run(scenario())
+
+
+def test_shared_storage_writes_through(storage_db):
+    async def scenario():
+        # Процесс завершается без flush/close - запись уже в БД
+        await SQLiteStorage(shared=True).set_data(KEY, {"phone": "+79000000000"})
+        assert await SQLiteStorage(shared=True).get_data(KEY) == {"phone": "+79000000000"}
+
+    asyncio.run(scenario())
+
+
+def test_shared_storage_drops_expired_session(storage_db):
+    async def scenario():
+        storage = SQLiteStorage(shared=True, ttl=60)
+        await storage.set_state(KEY, "ApplicationStates:waiting_for_phone")
+        await storage.set_data(KEY, {"tool_id": 5})
+        storage_db._writer.execute("UPDATE fsm_sessions SET updated_at = updated_at - 120")
+        storage_db._writer.commit()
+
+        assert await storage.get_state(KEY) is None
+        # Новое состояние не возвращает данные брошенной сессии
+        await storage.set_state(KEY, "ApplicationStates:waiting_for_tool_name")
+        assert await storage.get_data(KEY) == {}
+
+    asyncio.run(scenario())
+
+
+def test_cached_storage_batches_writes(storage_db):
+    async def scenario():
+        storage = SQLiteStorage(shared=False)
+        await storage.set_data(KEY, {"tool_id": 5})
+        assert await SQLiteStorage(shared=True).get_data(KEY) == {}
+        await storage.flush()
+        assert await SQLiteStorage(shared=True).get_data(KEY) == {"tool_id": 5}
+
+    asyncio.run(scenario())
@@ -0,0 +1,66 @@
+"""Тесты метрик обработчиков: время ответа, который обработчик вернул вместо вызова."""
+
+import asyncio
+
+from aiogram.dispatcher.event.handler import HandlerObject
+from aiogram.methods import SendMessage
+
+from middlewares.metrics import HandlerMetricsMiddleware
+from services.metrics import metrics, ApiTimingMiddleware
+
+API_DELAY = 0.03
+
+
+async def polling_reply(message):
+    return SendMessage(chat_id=1, text="ответ")
+
+
+async def webhook_reply(message):
+    return SendMessage(chat_id=1, text="ответ")
+
+
+async def call_handler(callback, **extra):
+    """Вызывает обработчик через HandlerMetricsMiddleware, как диспетчер."""
+    data = {"handler": HandlerObject(callback=callback), **extra}
+    return await HandlerMetricsMiddleware()(lambda event, data: callback(event), None, data)
+
+
+async def send(method):
+    """Отправка метода через middleware сессии бота, как silent_call_request при polling."""
+    async def make_request(bot, method):
+        await asyncio.sleep(API_DELAY)
+        return True
+
+    return await ApiTimingMiddleware()(make_request, None, method)
+
+
+def test_returned_method_is_timed_when_dispatcher_sends_it():
+    entry = metrics.register("polling_reply")
+
+    async def scenario():
+        method = await call_handler(polling_reply)
+        # Замер завершится только при отправке ответа
+        assert entry.calls == 0
+        await send(method)
+        return method
+
+    method = asyncio.run(scenario())
+
+    assert entry.calls == 1 and entry.errors == 0
+    assert entry.api.count == 1
+    assert entry.api.total_ms >= API_DELAY * 1000
+    assert entry.duration.total_ms >= API_DELAY * 1000
+    # Отметка замера не попадает в запрос к Bot API
+    assert "_metrics_timer" not in method.model_dump()
+
+
+def test_webhook_reply_api_time_is_not_measured():
+    entry = metrics.register("webhook_reply")
+
+    asyncio.run(call_handler(webhook_reply, reply_in_webhook=True))
+
+    assert entry.calls == 1
+    assert entry.api.count == 0 and entry.api_unmeasured == 1
+    assert "<code>webhook_reply</code>" in metrics.summary()
+    assert entry.api_mean_text() == "н/и"
+    assert 'bot_handler_api_unmeasured_total{handler="webhook_reply"} 1' in metrics.prometheus()
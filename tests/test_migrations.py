@@ -0,0 +1,56 @@
+"""Тесты версионных миграций схемы."""
+
+import sqlite3
+import threading
+
+import pytest
+
+from migrations import MIGRATIONS, apply_migrations, get_schema_version
+
+
+@pytest.mark.parametrize("attempt", range(5))
+def test_concurrent_runners_apply_each_step_once(tmp_path, attempt):
+    """Процессы, стартующие одновременно, не применяют одну миграцию дважды."""
+    path = str(tmp_path / "database.db")
+    errors = []
+    barrier = threading.Barrier(4)
+
+    def run():
+        conn = sqlite3.connect(path, timeout=30)
+        conn.execute("PRAGMA journal_mode = WAL")
+        try:
+            barrier.wait()
+            apply_migrations(conn)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            conn.close()
+
+    threads = [threading.Thread(target=run) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    conn = sqlite3.connect(path)
+    assert get_schema_version(conn) == MIGRATIONS[-1][0]
+    versions = [row[0] for row in conn.execute("SELECT version FROM schema_version ORDER BY version")]
+    assert versions == [version for version, _, _ in MIGRATIONS]
+    conn.close()
+
+
+def test_tool_id_migration_tolerates_existing_column(tmp_path):
+    """applications.tool_id, добавленная до записи версии, не ломает миграцию 6."""
+    conn = sqlite3.connect(str(tmp_path / "database.db"))
+    get_schema_version(conn)
+    for version, description, migrate in MIGRATIONS[:5]:
+        migrate(conn)
+        conn.execute("INSERT INTO schema_version (version, description) VALUES (?, ?)",
+                     (version, description))
+    conn.commit()
+    conn.execute("ALTER TABLE applications ADD COLUMN tool_id INTEGER")
+    conn.commit()
+
+    assert apply_migrations(conn) == MIGRATIONS[-1][0]
+    conn.close()
@@ -0,0 +1,43 @@
+"""Тесты рассылки уведомлений: лимит отправки в один чат."""
+
+import asyncio
+import time
+
+from services.notifications import NotificationDispatcher
+
+CHAT_RATE = 20
+
+
+class RecordingBot:
+    """Бот, запоминающий время отправки в каждый чат."""
+
+    def __init__(self):
+        self.sent = {}
+
+    async def send_message(self, chat_id, text, **kwargs):
+        self.sent.setdefault(chat_id, []).append(time.monotonic())
+
+
+def test_chat_rate_limit_spaces_messages_to_one_chat():
+    async def scenario():
+        dispatcher = NotificationDispatcher(rate=1000, chat_rate=CHAT_RATE)
+        dispatcher._bot = bot = RecordingBot()
+        semaphore = asyncio.Semaphore(10)
+        # (id, вид, заявка, чат, попыток): четыре уведомления в чат 1 и по одному в 2..4
+        notifications = [(i, "new_application", i, 1, 0) for i in range(4)]
+        notifications += [(10 + chat_id, "new_application", 1, chat_id, 0) for chat_id in (2, 3, 4)]
+
+        started = time.monotonic()
+        results = await asyncio.gather(*[
+            dispatcher._send(semaphore, notification, "текст", None) for notification in notifications
+        ])
+        return started, results, bot.sent
+
+    started, results, sent = asyncio.run(scenario())
+
+    assert results == [None] * 7
+    gaps = [later - earlier for earlier, later in zip(sent[1], sent[1][1:])]
+    assert len(sent[1]) == 4
+    assert min(gaps) >= 0.9 / CHAT_RATE
+    # Другие чаты не ждут очереди первого
+    assert all(sent[chat_id][0] - started < 0.5 / CHAT_RATE for chat_id in (2, 3, 4))
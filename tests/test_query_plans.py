@@ -0,0 +1,90 @@
+"""
+Проверка планов частых запросов.
+
+Методы Database вызываются на настоящей схеме, их SQL перехватывается
+trace callback соединений (с подставленными параметрами) и проверяется
+через EXPLAIN QUERY PLAN. Тест падает, если частый запрос читает таблицу
+целиком без индекса или сортирует результат во временном B-дереве.
+"""
+
+import time
+
+import pytest
+
+# GROUP BY во временном B-дереве допустим: группируется уже выбранный
+# по индексу диапазон (например, часы отчета воронки), а не вся таблица
+ACCEPTED_TEMP_BTREE = ("USE TEMP B-TREE FOR GROUP BY",)
+
+
+def trace_sql(database):
+    """Включает запись SQL на всех соединениях БД; возвращает список запросов."""
+    statements = []
+    database._writer.set_trace_callback(statements.append)
+    readers = [database._readers.get() for _ in range(database.read_pool_size)]
+    for reader in readers:
+        reader.set_trace_callback(statements.append)
+        database._readers.put(reader)
+    return statements
+
+
+def bad_plan_lines(conn, sql):
+    """Строки плана с полным просмотром таблицы или сортировкой во временном B-дереве."""
+    plan = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}")]
+    return [
+        detail for detail in plan
+        if (detail.startswith("SCAN") and " USING " not in detail)
+        or (detail.startswith("USE TEMP B-TREE") and detail not in ACCEPTED_TEMP_BTREE)
+    ]
+
+
+@pytest.fixture
+def filled_database(catalog_database):
+    """БД с каталогом, заявкой, бронью и уведомлением в очереди."""
+    application_id = catalog_database.add_application(
+        1, "Перфоратор", "Иван", "+79000000000", "3 дня", tool_id=1,
+        notify_chat_ids=[100], reservation=("2030-01-01", "2030-01-03", 1)
+    )
+    catalog_database.add_application(2, "Болгарка", "Петр", "+79000000001", "1 день")
+    return catalog_database, application_id
+
+
+HOT_CALLS = {
+    "get_new_applications": lambda db, app: db.get_new_applications(),
+    "get_recent_applications": lambda db, app: db.get_recent_applications(),
+    "get_application_by_id": lambda db, app: db.get_application_by_id(app),
+    "get_applications_page": lambda db, app: db.get_applications_page(),
+    "get_applications_page_new": lambda db, app: db.get_applications_page("new"),
+    "get_applications_page_next": lambda db, app: db.get_applications_page(None, app, "next"),
+    "get_applications_page_prev": lambda db, app: db.get_applications_page("new", app, "prev"),
+    "get_applications_stats": lambda db, app: db.get_applications_stats(),
+    "get_daily_stats": lambda db, app: db.get_daily_stats(),
+    "get_funnel_stats": lambda db, app: db.get_funnel_stats("2000-01-01 00"),
+    "mark_application_processed": lambda db, app: db.mark_application_processed(app),
+    "get_application_detail": lambda db, app: db.get_application_detail(app),
+    "release_reservation": lambda db, app: db.release_reservation(app),
+    "get_tools_by_category": lambda db, app: db.get_tools_by_category(1),
+    "get_tools_page": lambda db, app: db.get_tools_page(1),
+    "get_tools_page_after": lambda db, app: db.get_tools_page(1, (1000, 1)),
+    "get_tool_by_id": lambda db, app: db.get_tool_by_id(1),
+    "get_category_by_id": lambda db, app: db.get_category_by_id(1),
+    "get_busy_units": lambda db, app: db.get_busy_units([1, 2, 3], "2030-01-01", "2030-01-05"),
+    "claim_due_notifications": lambda db, app: db.claim_due_notifications(time.time(), 50, 60),
+    "get_next_notification_time": lambda db, app: db.get_next_notification_time(),
+    "get_fsm_session": lambda db, app: db.get_fsm_session("fsm:1:1:1:default"),
+    "delete_expired_fsm_sessions": lambda db, app: db.delete_expired_fsm_sessions(0),
+}
+
+
+@pytest.mark.parametrize("name", HOT_CALLS)
+def test_hot_query_uses_indexes(filled_database, name):
+    database, application_id = filled_database
+    statements = trace_sql(database)
+    HOT_CALLS[name](database, application_id)
+
+    queries = [
+        sql for sql in statements
+        if sql.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE", "WITH"))
+    ]
+    assert queries, f"{name} не выполнил ни одного запроса"
+    for sql in queries:
+        assert bad_plan_lines(database._writer, sql) == [], " ".join(sql.split())
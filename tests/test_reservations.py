@@ -0,0 +1,67 @@
+"""Тесты броней инструментов: запрос клиентом, подтверждение и снятие администратором."""
+
+import pytest
+
+from database import ReservationConflict, busy_units
+
+PERIOD = ("2030-03-10", "2030-03-12")
+
+
+def apply(database, user_id, period=PERIOD, tool_id=1):
+    return database.add_application(user_id, "Инструмент", "Клиент", "+79000000000", "3 дня",
+                                    tool_id=tool_id, reservation=(*period, 1))
+
+
+def reservation_status(database, application_id):
+    application, reservation = database.get_application_detail(application_id)
+    return reservation[3]
+
+
+def test_busy_units_counts_peak_not_sum():
+    reservations = [(1, "2030-03-01", "2030-03-05", 1), (1, "2030-03-06", "2030-03-09", 1),
+                    (1, "2030-03-05", "2030-03-06", 1)]
+    # Первые две брони не пересекаются, третья пересекается с обеими по одному дню
+    assert busy_units(reservations, "2030-03-01", "2030-03-09") == {1: 2}
+    assert busy_units(reservations, "2030-03-07", "2030-03-09") == {1: 1}
+
+
+def test_requested_reservation_holds_no_stock(catalog_database):
+    first = apply(catalog_database, 1)
+    second = apply(catalog_database, 2)
+
+    # Необработанные заявки не занимают единственную единицу
+    assert catalog_database.get_busy_units([1], *PERIOD) == {}
+    assert reservation_status(catalog_database, first) == "requested"
+    assert reservation_status(catalog_database, second) == "requested"
+
+
+def test_processing_confirms_first_and_reports_conflict(catalog_database):
+    first = apply(catalog_database, 1)
+    second = apply(catalog_database, 2)
+
+    assert catalog_database.mark_application_processed(first) == (*PERIOD, True)
+    assert catalog_database.get_busy_units([1], *PERIOD) == {1: 1}
+    # Вторую заявку на те же даты подтвердить нельзя
+    assert catalog_database.mark_application_processed(second) == (*PERIOD, False)
+    assert reservation_status(catalog_database, second) == "requested"
+
+    # Новая заявка на занятые даты отклоняется сразу, на соседние - принимается
+    with pytest.raises(ReservationConflict):
+        apply(catalog_database, 3, ("2030-03-12", "2030-03-14"))
+    apply(catalog_database, 3, ("2030-03-13", "2030-03-14"))
+
+
+def test_release_frees_the_unit(catalog_database):
+    first = apply(catalog_database, 1)
+    catalog_database.mark_application_processed(first)
+
+    assert catalog_database.release_reservation(first) is True
+    assert catalog_database.release_reservation(first) is False
+    assert catalog_database.get_busy_units([1], *PERIOD) == {}
+    assert reservation_status(catalog_database, first) == "released"
+    apply(catalog_database, 2)
+
+
+def test_processing_without_reservation(catalog_database):
+    application_id = catalog_database.add_application(1, "Инструмент", "Клиент", "+79000000000")
+    assert catalog_database.mark_application_processed(application_id) is None
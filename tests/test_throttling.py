@@ -0,0 +1,65 @@
+"""Тесты подавления повторных нажатий кнопок."""
+
+import asyncio
+
+from aiogram.dispatcher.event.handler import HandlerObject
+from aiogram.methods import AnswerCallbackQuery, EditMessageText
+from aiogram.types import CallbackQuery, User
+
+from middlewares.throttling import ThrottlingMiddleware
+
+USER = User(id=10, is_bot=False, first_name="Иван")
+LIMITS = {"default": (100, 100)}
+
+
+def press(number, data="confirm_application"):
+    # У каждого нажатия свой id, совпадает только callback_data
+    return CallbackQuery(id=str(number), from_user=USER, chat_instance="chat", data=data)
+
+
+async def confirm_application(callback, callback_data=None):
+    return EditMessageText(chat_id=USER.id, message_id=1, text="✅ Заявка отправлена")
+
+
+async def refresh(callback, callback_data=None):
+    return None
+
+
+def run_press(middleware, handler, number, calls):
+    async def counted(event, data):
+        calls.append(event.id)
+        return await handler(event)
+
+    data = {"event_from_user": USER, "handler": HandlerObject(callback=handler)}
+    return middleware(counted, press(number), data)
+
+
+def test_double_tap_dropped_until_returned_method_is_sent():
+    async def scenario():
+        middleware = ThrottlingMiddleware(limits=LIMITS, duplicate_ttl=0.05)
+        calls = []
+
+        first = await run_press(middleware, confirm_application, 1, calls)
+        assert isinstance(first, EditMessageText)
+        # Метод еще не отправлен диспетчером - второе нажатие отбрасывается
+        second = await run_press(middleware, confirm_application, 2, calls)
+        assert isinstance(second, AnswerCallbackQuery)
+        assert calls == ["1"]
+
+        await asyncio.sleep(0.1)
+        await run_press(middleware, confirm_application, 3, calls)
+        assert calls == ["1", "3"]
+
+    asyncio.run(scenario())
+
+
+def test_press_released_at_once_when_handler_sends_itself():
+    async def scenario():
+        middleware = ThrottlingMiddleware(limits=LIMITS, duplicate_ttl=10)
+        calls = []
+
+        await run_press(middleware, refresh, 1, calls)
+        await run_press(middleware, refresh, 2, calls)
+        assert calls == ["1", "2"]
+
+    asyncio.run(scenario())